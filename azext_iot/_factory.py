@@ -19,9 +19,13 @@ from azext_iot.constants import (
     IOTDPS_RESOURCE_ID
 )
 from msrestazure.azure_exceptions import CloudError
+from requests.adapters import HTTPAdapter
+from threading import Lock
+from urllib3 import PoolManager
 
 __all__ = [
     "SdkResolver",
+    "sdk_connection_pools",
     "CloudError",
     "iot_hub_service_factory",
     "iot_service_provisioning_factory",
@@ -68,6 +72,85 @@ def iot_service_provisioning_factory(cli_ctx, *_):
     return iot_service_provisioning_factory(cli_ctx=cli_ctx)
 
 
+# Connection pool sizes of the HTTP sessions used by dataplane SDK clients, settable
+# with 'az config set iot.http_pool_connections=<n>' and 'iot.http_pool_maxsize=<n>'.
+SDK_POOL_CONNECTIONS = 10
+SDK_POOL_MAXSIZE = 32
+
+
+class SdkConnectionPools(object):
+    """
+    Process wide connection pools of the dataplane SDK clients, keyed by pool sizes.
+
+    Every SDK client keeps its own configuration and HTTP session, but the sessions
+    send requests through adapters backed by these shared pools. Connections to a
+    target are therefore reused by every client of the process instead of being set up
+    again per client and closed after each request, while settings like the retry
+    policy stay per client.
+    """
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = Lock()
+
+    def get(self, pool_connections=SDK_POOL_CONNECTIONS, pool_maxsize=SDK_POOL_MAXSIZE):
+        key = (pool_connections, pool_maxsize)
+        with self._lock:
+            pool_manager = self._pools.get(key)
+            if pool_manager is None:
+                pool_manager = self._pools[key] = PoolManager(
+                    num_pools=pool_connections, maxsize=pool_maxsize
+                )
+            return pool_manager
+
+    def clear(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool_manager in pools:
+            pool_manager.clear()
+
+
+class _SharedPoolAdapter(HTTPAdapter):
+    """HTTP adapter sending requests through a shared urllib3 pool manager."""
+
+    def __init__(self, pool_manager, **kwargs):
+        self._shared_pool_manager = pool_manager
+        super(_SharedPoolAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        self.poolmanager = self._shared_pool_manager
+
+    def close(self):
+        # shared pools outlive the sessions of single clients
+        for proxy in self.proxy_manager.values():
+            proxy.clear()
+
+
+def _pool_session_callback(pool_connections, pool_maxsize):
+    def configure_session(session, global_config, local_config, **kwargs):
+        # sessions are created per client and thread, mount pooled adapters only once
+        if not getattr(session, "_iot_pooled", False):
+            pool_manager = sdk_connection_pools.get(pool_connections, pool_maxsize)
+            for protocol in ["http://", "https://"]:
+                session.mount(
+                    protocol,
+                    _SharedPoolAdapter(
+                        pool_manager,
+                        pool_connections=pool_connections,
+                        pool_maxsize=pool_maxsize,
+                        # keep the retry policy msrest installed for this client
+                        max_retries=session.adapters[protocol].max_retries,
+                    ),
+                )
+            session._iot_pooled = True
+        return kwargs
+
+    return configure_session
+
+
+sdk_connection_pools = SdkConnectionPools()
+
+
 class SdkResolver(object):
     def __init__(self, target, device_id=None, auth_override=None):
         self.target = target
@@ -87,8 +170,25 @@ class SdkResolver(object):
         sdk_client = sdk_map[sdk_type]()
         sdk_client.config.enable_http_logger = True
         sdk_client.config.add_user_agent(USER_AGENT)
+        # keep the session open between requests, its connections come from shared pools
+        sdk_client.config.keep_alive = True
+        sdk_client.config.session_configuration_callback = _pool_session_callback(
+            *self._get_pool_sizes()
+        )
         return sdk_client
 
+    def _get_pool_sizes(self):
+        config = getattr(getattr(self.target.get("cmd"), "cli_ctx", None), "config", None)
+        if not config:
+            return SDK_POOL_CONNECTIONS, SDK_POOL_MAXSIZE
+        try:
+            return (
+                config.getint("iot", "http_pool_connections", fallback=SDK_POOL_CONNECTIONS),
+                config.getint("iot", "http_pool_maxsize", fallback=SDK_POOL_MAXSIZE),
+            )
+        except ValueError:
+            return SDK_POOL_CONNECTIONS, SDK_POOL_MAXSIZE
+
     def _construct_sdk_map(self):
         return {
             SdkType.service_sdk: self._get_iothub_service_sdk,  # Don't need to call here
@@ -71,6 +71,33 @@ helps[
     - name: Receive the specified number of messages from hub and then shut down.
       text: >
         az iot hub monitor-events -n {iothub_name} --message-count {message_count}
+    - name: Receive messages from devices in a wildcard set that carry matching application properties.
+      text: >
+        az iot hub monitor-events -n {iothub_name} -d Device* --property-filter alert=true severity=h*
+    - name: Receive messages in batches of up to 100, keeping 500 messages of link credit per partition.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --batch-size 100 --prefetch 500
+    - name: Receive messages from a subset of partitions.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --partitions 0,3,7
+    - name: Receive messages from the second of four shards of the hub partitions (run shards 0/4 to 3/4 to cover all partitions).
+      text: >
+        az iot hub monitor-events -n {iothub_name} --shard 1/4
+    - name: Record progress per partition and resume from the last received event after a restart.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --checkpoint-store ./checkpoints --timeout 0
+    - name: Spread all partitions across 8 processes and merge their output.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --processes 8
+    - name: Stream events as newline delimited JSON for consumption by another tool.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --output-format ndjson | jq .event.payload
+    - name: Report throughput, lag and processing time percentiles as JSON to stderr every 10 seconds.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --stats json --stats-interval 10 2> stats.ndjson
+    - name: Append events as msgpack to a file rotated every 50 MB.
+      text: >
+        az iot hub monitor-events -n {iothub_name} --output-format msgpack --output-file events.msgpack --output-file-size 50
 """
 
 helps[
@@ -392,6 +419,8 @@ helps[
 ] = """
     type: command
     short-summary: Add devices as children to a target edge device.
+    long-summary: Child devices are looked up with one registry query per 100 devices and updated with
+                  registry bulk operations of up to 100 devices, several at a time.
     examples:
     - name: Add a space-separated list of device Ids as children to the target edge device.
       text: >
@@ -422,6 +451,8 @@ helps[
 ] = """
     type: command
     short-summary: Remove child devices from a target edge device.
+    long-summary: Child devices are looked up with one registry query per 100 devices and updated with
+                  registry bulk operations of up to 100 devices, several at a time.
     examples:
     - name: Remove a space-seperated list of child devices from a target parent device.
       text: >
@@ -454,6 +485,10 @@ helps[
     long-summary: |
                    This command is the same as iot hub query with the query "select * from devices" for
                    all devices and "select * from devices where capabilities.iotEdge = true" for edge devices.
+    examples:
+    - name: Stream all device twins as newline delimited JSON without holding the full list in memory.
+      text: >
+        az iot hub device-twin list -n {iothub_name} --top -1 --stream > twins.ndjson
 """
 
 helps[
@@ -666,6 +701,9 @@ helps[
       text: >
         az iot hub generate-sas-token --connection-string
         'HostName=myhub.azure-devices.net;DeviceId=mydevice;ModuleId=mymodule;SharedAccessKeyName=iothubowner;SharedAccessKey=12345'
+    - name: Generate device and module SAS tokens for every device or deviceId/moduleId pair listed in a file.
+      text: >
+        az iot hub generate-sas-token -n {iothub_name} --input devices.txt --duration 86400
 """
 
 helps[
@@ -673,11 +711,19 @@ helps[
 ] = """
     type: command
     short-summary: Invoke an Edge module method.
+    long-summary: |
+                  Use --device-query to invoke the module method on every device returned by a query.
+                  Invocations run concurrently and each result is written to stdout as a line of JSON,
+                  followed by a summary line with status code counts and latency percentiles and histogram.
     examples:
     - name: Invoke a direct method on edge device using a module from the cloud.
       text: >
         az iot hub invoke-module-method -n {iothub_name} -d {device_id}
         -m '$edgeAgent' --method-name 'RestartModule' --method-payload '{"schemaVersion": "1.0"}'
+    - name: Ping the edge agent of every edge device in the hub, 50 devices at a time.
+      text: >
+        az iot hub invoke-module-method -n {iothub_name} -m '$edgeAgent' --method-name 'ping'
+        --device-query "select deviceId from devices where capabilities.iotEdge = true" --max-concurrency 50
 """
 
 helps[
@@ -685,11 +731,21 @@ helps[
 ] = """
     type: command
     short-summary: Invoke a device method.
+    long-summary: |
+                  Use --device-query to invoke the method on every device returned by a query.
+                  Invocations run concurrently and each result is written to stdout as a line of JSON
+                  with the device id, method status, payload and latency, followed by a summary line with
+                  status code counts and latency percentiles and histogram.
     examples:
     - name: Invoke a direct method on device from the cloud.
       text: >
         az iot hub invoke-device-method --hub-name {iothub_name} --device-id {device_id}
         --method-name Reboot --method-payload '{"version":"1.0"}'
+    - name: Invoke a direct method on every device matching a query, streaming one result per line.
+      text: >
+        az iot hub invoke-device-method --hub-name {iothub_name} --method-name GetDiagnostics
+        --device-query "select deviceId from devices where tags.site = 'plant1'" --max-concurrency 100
+        --timeout 20 --method-connect-timeout 5
 """
 
 helps[
@@ -708,6 +764,9 @@ helps[
     - name: Query all module twin data on target device.
       text: >
         az iot hub query -n {iothub_name} -q "select * from devices.modules where devices.deviceId = '{device_id}'"
+    - name: Stream query results page by page as newline delimited JSON.
+      text: >
+        az iot hub query -n {iothub_name} -q "select * from devices" --stream
 """
 
 helps[
@@ -811,6 +870,27 @@ helps[
         --metric-type system
 """
 
+helps[
+    "iot hub configuration evaluate-metrics"
+] = """
+    type: command
+    short-summary: Count the devices or modules matching the user and system metrics of many IoT device configurations.
+    long-summary: |
+                  Metric queries of all target configurations are evaluated concurrently. Queries selecting
+                  plain rows are rewritten to SELECT COUNT() so only counts are returned by the hub.
+                  Queries aggregating into a single value, such as SELECT COUNT() AS c, evaluate to that value.
+                  Queries with TOP or GROUP BY are run as defined and their rows are counted.
+                  Empty metric queries evaluate to null. Failed queries evaluate to null and their errors are
+                  reported under errors by metric type and metric id.
+    examples:
+    - name: Evaluate all metrics of every device configuration
+      text: >
+        az iot hub configuration evaluate-metrics -n {iothub_name}
+    - name: Evaluate the system metrics of two device configurations
+      text: >
+        az iot hub configuration evaluate-metrics --cids {config_name} {config_name} -n {iothub_name} --mt system
+"""
+
 helps[
     "iot hub distributed-tracing"
 ] = """
@@ -1025,6 +1105,9 @@ helps[
     - name: Test edge modules while in development by setting modules on a target device.
       text: >
         az iot edge set-modules --hub-name {iothub_name} --device-id {device_id} --content ../modules_content.json
+    - name: Only apply modules whose desired properties differ from the current module twins of the device.
+      text: >
+        az iot edge set-modules --hub-name {iothub_name} --device-id {device_id} --content ../modules_content.json --diff
 """
 
 helps[
@@ -1142,6 +1225,46 @@ helps[
         az iot edge deployment show-metric -m myCustomMetric -d {deployment_name} -n {iothub_name}
 """
 
+helps[
+    "iot edge deployment evaluate-metrics"
+] = """
+    type: command
+    short-summary: Count the devices or modules matching the user and system metrics of many IoT Edge deployments.
+    long-summary: |
+                  Metric queries of all target deployments are evaluated concurrently. Queries selecting
+                  plain rows are rewritten to SELECT COUNT() so only counts are returned by the hub.
+                  Queries aggregating into a single value, such as SELECT COUNT() AS c, evaluate to that value.
+                  Queries with TOP or GROUP BY are run as defined and their rows are counted.
+                  Empty metric queries evaluate to null. Failed queries evaluate to null and their errors are
+                  reported under errors by metric type and metric id.
+    examples:
+    - name: Evaluate all metrics of every edge deployment
+      text: >
+        az iot edge deployment evaluate-metrics -n {iothub_name}
+    - name: Evaluate the system metrics of two edge deployments with up to 16 concurrent queries
+      text: >
+        az iot edge deployment evaluate-metrics --dids {deployment_name} {deployment_name} -n {iothub_name}
+        --mt system --concurrency 16
+"""
+
+helps[
+    "iot edge deployment validate"
+] = """
+    type: command
+    short-summary: Validate many IoT Edge deployment manifests against the $edgeAgent and $edgeHub schemas.
+    long-summary: |
+                  Manifests are validated in parallel processes. Each process loads and compiles every
+                  schema version once. The command fails and lists the errors of every invalid manifest
+                  when any manifest is invalid.
+    examples:
+    - name: Validate every deployment manifest in a directory
+      text: >
+        az iot edge deployment validate --cps ./deployments
+    - name: Validate two deployment manifests in one process
+      text: >
+        az iot edge deployment validate --cps base.deployment.json layered.deployment.json --processes 1
+"""
+
 helps[
     "iot dps"
 ] = """
@@ -1465,6 +1588,10 @@ helps[
       text: >
         az iot dps enrollment-group compute-device-key -g {resource_group_name} --dps-name {dps_name}
         --enrollment-id {enrollment_id} --registration-id {registration_id}
+    - name: Compute the device keys of every registration ID listed in a file, fetching the enrollment group key once.
+      text: >
+        az iot dps enrollment-group compute-device-key -g {resource_group_name} --dps-name {dps_name}
+        --enrollment-id {enrollment_id} --input registration-ids.txt
 """
 
 helps[
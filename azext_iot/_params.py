@@ -35,6 +35,7 @@ from azext_iot.common.shared import (
     RenewKeyType,
 )
 from azext_iot._validators import mode2_iot_login_handler
+from azext_iot.monitor.models.enum import OutputFormatType, StatsFormatType
 from azext_iot.assets.user_messages import info_param_properties_device
 
 
@@ -79,6 +80,57 @@ children_list_prop_type = CLIArgumentType(
     help="Child device list (space separated).",
 )
 
+event_prefetch_type = CLIArgumentType(
+    options_list=["--prefetch"],
+    type=int,
+    help="Number of messages each partition receiver requests from the service ahead of processing. "
+    "Higher values increase throughput at the cost of memory. "
+    "Defaults to --batch-size when batching, otherwise 0.",
+)
+
+event_batch_size_type = CLIArgumentType(
+    options_list=["--batch-size"],
+    type=int,
+    help="Maximum number of messages each partition receiver hands off for processing at once. "
+    "Cannot be greater than --prefetch. If not specified, messages are processed one at a time.",
+)
+
+event_stats_type = CLIArgumentType(
+    options_list=["--stats"],
+    arg_type=get_enum_type(StatsFormatType),
+    help="Periodically report per partition messages/sec, bytes/sec and end-to-end lag, "
+    "parse, output and dispatch time percentiles and queue depth to stderr, as text or one JSON document per line.",
+)
+
+event_stats_interval_type = CLIArgumentType(
+    options_list=["--stats-interval"],
+    type=int,
+    help="Seconds between stats reports. Default: 5.",
+)
+
+query_stream_type = CLIArgumentType(
+    options_list=["--stream"],
+    arg_type=get_three_state_flag(),
+    help="Write results to stdout as newline delimited JSON while each page arrives, "
+    "instead of collecting the whole result set before output. Ignores --output. Default: false",
+)
+
+method_device_query_type = CLIArgumentType(
+    options_list=["--device-query", "--dq"],
+    help="IoT Hub query selecting the devices to invoke, for example "
+    "\"select deviceId from devices where tags.site = 'plant1'\". Every result must include deviceId. "
+    "Results are written to stdout as newline delimited JSON as each invocation completes, "
+    "followed by a summary of status codes and latencies. Ignores --output.",
+    arg_group="Fan-out",
+)
+
+method_max_concurrency_type = CLIArgumentType(
+    options_list=["--max-concurrency", "--mc"],
+    type=int,
+    help="Maximum number of concurrent method invocations when using --device-query. Default: 16.",
+    arg_group="Fan-out",
+)
+
 event_timeout_type = CLIArgumentType(
     options_list=["--timeout", "--to", "-t"],
     type=int,
@@ -303,6 +355,8 @@ def load_arguments(self, _):
             type=int,
             help="Maximum number of seconds to wait for the device method result.",
         )
+        context.argument("device_query", arg_type=method_device_query_type)
+        context.argument("max_concurrency", arg_type=method_max_concurrency_type)
 
     with self.argument_context("iot hub invoke-module-method") as context:
         context.argument(
@@ -311,6 +365,17 @@ def load_arguments(self, _):
             type=int,
             help="Maximum number of seconds to wait for the module method result.",
         )
+        context.argument("device_query", arg_type=method_device_query_type)
+        context.argument("max_concurrency", arg_type=method_max_concurrency_type)
+
+    with self.argument_context("iot hub generate-sas-token") as context:
+        context.argument(
+            "input_path",
+            options_list=["--input", "-i"],
+            help="Path to a file listing one device per line, as a device id, a deviceId/moduleId pair "
+            "or a JSON object with deviceId and optional moduleId. A SAS token is generated for every "
+            "line and written to stdout as newline delimited JSON, in input order. Ignores --output.",
+        )
 
     with self.argument_context("iot hub connection-string") as context:
         context.argument(
@@ -395,6 +460,62 @@ def load_arguments(self, _):
     with self.argument_context("iot hub monitor-events") as context:
         context.argument("timeout", arg_type=event_timeout_type)
         context.argument("properties", arg_type=event_msg_prop_type)
+        context.argument("prefetch", arg_type=event_prefetch_type)
+        context.argument("batch_size", arg_type=event_batch_size_type)
+        context.argument("stats", arg_type=event_stats_type)
+        context.argument("stats_interval", arg_type=event_stats_interval_type)
+        context.argument(
+            "partitions",
+            options_list=["--partitions"],
+            nargs="+",
+            help="Event Hub partition ids to monitor, space or comma separated. "
+            "If not specified, all partitions are monitored.",
+        )
+        context.argument(
+            "shard",
+            options_list=["--shard"],
+            help="Monitor a single shard of the partitions, in the format index/count (zero-based). "
+            "Running count processes with shards 0/count through count-1/count covers every partition once.",
+        )
+        context.argument(
+            "processes",
+            options_list=["--processes"],
+            type=int,
+            help="Number of processes to spread the monitored partitions across. "
+            "Output from all processes is merged into this command's output.",
+        )
+        context.argument(
+            "checkpoint_store",
+            options_list=["--checkpoint-store"],
+            help="Local directory used to record the last received offset per partition and consumer group. "
+            "When set, partitions with a recorded offset resume after it instead of using --enqueued-time.",
+        )
+        context.argument(
+            "output_format",
+            options_list=["--output-format", "--of"],
+            arg_type=get_enum_type(OutputFormatType),
+            help="Stream events in a compact machine readable format, one record per event. "
+            "Status messages are written to stderr. msgpack requires --output-file and the msgpack package. "
+            "When not specified, events are rendered according to --output.",
+        )
+        context.argument(
+            "output_file",
+            options_list=["--output-file", "--file"],
+            help="Append events to this file instead of stdout. The file is rotated when it reaches --output-file-size.",
+        )
+        context.argument(
+            "output_file_size",
+            options_list=["--output-file-size", "--file-size"],
+            type=int,
+            help="Size in MB at which the output file is rotated. Up to 5 rotated files are kept. Default: 100.",
+        )
+        context.argument(
+            "property_filters",
+            options_list=["--property-filter", "--pf"],
+            nargs="*",
+            help="Only output messages whose application properties match all of the given "
+            "space-separated key=value pairs. Values support * and ? wildcards.",
+        )
         context.argument(
             "interface",
             options_list=["--interface", "-i"],
@@ -617,6 +738,10 @@ def load_arguments(self, _):
             type=int,
             help="Maximum number of elements to return. By default query has no cap.",
         )
+        context.argument("stream", arg_type=query_stream_type)
+
+    with self.argument_context("iot hub device-twin list") as context:
+        context.argument("stream", arg_type=query_stream_type)
 
     with self.argument_context("iot device") as context:
         context.argument(
@@ -820,6 +945,55 @@ def load_arguments(self, _):
             help="Maximum number of configurations to return. By default all configurations are returned.",
         )
 
+    for scope, options, entity in [
+        ("iot hub configuration evaluate-metrics", ["--config-ids", "--cids"], "configurations"),
+        ("iot edge deployment evaluate-metrics", ["--deployment-ids", "--dids"], "deployments"),
+    ]:
+        with self.argument_context(scope) as context:
+            context.argument(
+                "config_ids",
+                options_list=options,
+                nargs="*",
+                help="Space-separated list of {0} to evaluate. By default all {0} are evaluated.".format(entity),
+            )
+            context.argument(
+                "metric_type",
+                options_list=["--metric-type", "--mt"],
+                arg_type=get_enum_type(MetricType),
+                help="Only evaluate metrics of this collection. By default user and system metrics are evaluated.",
+            )
+            context.argument(
+                "concurrency",
+                options_list=["--concurrency"],
+                type=int,
+                help="Maximum number of metric queries evaluated concurrently. Default: 8.",
+            )
+
+    with self.argument_context("iot edge set-modules") as context:
+        context.argument(
+            "diff",
+            options_list=["--diff"],
+            arg_type=get_three_state_flag(),
+            help="Compare the modules content with the current module twins of the device and only apply "
+            "modules whose desired properties changed, along with the $edgeAgent and $edgeHub system modules. "
+            "Nothing is applied when no module changed.",
+        )
+
+    with self.argument_context("iot edge deployment validate") as context:
+        context.argument(
+            "content_paths",
+            options_list=["--content-paths", "--cps"],
+            nargs="+",
+            help="Space-separated list of deployment manifest files or directories. "
+            "Directories are searched recursively for .json files.",
+        )
+        context.argument(
+            "processes",
+            options_list=["--processes"],
+            type=int,
+            help="Number of processes validating manifests in parallel. Default: number of CPUs.",
+        )
+
     with self.argument_context("iot edge") as context:
         context.argument(
             "config_id",
@@ -1001,6 +1175,12 @@ def load_arguments(self, _):
             "parameters aside from registration ID will be ignored.",
         )
         context.argument("registration_id", help="ID of device registration. ")
+        context.argument(
+            "input_path",
+            options_list=["--input", "-i"],
+            help="Path to a file listing one registration ID per line. The derived device key of every "
+            "registration ID is written to stdout as newline delimited JSON, in input order. Ignores --output.",
+        )
 
     with self.argument_context("iot dps connection-string") as context:
         context.argument(
@@ -1157,6 +1337,12 @@ def load_arguments(self, _):
             "from the supplied symmetric key without further validation. All other command "
             "parameters aside from registration ID will be ignored.",
         )
+        context.argument(
+            "input_path",
+            options_list=["--input", "-i"],
+            help="Path to a file listing one registration ID per line. The derived device key of every "
+            "registration ID is written to stdout as newline delimited JSON, in input order. Ignores --output.",
+        )
 
     with self.argument_context("iot dps registration") as context:
         context.argument("registration_id", help="ID of device registration.")
@@ -1455,6 +1455,9 @@ def _load_central_monitors_help():
         - name: Receive all messages and parse message payload as JSON
           text: >
             az iot central diagnostics monitor-events --app-id {app_id} --output json
+        - name: Receive messages in batches of up to 100, keeping 500 messages of link credit per partition.
+          text: >
+            az iot central diagnostics monitor-events --app-id {app_id} --batch-size 100 --prefetch 500
     """
 
     helps[
@@ -1486,6 +1489,9 @@ def _load_central_monitors_help():
         - name: Filter device and specify an Event Hub consumer group to bind to.
           text: >
             az iot central diagnostics validate-messages --app-id {app_id} -d {device_id} --cg {consumer_group_name}
+        - name: Reuse devices and device templates resolved by a previous run.
+          text: >
+            az iot central diagnostics validate-messages --app-id {app_id} --template-cache ./template_cache.json
     """
 
     helps[
@@ -1501,6 +1507,10 @@ def _load_central_monitors_help():
         - name: Basic usage
           text: >
             az iot central diagnostics monitor-properties --app-id {app_id} -d {device_id}
+        - name: Monitor several devices and all edge devices from a single command.
+          text: >
+            az iot central diagnostics monitor-properties --app-id {app_id} --device-ids {device_id} {device_id}
+            --device-filter "type eq 'EdgeDevice'" --concurrency 16
     """
 
     helps[
@@ -5,8 +5,12 @@
 # --------------------------------------------------------------------------------------------
 
 
+from typing import List, Optional
+from azure.cli.core.azclierror import InvalidArgumentValueError, RequiredArgumentMissingError
 from azure.cli.core.commands import AzCliCommand
 from azext_iot.constants import CENTRAL_ENDPOINT
+from azext_iot.central.models.enum import ApiVersion
+from azext_iot.central.providers import CentralDeviceProvider
 from azext_iot.central.providers.monitor_provider import MonitorProvider
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.monitor.models.arguments import (
@@ -15,7 +19,11 @@ from azext_iot.monitor.models.arguments import (
     CentralHandlerArguments,
     TelemetryArguments,
 )
-from azext_iot.monitor.property import PropertyMonitor
+from azext_iot.monitor.property import (
+    DEFAULT_POLLING_CONCURRENCY,
+    PropertyMonitorScheduler,
+    create_property_monitors,
+)
 
 
 def validate_messages(
@@ -35,6 +43,7 @@ def validate_messages(
     minimum_severity=Severity.warning.name,
     token=None,
     central_dns_suffix=CENTRAL_ENDPOINT,
+    template_cache=None,
 ):
     telemetry_args = TelemetryArguments(
         cmd,
@@ -67,6 +76,7 @@ def validate_messages(
         consumer_group=consumer_group,
         central_dns_suffix=central_dns_suffix,
         central_handler_args=central_handler_args,
+        template_cache_file=template_cache,
     )
     provider.start_validate_messages(telemetry_args)
 
@@ -84,6 +94,10 @@ def monitor_events(
     yes=False,
     token=None,
     central_dns_suffix=CENTRAL_ENDPOINT,
+    prefetch=None,
+    batch_size=None,
+    stats=None,
+    stats_interval=None,
 ):
     telemetry_args = TelemetryArguments(
         cmd,
@@ -92,6 +106,10 @@ def monitor_events(
         enqueued_time=enqueued_time,
         repair=repair,
         yes=yes,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        stats=stats,
+        stats_interval=stats_interval,
     )
     common_parser_args = CommonParserArguments(
         properties=telemetry_args.properties, content_type="application/json"
@@ -122,34 +140,89 @@ def monitor_events(
 
 def monitor_properties(
     cmd,
-    device_id: str,
     app_id: str,
+    device_id: Optional[str] = None,
     token=None,
     central_dns_suffix=CENTRAL_ENDPOINT,
+    device_ids: Optional[List[str]] = None,
+    device_filter: Optional[str] = None,
+    concurrency: Optional[int] = None,
 ):
-    monitor = PropertyMonitor(
-        cmd=cmd,
+    scheduler = _build_property_scheduler(
+        cmd,
         app_id=app_id,
         device_id=device_id,
+        device_ids=device_ids,
+        device_filter=device_filter,
         token=token,
         central_dns_suffix=central_dns_suffix,
+        concurrency=concurrency,
     )
-    monitor.start_property_monitor()
+    scheduler.start(lambda monitor, twin: monitor.process_property_changes(twin))
 
 
 def validate_properties(
     cmd,
-    device_id: str,
     app_id: str,
+    device_id: Optional[str] = None,
     token=None,
     central_dns_suffix=CENTRAL_ENDPOINT,
     minimum_severity=Severity.warning.name,
+    device_ids: Optional[List[str]] = None,
+    device_filter: Optional[str] = None,
+    concurrency: Optional[int] = None,
 ):
-    monitor = PropertyMonitor(
-        cmd=cmd,
+    scheduler = _build_property_scheduler(
+        cmd,
         app_id=app_id,
         device_id=device_id,
+        device_ids=device_ids,
+        device_filter=device_filter,
+        token=token,
+        central_dns_suffix=central_dns_suffix,
+        concurrency=concurrency,
+    )
+    severity = Severity[minimum_severity]
+    scheduler.start(lambda monitor, twin: monitor.validate_property_changes(twin, severity))
+
+
+def _build_property_scheduler(
+    cmd,
+    app_id: str,
+    device_id: Optional[str],
+    device_ids: Optional[List[str]],
+    device_filter: Optional[str],
+    token,
+    central_dns_suffix,
+    concurrency: Optional[int],
+) -> PropertyMonitorScheduler:
+    if concurrency is not None and concurrency <= 0:
+        raise InvalidArgumentValueError("Concurrency must be greater than 0.")
+    concurrency = concurrency or DEFAULT_POLLING_CONCURRENCY
+
+    targets = ([device_id] if device_id else []) + (device_ids or [])
+    if device_filter:
+        provider = CentralDeviceProvider(
+            cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.ga.value
+        )
+        devices = provider.list_devices(
+            filter=device_filter, central_dns_suffix=central_dns_suffix
+        )
+        targets.extend(device.id for device in devices)
+    # keep the first occurrence of each device, in order
+    targets = list(dict.fromkeys(targets))
+
+    if not targets:
+        raise RequiredArgumentMissingError(
+            "Provide the devices to monitor with --device-id, --device-ids or --device-filter."
+        )
+
+    monitors = create_property_monitors(
+        cmd,
+        app_id=app_id,
+        device_ids=targets,
         token=token,
         central_dns_suffix=central_dns_suffix,
+        concurrency=concurrency,
     )
-    monitor.start_validate_property_monitor(Severity[minimum_severity])
+    return PropertyMonitorScheduler(monitors, concurrency=concurrency)
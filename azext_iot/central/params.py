@@ -20,7 +20,14 @@ from azext_iot.central.common import (
 from azure.cli.core.commands.parameters import get_three_state_flag, get_enum_type
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.central.models.enum import ApiVersion
-from azext_iot._params import event_msg_prop_type, event_timeout_type
+from azext_iot._params import (
+    event_msg_prop_type,
+    event_timeout_type,
+    event_prefetch_type,
+    event_batch_size_type,
+    event_stats_type,
+    event_stats_interval_type,
+)
 
 severity_type = CLIArgumentType(
     options_list=["--minimum-severity"],
@@ -341,6 +348,40 @@ def load_central_arguments(self, _):
             help="The IoT Edge Module ID if the device type is IoT Edge.",
         )
 
+    with self.argument_context("iot central diagnostics validate-messages") as context:
+        context.argument(
+            "template_cache",
+            options_list=["--template-cache"],
+            help="Local file used to persist resolved devices and device templates between runs. "
+            "Entries expire after 5 minutes; devices or templates that cannot be found are retried after 1 minute.",
+        )
+
+    with self.argument_context("iot central diagnostics") as context:
+        context.argument(
+            "device_ids",
+            options_list=["--device-ids"],
+            nargs="+",
+            help="Space-separated list of device IDs to monitor, in addition to --device-id.",
+        )
+        context.argument(
+            "device_filter",
+            options_list=["--device-filter"],
+            help="OData filter selecting additional devices to monitor. "
+            "Example: \"type eq 'EdgeDevice'\"",
+        )
+        context.argument(
+            "concurrency",
+            options_list=["--concurrency"],
+            type=int,
+            help="Maximum number of device twins requested at the same time. Default: 8.",
+        )
+
+    with self.argument_context("iot central diagnostics monitor-events") as context:
+        context.argument("prefetch", arg_type=event_prefetch_type)
+        context.argument("batch_size", arg_type=event_batch_size_type)
+        context.argument("stats", arg_type=event_stats_type)
+        context.argument("stats_interval", arg_type=event_stats_interval_type)
+
     with self.argument_context("iot central role") as context:
         context.argument(
             "role_id",
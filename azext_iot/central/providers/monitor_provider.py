@@ -7,11 +7,12 @@
 from azext_iot.central.models.enum import ApiVersion
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azure.cli.core.commands import AzCliCommand
+from typing import Optional
 from azext_iot.central.providers import (
     CentralDeviceProvider,
     CentralDeviceTemplateProvider,
 )
-
+from azext_iot.monitor.central_cache import CentralTemplateCache
 from azext_iot.monitor.models.arguments import (
     CentralHandlerArguments,
     TelemetryArguments,
@@ -31,6 +32,7 @@ class MonitorProvider:
         consumer_group: str,
         central_handler_args: CentralHandlerArguments,
         central_dns_suffix: str,
+        template_cache_file: Optional[str] = None,
     ):
         central_device_provider = CentralDeviceProvider(
             cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.ga.value
@@ -38,6 +40,13 @@ class MonitorProvider:
         central_template_provider = CentralDeviceTemplateProvider(
             cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.ga.value
         )
+        self._template_cache = CentralTemplateCache(
+            cmd=cmd,
+            app_id=app_id,
+            token=token,
+            central_dns_suffix=central_dns_suffix,
+            cache_file=template_cache_file,
+        )
         self._targets = self._build_targets(
             cmd=cmd,
             app_id=app_id,
@@ -50,10 +59,19 @@ class MonitorProvider:
             central_template_provider=central_template_provider,
             central_handler_args=central_handler_args,
             central_dns_suffix=central_dns_suffix,
+            template_cache=self._template_cache,
         )
 
     def start_monitor_events(self, telemetry_args: TelemetryArguments):
         from azext_iot.monitor import telemetry
+        from azext_iot.monitor.stats import DEFAULT_STATS_INTERVAL, MonitorStats
+
+        stats = None
+        if telemetry_args.stats:
+            stats = MonitorStats(
+                stats_format=telemetry_args.stats,
+                interval=telemetry_args.stats_interval or DEFAULT_STATS_INTERVAL,
+            )
 
         telemetry.start_multiple_monitors(
             targets=self._targets,
@@ -61,18 +79,25 @@ class MonitorProvider:
             on_start_string=self._handler.generate_startup_string("Monitoring"),
             on_message_received=self._handler.parse_message,
             timeout=telemetry_args.timeout,
+            prefetch=telemetry_args.prefetch,
+            batch_size=telemetry_args.batch_size,
+            on_batch_received=self._handler.parse_messages,
+            stats=stats,
         )
 
     def start_validate_messages(self, telemetry_args: TelemetryArguments):
         from azext_iot.monitor import telemetry
 
-        telemetry.start_multiple_monitors(
-            targets=self._targets,
-            enqueued_time_utc=telemetry_args.enqueued_time,
-            on_start_string=self._handler.generate_startup_string("Validating"),
-            on_message_received=self._handler.validate_message,
-            timeout=telemetry_args.timeout,
-        )
+        try:
+            telemetry.start_multiple_monitors(
+                targets=self._targets,
+                enqueued_time_utc=telemetry_args.enqueued_time,
+                on_start_string=self._handler.generate_startup_string("Validating"),
+                on_message_received=self._handler.validate_message,
+                timeout=telemetry_args.timeout,
+            )
+        finally:
+            self._template_cache.save()
 
     def _build_targets(
         self,
@@ -97,6 +122,7 @@ class MonitorProvider:
         central_template_provider: CentralDeviceTemplateProvider,
         central_handler_args: CentralHandlerArguments,
         central_dns_suffix=CENTRAL_ENDPOINT,
+        template_cache: Optional[CentralTemplateCache] = None,
     ):
         from azext_iot.monitor.handlers import CentralHandler
 
@@ -105,4 +131,5 @@ class MonitorProvider:
             central_template_provider=central_template_provider,
             central_handler_args=central_handler_args,
             central_dns_suffix=central_dns_suffix,
+            template_cache=template_cache,
         )
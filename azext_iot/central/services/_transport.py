@@ -0,0 +1,145 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# Nothing in this file should be used outside of service/central
+
+import asyncio
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from time import sleep
+from typing import List
+from knack.log import get_logger
+from requests import Response
+from requests.adapters import HTTPAdapter
+from azext_iot._factory import SDK_POOL_CONNECTIONS, SDK_POOL_MAXSIZE
+from azext_iot.iothub.providers.base import RETRY_STATUS_CODES, get_retry_delay
+
+logger = get_logger(__name__)
+
+CENTRAL_RETRIES = 3
+# Methods that are retried after a server error. Throttled requests were not processed
+# by the service and are retried for every method.
+IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+THROTTLED_STATUS_CODE = 429
+DEFAULT_REQUEST_CONCURRENCY = 8
+
+
+class CentralHttpTransport(object):
+    """
+    Process wide HTTP transport of the IoT Central services.
+
+    Requests are sent through one keep-alive session with pooled connections, so
+    consecutive and concurrent calls to an app reuse their TCP and TLS connections.
+    Throttled and temporarily unavailable requests are retried with backoff, honouring
+    the Retry-After header. The returned response is the last one received, so callers
+    handle errors as they would for a single request.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = CENTRAL_RETRIES,
+        pool_connections: int = SDK_POOL_CONNECTIONS,
+        pool_maxsize: int = SDK_POOL_MAXSIZE,
+    ):
+        self.max_retries = max_retries
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+        self._lock = Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        method = method.upper()
+        attempt = 0
+        while True:
+            response = self.session.request(method, url, **kwargs)
+            if not self._should_retry(method, response.status_code, attempt):
+                return response
+            delay = get_retry_delay(response, attempt)
+            logger.info(
+                "Request throttled (%s), retrying in %.1f seconds.",
+                response.status_code,
+                delay,
+            )
+            sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> Response:
+        return self.request("DELETE", url, **kwargs)
+
+    async def request_async(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Awaitable request, sent on the pooled session by a worker thread of the running
+        event loop.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, partial(self.request, method, url, **kwargs))
+
+    def gather(
+        self, requests_kwargs: List[dict], concurrency: int = DEFAULT_REQUEST_CONCURRENCY
+    ) -> List[Response]:
+        """
+        Send requests concurrently, at most concurrency at a time, and return their
+        responses in order. Every request is a dict of request arguments, including
+        method and url.
+        """
+
+        async def send(semaphore, kwargs):
+            async with semaphore:
+                return await self.request_async(**kwargs)
+
+        async def send_all():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*[send(semaphore, kwargs) for kwargs in requests_kwargs])
+
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        loop.set_default_executor(executor)
+        try:
+            return loop.run_until_complete(send_all())
+        finally:
+            loop.close()
+            executor.shutdown(wait=True)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _should_retry(self, method: str, status_code: int, attempt: int) -> bool:
+        if status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+            return False
+        return status_code == THROTTLED_STATUS_CODE or method in IDEMPOTENT_METHODS
+
+
+transport = CentralHttpTransport()
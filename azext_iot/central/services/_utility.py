@@ -16,7 +16,7 @@ from azure.cli.core.azclierror import (
 from azext_iot import constants
 from azext_iot.common import auth
 
-import requests
+from azext_iot.central.services._transport import transport
 import uuid
 from importlib import import_module
 from azext_iot.central.models.enum import ApiVersion
@@ -42,7 +42,7 @@ def make_api_call(
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
-    response = requests.request(
+    response = transport.request(
         url=url,
         method=method.upper(),
         headers=headers,
@@ -6,7 +6,7 @@
 # This is largely derived from https://docs.microsoft.com/en-us/rest/api/iotcentral/devices
 
 from typing import List
-import requests
+from azext_iot.central.services._transport import transport
 from azext_iot.central.common import API_VERSION, API_VERSION_PREVIEW
 from azext_iot.central.models.edge import EdgeModule
 from azext_iot.common.auth import get_aad_token
@@ -112,7 +112,7 @@ def list_devices(
 
     pages_processed = 0
     while (max_pages == 0 or pages_processed < max_pages) and url:
-        response = requests.get(
+        response = transport.get(
             url,
             headers=headers,
             params=query_parameters if pages_processed == 0 else None,
@@ -169,7 +169,7 @@ def get_device_registration_summary(
     )
 
     while url:
-        response = requests.get(
+        response = transport.get(
             url, headers=headers, verify=not should_disable_connection_verify()
         )
         result = _utility.try_extract_result(response)
@@ -240,7 +240,7 @@ def create_device(
 
     data = _utility.get_object(payload, MODEL, api_version)
     json = _utility.to_camel_dict(dict_clean(parse_entity(data)))
-    response = requests.put(url, headers=headers, json=json, params=query_parameters)
+    response = transport.put(url, headers=headers, json=json, params=query_parameters)
     result = _utility.try_extract_result(response)
 
     return _utility.get_object(result, MODEL, api_version)
@@ -318,7 +318,7 @@ def update_device(
     data = _utility.get_object(payload, MODEL, api_version)
     json = _utility.to_camel_dict(dict_clean(parse_entity(data)))
 
-    response = requests.patch(
+    response = transport.patch(
         url,
         headers=headers,
         json=json,
@@ -389,7 +389,7 @@ def list_relationships(
     relationships = []
     pages_processed = 0
     while (max_pages == 0 or pages_processed < max_pages) and url:
-        response = requests.get(
+        response = transport.get(
             url,
             headers=headers,
             params=query_parameters if pages_processed == 0 else None,
@@ -608,7 +608,7 @@ def run_command(
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
-    response = requests.post(
+    response = transport.post(
         url, headers=headers, json=payload, params=query_parameters
     )
 
@@ -755,7 +755,7 @@ def get_device_twin(
 
     # Construct parameters
 
-    response = requests.get(
+    response = transport.get(
         url,
         headers=headers,
         verify=not should_disable_connection_verify(),
@@ -810,7 +810,7 @@ def run_manual_failover(
         see https://github.com/iot-for-all/iot-central-high-availability-clients#readme for more information"""
         )
 
-    response = requests.post(
+    response = transport.post(
         url, headers=headers, verify=not should_disable_connection_verify(), json=json
     )
     _utility.log_response_debug(response=response, logger=logger)
@@ -842,7 +842,7 @@ def run_manual_failback(
         app_id, central_dns_suffix, "system/iothub/devices", device_id
     )
     headers = _utility.get_headers(token, cmd)
-    response = requests.post(
+    response = transport.post(
         url, headers=headers, verify=not should_disable_connection_verify()
     )
     _utility.log_response_debug(response=response, logger=logger)
@@ -879,7 +879,7 @@ def purge_c2d_messages(
         app_id, central_dns_suffix, "system/iothub/devices", device_id
     )
     headers = _utility.get_headers(token, cmd)
-    response = requests.delete(url, headers=headers)
+    response = transport.delete(url, headers=headers)
     return _utility.try_extract_result(response)
 
 
@@ -916,7 +916,7 @@ def list_device_modules(
 
     # Construct parameters
 
-    response = requests.get(
+    response = transport.get(
         url,
         headers=headers,
         verify=not should_disable_connection_verify(),
@@ -969,7 +969,7 @@ def restart_device_module(
 
     # Construct parameters
 
-    response = requests.post(
+    response = transport.post(
         url,
         json=json,
         headers=headers,
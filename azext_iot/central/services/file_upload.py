@@ -5,7 +5,7 @@
 # --------------------------------------------------------------------------------------------
 # This is largely derived from https://docs.microsoft.com/en-us/rest/api/iotcentral/fileuploads
 
-import requests
+from azext_iot.central.services._transport import transport
 from typing import Union
 from knack.log import get_logger
 
@@ -37,7 +37,7 @@ def _make_call(
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
-    response = requests.request(
+    response = transport.request(
         url=url,
         method=method.upper(),
         headers=headers,
@@ -160,11 +160,11 @@ def createorupdate_fileupload(
         payload["sasTtl"] = sasTtl
 
     if update:
-        response = requests.patch(
+        response = transport.patch(
             url, headers=headers, json=payload, params=query_parameters
         )
     else:
-        response = requests.put(
+        response = transport.put(
             url, headers=headers, json=payload, params=query_parameters
         )
     result = _utility.try_extract_result(response)
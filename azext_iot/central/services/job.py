@@ -5,7 +5,7 @@
 # --------------------------------------------------------------------------------------------
 # This is largely derived from https://docs.microsoft.com/en-us/rest/api/iotcentral/jobs
 
-import requests
+from azext_iot.central.services._transport import transport
 from typing import List, Union
 from knack.log import get_logger
 
@@ -48,7 +48,7 @@ def _call_job(
     if method is None:
         method = "get"
 
-    response = requests.request(
+    response = transport.request(
         method=method.upper(),
         url=url,
         headers=headers,
@@ -99,7 +99,7 @@ def _list_job(
 
     pages_processed = 0
     while (max_pages == 0 or pages_processed < max_pages) and url:
-        response = requests.get(
+        response = transport.get(
             url,
             headers=headers,
             params=query_parameters,
@@ -399,7 +399,7 @@ def create_job(
             "batch": threshold_batch,
         }
 
-    response = requests.put(url, headers=headers, json=payload, params=query_parameters)
+    response = transport.put(url, headers=headers, json=payload, params=query_parameters)
     result = _utility.try_extract_result(response)
 
     return _utility.get_object(result, "Job", api_version)
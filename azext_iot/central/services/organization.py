@@ -5,7 +5,7 @@
 # --------------------------------------------------------------------------------------------
 # This is largely derived from https://docs.microsoft.com/en-us/rest/api/iotcentral/roles
 
-import requests
+from azext_iot.central.services._transport import transport
 from knack.log import get_logger
 from typing import List, Union
 
@@ -47,7 +47,7 @@ def _make_call(
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
-    response = requests.request(
+    response = transport.request(
         url=url,
         method=method.upper(),
         headers=headers,
@@ -6,7 +6,7 @@
 # This is largely derived from https://docs.microsoft.com/en-us/rest/api/iotcentral/roles
 
 from typing import List
-import requests
+from azext_iot.central.services._transport import transport
 
 from knack.log import get_logger
 
@@ -54,7 +54,7 @@ def get_role(
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
-    response = requests.get(
+    response = transport.get(
         url,
         headers=headers,
         params=query_parameters,
@@ -99,7 +99,7 @@ def list_roles(
 
     pages_processed = 0
     while (max_pages == 0 or pages_processed < max_pages) and url:
-        response = requests.get(
+        response = transport.get(
             url,
             headers=headers,
             params=query_parameters,
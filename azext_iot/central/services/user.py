@@ -4,7 +4,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import requests
+from azext_iot.central.services._transport import transport
 from typing import List
 from knack.log import get_logger
 
@@ -52,7 +52,7 @@ def _make_call(
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
-    response = requests.request(
+    response = transport.request(
         url=url,
         method=method.upper(),
         headers=headers,
@@ -116,6 +116,7 @@ def load_command_table(self, _):
         "iot hub configuration", command_type=iothub_ops
     ) as cmd_group:
         cmd_group.command("show-metric", "iot_hub_configuration_metric_show")
+        cmd_group.command("evaluate-metrics", "iot_hub_configuration_metrics_evaluate")
         cmd_group.command("create", "iot_hub_configuration_create")
         cmd_group.show_command("show", "iot_hub_configuration_show")
         cmd_group.command("list", "iot_hub_configuration_list")
@@ -144,6 +145,8 @@ def load_command_table(self, _):
         "iot edge deployment", command_type=iothub_ops
     ) as cmd_group:
         cmd_group.command("show-metric", "iot_edge_deployment_metric_show")
+        cmd_group.command("evaluate-metrics", "iot_edge_deployment_metrics_evaluate")
+        cmd_group.command("validate", "iot_edge_deployment_validate")
         cmd_group.command("create", "iot_edge_deployment_create")
         cmd_group.show_command("show", "iot_hub_configuration_show")
         cmd_group.command("list", "iot_edge_deployment_list")
@@ -5,7 +5,55 @@
 # --------------------------------------------------------------------------------------------
 
 from azure.cli.core._profile import Profile
+from datetime import datetime
+from knack.log import get_logger
 from msrest.authentication import Authentication
+from threading import Lock
+from time import time
+from typing import Optional
+
+logger = get_logger(__name__)
+
+# Seconds before expiry at which a cached token is acquired again.
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_EXPIRES_ON_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class AadTokenCache(object):
+    """
+    In process cache of AAD access tokens per cloud and resource.
+
+    Tokens are shared by every service, provider and SDK client of the process and are
+    used until shortly before they expire, instead of being acquired from the profile
+    for every request.
+    """
+
+    def __init__(self, refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._lock = Lock()
+
+    def get(self, key, acquire) -> dict:
+        """
+        Returns the cached token of the key, or the token returned with its expiry by
+        acquire when there is none or it is about to expire.
+        """
+        # concurrent callers wait for a single acquisition
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry and entry[1] - self.refresh_margin > time():
+                return dict(entry[0])
+            token, expires_at = acquire()
+            # tokens with an unknown expiry are not cached
+            if expires_at:
+                self._tokens[key] = (dict(token), expires_at)
+            return token
+
+    def clear(self):
+        self._tokens.clear()
+
+
+aad_token_cache = AadTokenCache()
 
 
 def get_aad_token(cmd, resource=None):
@@ -15,17 +63,41 @@ def get_aad_token(cmd, resource=None):
     Use 'az cloud show' command for other Azure resources
     """
     resource = resource or cmd.cli_ctx.cloud.endpoints.active_directory_resource_id
-    profile = Profile(cli_ctx=cmd.cli_ctx)
-    creds, subscription, tenant = profile.get_raw_token(
-        subscription=None, resource=resource
-    )
-    return {
-        "tokenType": creds[0],
-        "accessToken": creds[1],
-        "expiresOn": creds[2].get("expiresOn", "N/A"),
-        "subscription": subscription,
-        "tenant": tenant,
-    }
+
+    def acquire():
+        profile = Profile(cli_ctx=cmd.cli_ctx)
+        creds, subscription, tenant = profile.get_raw_token(
+            subscription=None, resource=resource
+        )
+        token = {
+            "tokenType": creds[0],
+            "accessToken": creds[1],
+            "expiresOn": creds[2].get("expiresOn", "N/A"),
+            "subscription": subscription,
+            "tenant": tenant,
+        }
+        return token, _get_token_expiry(creds[2])
+
+    cloud_name = getattr(getattr(cmd.cli_ctx, "cloud", None), "name", None)
+    return aad_token_cache.get((cloud_name, resource), acquire)
+
+
+def _get_token_expiry(token_entry) -> Optional[float]:
+    """Returns the expiry of a profile token entry as seconds since the epoch."""
+    expires_on = token_entry.get("expires_on", None)
+    if expires_on:
+        try:
+            return float(expires_on)
+        except (TypeError, ValueError):
+            pass
+    expires_on = token_entry.get("expiresOn", None)
+    if isinstance(expires_on, str):
+        try:
+            # profile token entries use local time
+            return datetime.strptime(expires_on, TOKEN_EXPIRES_ON_FORMAT).timestamp()
+        except ValueError:
+            logger.debug("Unable to parse token expiry %s, token is not cached.", expires_on)
+    return None
 
 
 class IoTOAuth(Authentication):
@@ -5,14 +5,18 @@
 # --------------------------------------------------------------------------------------------
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from azure.cli.core.azclierror import ResourceNotFoundError
 from azure.core.exceptions import HttpResponseError
 from knack.log import get_logger
+from azext_iot.common.discovery_cache import DiscoveryCache
 from azext_iot.common.shared import AuthenticationTypeDataplane
 from typing import Any, Dict, List
 from types import SimpleNamespace
 
 logger = get_logger(__name__)
+# Resources whose policies are resolved concurrently by get_targets.
+DISCOVERY_CONCURRENCY = 8
 POLICY_ERROR_TEMPLATE = (
     "Unable to discover a priviledged policy for {0}: {1}, in subscription {2}. "
     "When interfacing with an {0}, the IoT extension requires any single policy with "
@@ -268,6 +272,9 @@ class BaseDiscovery(ABC):
         resource and return the first usable policy (the first policy that the IoT
         extension can use).
 
+        Resolved targets are cached on disk for reuse by later invocations, unless the
+        discovery cache is disabled with 'az config set iot.discovery_cache=false'.
+
         Raises ResourceNotFoundError if no resource is found.
 
         :param resource_name: Resource Name
@@ -289,8 +296,48 @@ class BaseDiscovery(ABC):
             return self.get_target_by_cstring(connection_string=cstring)
 
         resource_group_name = resource_group_name or kwargs.get("rg")
+        cache, cache_key = self._get_cache(resource_name, resource_group_name, **kwargs)
+        if cache:
+            target = cache.get(cache_key)
+            if target:
+                target["cmd"] = self.cmd
+                return target
+
+        target = self._discover_target(resource_name, resource_group_name, **kwargs)
+        if cache:
+            cache.set(cache_key, target)
+        return target
+
+    def _get_cache(self, resource_name: str, resource_group_name: str = None, **kwargs):
+        """
+        Returns the discovery cache and the cache key of a target, or None when the target
+        cannot be cached.
+        """
+        cli_ctx = getattr(self.cmd, "cli_ctx", None)
+        cache = DiscoveryCache.from_cli_ctx(cli_ctx) if cli_ctx and resource_name else None
+        if not cache:
+            return None, None
+
+        self._initialize_client()
+        cache_key = DiscoveryCache.make_key(
+            getattr(cli_ctx.cloud, "name", None),
+            self.sub_id,
+            self.resource_type,
+            resource_name,
+            resource_group_name,
+            kwargs.get("policy_name", "auto"),
+            kwargs.get("key_type", "primary"),
+            kwargs.get("auth_type") or AuthenticationTypeDataplane.key.value,
+            bool(kwargs.get("include_events", False)),
+        )
+        return cache, cache_key
+
+    def _discover_target(self, resource_name: str, resource_group_name: str = None, **kwargs) -> Dict[str, str]:
         resource = self.find_resource(resource_name=resource_name, rg=resource_group_name)
+        return self._resolve_target(resource=resource, **kwargs)
 
+    def _resolve_target(self, resource, **kwargs) -> Dict[str, str]:
+        """Finds the policy of an already fetched resource and builds its target."""
         key_type = kwargs.get("key_type", "primary")
 
         # Azure AD auth path
@@ -323,30 +370,48 @@ class BaseDiscovery(ABC):
             **kwargs
         )
 
-    def get_targets(self, resource_group_name: str = None, **kwargs) -> List[Dict[str, str]]:
+    def get_targets(
+        self, resource_group_name: str = None, concurrency: int = DISCOVERY_CONCURRENCY, **kwargs
+    ) -> List[Dict[str, str]]:
         """
         Returns a list of targets (dicts representing a resource's connection string parts)
         that are usable by the extension within the subscription (and resource group if
         provided).
 
+        Policies of the listed resources are resolved concurrently. Resources that cannot
+        be accessed are logged and skipped.
+
         :param rg: Resource Group
         :type rg: str
+        :param concurrency: Maximum number of resources resolved at the same time
+        :type concurrency: int
 
         :return: Resources
         :rtype: list[dict]
         """
-        targets = []
         resources = self.get_resources(rg=resource_group_name)
-        if resources:
-            for resource in resources:
+        if not resources:
+            return []
+
+        def resolve(resource):
+            rg = resource.additional_properties.get("resourcegroup")
+            cache, cache_key = self._get_cache(resource.name, rg, **kwargs)
+            target = cache.get(cache_key) if cache else None
+            if target:
+                target["cmd"] = self.cmd
+                return target
+            # the listed resource is reused instead of being fetched again by name
+            target = self._resolve_target(resource=resource, **kwargs)
+            if cache:
+                cache.set(cache_key, target)
+            return target
+
+        targets = []
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(resources)))) as executor:
+            futures = [executor.submit(resolve, resource) for resource in resources]
+            for resource, future in zip(resources, futures):
                 try:
-                    targets.append(
-                        self.get_target(
-                            resource_name=resource.name,
-                            resource_group_name=resource.additional_properties.get("resourcegroup"),
-                            **kwargs
-                        )
-                    )
+                    targets.append(future.result())
                 except (HttpResponseError, ResourceNotFoundError) as e:
                     logger.warning("Could not access %s. %s", resource.name, e)
 
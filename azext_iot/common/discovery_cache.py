@@ -0,0 +1,142 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import tempfile
+
+from time import time
+from typing import Optional
+from urllib.parse import urlparse
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# Config section and options, settable with 'az config set' or AZURE_IOT_DISCOVERY_CACHE(_TTL).
+DISCOVERY_CACHE_SECTION = "iot"
+DISCOVERY_CACHE_OPTION = "discovery_cache"
+DISCOVERY_CACHE_TTL_OPTION = "discovery_cache_ttl"
+# Seconds a resolved target is reused before it is discovered again.
+DISCOVERY_CACHE_TTL = 3600
+DISCOVERY_CACHE_DIRECTORY = os.path.join("object_cache", "iot_discovery")
+
+
+def get_cache_directory() -> str:
+    config_dir = os.getenv("AZURE_CONFIG_DIR") or os.path.expanduser(os.path.join("~", ".azure"))
+    return os.path.join(config_dir, DISCOVERY_CACHE_DIRECTORY)
+
+
+class DiscoveryCache(object):
+    """
+    On disk cache of resolved discovery targets, shared between CLI invocations.
+
+    Targets include access keys, so every entry is written to its own file, readable only
+    by the current user, in a directory only the current user can list. Entries expire
+    after a time to live and are removed when the resource rejects their credentials.
+
+    :ivar ttl: Seconds an entry is valid for.
+    :vartype ttl: int
+    """
+
+    def __init__(self, ttl: int = DISCOVERY_CACHE_TTL):
+        self.ttl = ttl
+        self.directory = get_cache_directory()
+
+    @classmethod
+    def from_cli_ctx(cls, cli_ctx) -> Optional["DiscoveryCache"]:
+        """
+        Returns the discovery cache, or None when caching is disabled in the CLI configuration.
+        """
+        config = getattr(cli_ctx, "config", None)
+        if not config:
+            return None
+        try:
+            if not config.getboolean(DISCOVERY_CACHE_SECTION, DISCOVERY_CACHE_OPTION, fallback=True):
+                return None
+            ttl = config.getint(DISCOVERY_CACHE_SECTION, DISCOVERY_CACHE_TTL_OPTION, fallback=DISCOVERY_CACHE_TTL)
+        except ValueError:
+            logger.warning("Invalid discovery cache configuration, discovery cache is disabled.")
+            return None
+        return cls(ttl=ttl) if ttl > 0 else None
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        parts = [part.lower() if isinstance(part, str) else part for part in parts]
+        return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._read(self._get_path(key))
+        if not entry:
+            return None
+        if entry.get("expiresOn", 0) <= time():
+            self.remove(key)
+            return None
+        logger.info("Using cached target for %s.", entry.get("entity"))
+        return entry.get("target")
+
+    def set(self, key: str, target: dict):
+        entry = {
+            "expiresOn": time() + self.ttl,
+            "entity": target.get("entity"),
+            # the command is bound to the current invocation
+            "target": {k: v for k, v in target.items() if k != "cmd"},
+        }
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            # mkstemp creates the file readable and writable by the current user only
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self._get_path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug("Unable to cache target for %s: %s", entry["entity"], e)
+
+    def remove(self, key: str):
+        try:
+            os.remove(self._get_path(key))
+        except OSError:
+            pass
+
+    def invalidate_entity(self, entity: str):
+        """Remove every cached target of the given host name."""
+        if not entity or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            entry = self._read(path)
+            if entry and str(entry.get("entity", "")).lower() == entity.lower():
+                logger.info("Removing cached target for %s.", entity)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, "{}.json".format(key))
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def invalidate_cached_targets(error):
+    """
+    Remove cached targets of the host that rejected a request as unauthorized, so that the
+    next invocation discovers the resource and its keys again.
+    """
+    request = getattr(getattr(error, "response", None), "request", None)
+    url = getattr(request, "url", None)
+    if not url:
+        return
+    try:
+        DiscoveryCache().invalidate_entity(urlparse(url).hostname)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.debug("Unable to invalidate cached targets: %s", e)
@@ -10,8 +10,11 @@ sas_token_auth: Module containing Shared Access Signature token class.
 """
 
 from base64 import b64encode, b64decode
+from collections import OrderedDict
+from functools import lru_cache
 from hashlib import sha256
 from hmac import HMAC
+from threading import Lock
 from time import time
 try:
     from urllib import (urlencode, quote_plus)
@@ -19,6 +22,68 @@ except ImportError:
     from urllib.parse import (urlencode, quote_plus)
 from msrest.authentication import Authentication
 
+# Maximum number of generated tokens kept in the process wide token cache.
+SAS_TOKEN_CACHE_SIZE = 65536
+# Maximum seconds a cached token is reused for. Tokens are never reused for more than
+# a tenth of their lifetime, so a cached token keeps at least 90% of the requested expiry.
+SAS_TOKEN_CACHE_BUCKET = 60
+# Number of decoded keys kept with their precomputed HMAC state.
+SIGNING_KEY_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=SIGNING_KEY_CACHE_SIZE)
+def _get_signer(key):
+    return HMAC(b64decode(key), digestmod=sha256)
+
+
+def sign(key, message):
+    """
+    Sign message with a base64 encoded key using HMAC-SHA256.
+
+    Decoding the key and its HMAC key schedule are cached per key, so signing many
+    messages with one key, such as deriving keys for a device fleet, only hashes the message.
+
+    Returns:
+        signature (bytes): base64 encoded signature.
+    """
+    signer = _get_signer(key).copy()
+    signer.update(message.encode('utf-8') if isinstance(message, str) else message)
+    return b64encode(signer.digest())
+
+
+class SasTokenCache(object):
+    """
+    Thread safe, size bounded LRU cache of generated SAS tokens.
+    """
+    def __init__(self, max_size=SAS_TOKEN_CACHE_SIZE):
+        self._max_size = max_size
+        self._tokens = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is not None:
+                self._tokens.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        with self._lock:
+            self._tokens[key] = token
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self._max_size:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+token_cache = SasTokenCache()
+
 
 class SasTokenAuthentication(Authentication):
     """
@@ -75,10 +140,24 @@ class SasTokenAuthentication(Authentication):
         Returns:
             result (str): SAS token as string literal.
         """
+        if absolute:
+            return self._build_token(int(self.expiry))
+
+        # tokens generated within the same bucket for the same resource, policy, key and
+        # expiry are interchangeable, so unexpired tokens are served from the cache
+        now = time()
+        bucket = max(1, min(SAS_TOKEN_CACHE_BUCKET, self.expiry // 10))
+        cache_key = (self.uri, self.policy, self.key, self.expiry, int(now // bucket))
+        token = token_cache.get(cache_key)
+        if token is None:
+            token = self._build_token(int(now + self.expiry))
+            token_cache.set(cache_key, token)
+        return token
+
+    def _build_token(self, ttl):
         encoded_uri = quote_plus(self.uri)
-        ttl = int(self.expiry) if absolute else int(time() + self.expiry)
         sign_key = '%s\n%d' % (encoded_uri, ttl)
-        signature = b64encode(HMAC(b64decode(self.key), sign_key.encode('utf-8'), sha256).digest())
+        signature = sign(self.key, sign_key)
 
         result = {
             'sr': self.uri,
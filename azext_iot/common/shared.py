@@ -234,6 +234,16 @@ class RenewKeyType(Enum):
     swap = "swap"
 
 
+class DeviceBulkOperationType(Enum):
+    """
+    Registry bulk operation applied to device identities.
+    """
+
+    create = "create"
+    update = "update"
+    delete = "delete"
+
+
 class IoTHubStateType(Enum):
     """
     IoT Hub State Property
@@ -16,8 +16,6 @@ import json
 import os
 import sys
 import re
-import hmac
-import hashlib
 
 from threading import Event, Thread
 from datetime import datetime
@@ -389,6 +387,9 @@ def handle_service_exception(e):
     if op_status == 400:
         raise BadRequestError(err)
     if op_status == 401:
+        from azext_iot.common.discovery_cache import invalidate_cached_targets
+
+        invalidate_cached_targets(e)
         raise UnauthorizedError(err)
     if op_status == 403:
         raise ForbiddenError(err)
@@ -441,6 +442,31 @@ def init_monitoring(cmd, timeout, properties, enqueued_time, repair, yes, messag
     return (enqueued_time, properties, timeout, output, message_count)
 
 
+def init_receive_settings(prefetch: Optional[int] = None, batch_size: Optional[int] = None):
+    """
+    Resolve the AMQP link credit (prefetch) and receive batch size for the event monitor.
+    When batching without an explicit prefetch, the link credit defaults to the batch size.
+    """
+    if prefetch is not None and prefetch < 0:
+        raise InvalidArgumentValueError("Prefetch must be 0 or greater.")
+
+    if batch_size is not None and batch_size <= 0:
+        raise InvalidArgumentValueError("Batch size must be greater than 0.")
+
+    if not batch_size:
+        return (prefetch or 0, None)
+
+    if prefetch is None:
+        prefetch = batch_size
+
+    if batch_size > prefetch:
+        raise InvalidArgumentValueError(
+            "Batch size ({}) cannot be greater than prefetch ({}).".format(batch_size, prefetch)
+        )
+
+    return (prefetch, batch_size)
+
+
 def dict_clean(d):
     """Remove None from dictionary"""
     if not isinstance(d, dict):
@@ -558,13 +584,9 @@ def compute_device_key(primary_key, registration_id):
     Returns:
         device key
     """
-    secret = base64.b64decode(primary_key)
-    device_key = base64.b64encode(
-        hmac.new(
-            secret, msg=registration_id.encode("utf8"), digestmod=hashlib.sha256
-        ).digest()
-    )
-    return device_key
+    from azext_iot.common.sas_token_auth import sign
+
+    return sign(primary_key, registration_id)
 
 
 def generate_key(byte_length=32):
@@ -5,6 +5,7 @@
 # --------------------------------------------------------------------------------------------
 
 from azure.cli.core.azclierror import AzureResponseError
+from azext_iot.common.discovery_cache import DiscoveryCache
 from azext_iot.digitaltwins.providers.resource import ResourceProvider
 from azext_iot.sdk.digitaltwins.dataplane import AzureDigitalTwinsAPI
 from azext_iot.sdk.digitaltwins.dataplane.models import ErrorResponseException
@@ -36,17 +37,38 @@ class DigitalTwinsProvider(object):
             self.name = self.name[len(http_prefix) :]
 
         if not all([valid_hostname(self.name), "." in self.name]):
-            instance = self.rp.find_instance(
-                name=self.name, resource_group_name=self.rg
-            )
-            host_name = instance.host_name
-            if not host_name:
-                raise AzureResponseError("Instance has invalid hostName. Aborting operation...")
+            host_name = self._find_host_name()
         else:
             host_name = self.name
 
         return "https://{}".format(host_name)
 
+    def _find_host_name(self):
+        from azure.cli.core.commands.client_factory import get_subscription_id
+
+        cache = DiscoveryCache.from_cli_ctx(getattr(self.cmd, "cli_ctx", None))
+        if cache:
+            cache_key = DiscoveryCache.make_key(
+                self.cmd.cli_ctx.cloud.name,
+                get_subscription_id(self.cmd.cli_ctx),
+                self.resource_id,
+                self.name,
+                self.rg,
+            )
+            target = cache.get(cache_key)
+            if target:
+                return target["entity"]
+
+        instance = self.rp.find_instance(
+            name=self.name, resource_group_name=self.rg
+        )
+        host_name = instance.host_name
+        if not host_name:
+            raise AzureResponseError("Instance has invalid hostName. Aborting operation...")
+        if cache:
+            cache.set(cache_key, {"entity": host_name})
+        return host_name
+
     def get_sdk(self):
         from azure.cli.core.commands.client_factory import get_mgmt_service_client
 
@@ -93,6 +93,130 @@ def load_iothub_help():
             az iot hub job cancel --hub-name {iothub_name} --job-id {job_id}
     """
 
+    helps["iot hub device-identity bulk"] = """
+        type: group
+        short-summary: Create, update or delete many IoT Hub device identities through the registry bulk API.
+        long-summary: |
+                      Devices are read from a file with one device identity JSON object or plain device id per line
+                      and sent in registry bulk requests of up to 100 devices, several of them concurrently.
+                      Throttled requests are retried with exponential backoff, and a result per device is written
+                      to a result file as one JSON object per line.
+    """
+
+    helps["iot hub device-identity bulk create"] = """
+        type: command
+        short-summary: Create the device identities listed in an input file.
+        long-summary: |
+                      Each line is a device identity as returned by 'az iot hub device-identity show', for example
+                      {"deviceId": "d1", "capabilities": {"iotEdge": true}}, or a plain device id.
+                      Devices without authentication get auto-generated symmetric keys.
+
+        examples:
+        - name: Create all devices listed in devices.jsonl and write per device results to the default result file.
+          text: >
+            az iot hub device-identity bulk create -n {iothub_name} --input devices.jsonl
+
+        - name: Create devices with 8 concurrent bulk requests and a custom result file.
+          text: >
+            az iot hub device-identity bulk create -n {iothub_name} --input devices.jsonl --concurrency 8
+            --result-file results.jsonl
+    """
+
+    helps["iot hub device-identity bulk update"] = """
+        type: command
+        short-summary: Replace the device identities listed in an input file.
+        long-summary: |
+                      Each line replaces the full identity of an existing device, as with a PUT. Lines with an etag
+                      are only applied if it matches the current identity. Every line must include the device
+                      authentication, since keys left out of the identity would be regenerated; plain device ids
+                      are rejected.
+
+        examples:
+        - name: Update all devices listed in devices.jsonl.
+          text: >
+            az iot hub device-identity bulk update -n {iothub_name} --input devices.jsonl
+    """
+
+    helps["iot hub device-identity bulk delete"] = """
+        type: command
+        short-summary: Delete the device identities listed in an input file.
+
+        examples:
+        - name: Delete all devices whose ids are listed one per line in device-ids.txt.
+          text: >
+            az iot hub device-identity bulk delete -n {iothub_name} --input device-ids.txt
+    """
+
+    helps["iot hub device-identity snapshot"] = """
+        type: group
+        short-summary: Take and compare local snapshots of an IoT Hub identity registry.
+        long-summary: |
+                      A snapshot is a gzip compressed file with one JSON record per device, holding the device
+                      identity and twin and the identities and twins of its modules, along with a hash of the
+                      device configuration. Snapshots are read directly from the hub and need no storage account.
+    """
+
+    helps["iot hub device-identity snapshot create"] = """
+        type: command
+        short-summary: Write a snapshot of every device and module identity and twin in an IoT Hub to a local file.
+        long-summary: |
+                      Device twins are read page by page from a registry query, and each page is completed with
+                      device identities, including keys, and module identities and twins by concurrent workers.
+                      Throttled requests are retried with exponential backoff.
+
+        examples:
+        - name: Snapshot the registry of an IoT Hub.
+          text: >
+            az iot hub device-identity snapshot create -n {iothub_name} --snapshot-file registry.jsonl.gz
+
+        - name: Snapshot a large registry reading 16 query pages concurrently.
+          text: >
+            az iot hub device-identity snapshot create -n {iothub_name} --snapshot-file registry.jsonl.gz
+            --concurrency 16
+    """
+
+    helps["iot hub device-identity snapshot diff"] = """
+        type: command
+        short-summary: Compare a snapshot with another snapshot or with the current registry of an IoT Hub.
+        long-summary: |
+                      Devices are compared by the hashes of their identity, twin tags and desired properties,
+                      and modules. Connection state, activity times, etags, generation ids and reported
+                      properties are not compared. Each added, removed or changed device is written to stdout
+                      as a line of JSON, followed by a summary line.
+                      Records are partitioned by device id into temporary files first, so memory use is bounded
+                      by a single partition rather than by the number of devices.
+
+        examples:
+        - name: Compare two snapshots.
+          text: >
+            az iot hub device-identity snapshot diff --snapshot-file before.jsonl.gz --compare-file after.jsonl.gz
+
+        - name: Compare a snapshot taken from one IoT Hub with the registry of a hub it was migrated to.
+          text: >
+            az iot hub device-identity snapshot diff --snapshot-file registry.jsonl.gz -n {iothub_name}
+    """
+
+    helps["iot hub device-twin update-many"] = """
+        type: command
+        short-summary: Apply a desired properties and tags patch to every device twin matching a query.
+        long-summary: |
+                      Matching devices are streamed from the query and patched by a bounded pool of workers.
+                      Throttled requests are retried with exponential backoff and progress, including twins
+                      patched per second, is reported to stderr. With --checkpoint-file patched devices are
+                      recorded, so that an interrupted run can be resumed by running the same command again.
+
+        examples:
+        - name: Set a desired property on every device twin of a cohort.
+          text: >
+            az iot hub device-twin update-many -n {iothub_name} -q "tags.cohort = 'canary'"
+            --desired '{"firmware": {"version": "2.1.0"}}'
+
+        - name: Tag all edge devices with 16 concurrent updates, recording progress to resume from if interrupted.
+          text: >
+            az iot hub device-twin update-many -n {iothub_name} -q "capabilities.iotEdge = true"
+            --tags '{"ring": "2"}' --concurrency 16 --checkpoint-file ring2.checkpoint
+    """
+
     helps["iot hub digital-twin"] = """
         type: group
         short-summary: Manipulate and interact with the digital twin of an IoT Hub device.
@@ -16,6 +16,12 @@ iothub_job_ops = CliCommandType(operations_tmpl="azext_iot.iothub.commands_job#{
 device_messaging_ops = CliCommandType(
     operations_tmpl="azext_iot.iothub.commands_device_messaging#{}"
 )
+device_identity_ops = CliCommandType(
+    operations_tmpl="azext_iot.iothub.commands_device_identity#{}"
+)
+device_twin_ops = CliCommandType(
+    operations_tmpl="azext_iot.iothub.commands_device_twin#{}"
+)
 
 
 def load_iothub_commands(self, _):
@@ -28,6 +34,22 @@ def load_iothub_commands(self, _):
         cmd_group.command("list", "job_list")
         cmd_group.command("cancel", "job_cancel")
 
+    with self.command_group(
+        "iot hub device-identity bulk", command_type=device_identity_ops
+    ) as cmd_group:
+        cmd_group.command("create", "iot_device_bulk_create")
+        cmd_group.command("update", "iot_device_bulk_update")
+        cmd_group.command("delete", "iot_device_bulk_delete")
+
+    with self.command_group(
+        "iot hub device-identity snapshot", command_type=device_identity_ops
+    ) as cmd_group:
+        cmd_group.command("create", "iot_device_snapshot_create")
+        cmd_group.command("diff", "iot_device_snapshot_diff")
+
+    with self.command_group("iot hub device-twin", command_type=device_twin_ops) as cmd_group:
+        cmd_group.command("update-many", "iot_device_twin_update_many")
+
     with self.command_group("iot hub digital-twin", command_type=pnp_runtime_ops) as cmd_group:
         cmd_group.command("invoke-command", "invoke_device_command")
         cmd_group.show_command("show", "get_digital_twin")
@@ -0,0 +1,180 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from knack.log import get_logger
+from azext_iot.common.shared import DeviceBulkOperationType
+from azext_iot.iothub.providers.device_identity import (
+    DeviceIdentityProvider,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_BULK_RETRIES,
+    MAX_BULK_BATCH_SIZE,
+)
+from azext_iot.iothub.providers.registry_snapshot import (
+    RegistrySnapshotProvider,
+    DEFAULT_SNAPSHOT_CONCURRENCY,
+    diff_snapshots,
+    read_snapshot,
+)
+
+
+logger = get_logger(__name__)
+
+
+def iot_device_bulk_create(
+    cmd,
+    input_path,
+    result_path=None,
+    batch_size=MAX_BULK_BATCH_SIZE,
+    concurrency=DEFAULT_BULK_CONCURRENCY,
+    max_retries=DEFAULT_BULK_RETRIES,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    return _iot_device_bulk(
+        cmd=cmd,
+        operation=DeviceBulkOperationType.create.value,
+        input_path=input_path,
+        result_path=result_path,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        max_retries=max_retries,
+        hub_name=hub_name,
+        resource_group_name=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+
+
+def iot_device_bulk_update(
+    cmd,
+    input_path,
+    result_path=None,
+    batch_size=MAX_BULK_BATCH_SIZE,
+    concurrency=DEFAULT_BULK_CONCURRENCY,
+    max_retries=DEFAULT_BULK_RETRIES,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    return _iot_device_bulk(
+        cmd=cmd,
+        operation=DeviceBulkOperationType.update.value,
+        input_path=input_path,
+        result_path=result_path,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        max_retries=max_retries,
+        hub_name=hub_name,
+        resource_group_name=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+
+
+def iot_device_bulk_delete(
+    cmd,
+    input_path,
+    result_path=None,
+    batch_size=MAX_BULK_BATCH_SIZE,
+    concurrency=DEFAULT_BULK_CONCURRENCY,
+    max_retries=DEFAULT_BULK_RETRIES,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    return _iot_device_bulk(
+        cmd=cmd,
+        operation=DeviceBulkOperationType.delete.value,
+        input_path=input_path,
+        result_path=result_path,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        max_retries=max_retries,
+        hub_name=hub_name,
+        resource_group_name=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+
+
+def _iot_device_bulk(
+    cmd,
+    operation,
+    input_path,
+    result_path=None,
+    batch_size=MAX_BULK_BATCH_SIZE,
+    concurrency=DEFAULT_BULK_CONCURRENCY,
+    max_retries=DEFAULT_BULK_RETRIES,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    device_identity_provider = DeviceIdentityProvider(
+        cmd=cmd,
+        hub_name=hub_name,
+        rg=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+    return device_identity_provider.bulk(
+        operation=operation,
+        input_path=input_path,
+        result_path=result_path,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        max_retries=max_retries,
+    )
+
+
+def iot_device_snapshot_create(
+    cmd,
+    snapshot_file,
+    concurrency=DEFAULT_SNAPSHOT_CONCURRENCY,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    registry_snapshot_provider = RegistrySnapshotProvider(
+        cmd=cmd,
+        hub_name=hub_name,
+        rg=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+    return registry_snapshot_provider.create(
+        snapshot_file=snapshot_file, concurrency=concurrency
+    )
+
+
+def iot_device_snapshot_diff(
+    cmd,
+    snapshot_file,
+    compare_file=None,
+    concurrency=DEFAULT_SNAPSHOT_CONCURRENCY,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    if compare_file:
+        target = read_snapshot(compare_file)
+    else:
+        registry_snapshot_provider = RegistrySnapshotProvider(
+            cmd=cmd,
+            hub_name=hub_name,
+            rg=resource_group_name,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
+        target = registry_snapshot_provider.iter_records(concurrency=concurrency)
+    # differences and summary are streamed as newline delimited JSON
+    diff_snapshots(read_snapshot(snapshot_file), target)
@@ -0,0 +1,47 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+from knack.log import get_logger
+from azext_iot.iothub.providers.base import DEFAULT_RETRIES
+from azext_iot.iothub.providers.device_twin import (
+    DeviceTwinProvider,
+    DEFAULT_TWIN_CONCURRENCY,
+)
+
+
+logger = get_logger(__name__)
+
+
+def iot_device_twin_update_many(
+    cmd,
+    query_condition,
+    desired=None,
+    tags=None,
+    match_etag=False,
+    concurrency=DEFAULT_TWIN_CONCURRENCY,
+    max_retries=DEFAULT_RETRIES,
+    checkpoint_file=None,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    device_twin_provider = DeviceTwinProvider(
+        cmd=cmd,
+        hub_name=hub_name,
+        rg=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+    return device_twin_provider.update_many(
+        query_condition=query_condition,
+        desired=desired,
+        tags=tags,
+        match_etag=match_etag,
+        concurrency=concurrency,
+        max_retries=max_retries,
+        checkpoint_file=checkpoint_file,
+    )
@@ -52,6 +52,96 @@ def load_iothub_arguments(self, _):
             arg_group="Timeout"
         )
 
+    with self.argument_context("iot hub device-identity bulk") as context:
+        context.argument(
+            "input_path",
+            options_list=["--input", "-i"],
+            help="Path to a file with one device per line, either a device identity JSON object "
+            "with at least a deviceId, or a plain device id. An etag in a device identity makes "
+            "update and delete conditional on it.",
+        )
+        context.argument(
+            "result_path",
+            options_list=["--result-file", "--rf"],
+            help="Path of the file to write one JSON result per device to. "
+            "Defaults to the input path with a .result.jsonl suffix.",
+        )
+        context.argument(
+            "batch_size",
+            options_list=["--batch-size"],
+            type=int,
+            help="Number of devices sent per registry bulk request. Maximum and default: 100.",
+        )
+        context.argument(
+            "concurrency",
+            options_list=["--concurrency"],
+            type=int,
+            help="Maximum number of bulk requests in flight. Default: 4.",
+        )
+        context.argument(
+            "max_retries",
+            options_list=["--max-retries"],
+            type=int,
+            help="Number of times a throttled or unavailable bulk request is retried with "
+            "exponential backoff before its devices are reported as failed. Default: 5.",
+        )
+
+    with self.argument_context("iot hub device-identity snapshot") as context:
+        context.argument(
+            "snapshot_file",
+            options_list=["--snapshot-file", "--sf"],
+            help="Path of the gzip compressed newline delimited JSON registry snapshot.",
+        )
+        context.argument(
+            "concurrency",
+            options_list=["--concurrency"],
+            type=int,
+            help="Maximum number of query pages read from the hub concurrently. Default: 8.",
+        )
+
+    with self.argument_context("iot hub device-identity snapshot diff") as context:
+        context.argument(
+            "compare_file",
+            options_list=["--compare-file", "--cmp"],
+            help="Path of a second snapshot to compare against. "
+            "If omitted, the snapshot is compared against the current registry of the target IoT Hub.",
+        )
+
+    with self.argument_context("iot hub device-twin update-many") as context:
+        context.argument(
+            "query_condition",
+            options_list=["--query-condition", "-q"],
+            help="Condition of the device query selecting the twins to patch, for example "
+            "\"tags.cohort = 'canary'\". Use \"*\" to patch every device twin. "
+            'Note: "SELECT deviceId, etag FROM devices WHERE " is prefixed to the input.',
+        )
+        context.argument(
+            "match_etag",
+            options_list=["--match-etag"],
+            arg_type=get_three_state_flag(),
+            help="Only patch a twin if it has not changed since it was queried. "
+            "Twins that changed are reported as failed and patched again when the run is resumed. Default: false",
+        )
+        context.argument(
+            "concurrency",
+            options_list=["--concurrency"],
+            type=int,
+            help="Maximum number of twin patches in flight. Default: 8.",
+        )
+        context.argument(
+            "max_retries",
+            options_list=["--max-retries"],
+            type=int,
+            help="Number of times a throttled or unavailable twin patch is retried with "
+            "exponential backoff before it is reported as failed. Default: 5.",
+        )
+        context.argument(
+            "checkpoint_file",
+            options_list=["--checkpoint-file", "--cf"],
+            help="File recording patched devices. Rerunning the same query and patch with the same "
+            "checkpoint file skips devices that were already patched.",
+        )
+
     with self.argument_context("iot device") as context:
         context.argument(
             "auth_type_dataplane",
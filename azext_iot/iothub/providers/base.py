@@ -4,13 +4,33 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import random
+
+from time import sleep
+from typing import Callable
+from knack.log import get_logger
 from azext_iot.iothub.providers.discovery import IotHubDiscovery
 from azext_iot._factory import SdkResolver
 from msrest.exceptions import SerializationError
 from msrestazure.azure_exceptions import CloudError
 
 
-__all__ = ["IoTHubProvider", "CloudError", "SerializationError"]
+__all__ = [
+    "IoTHubProvider",
+    "CloudError",
+    "SerializationError",
+    "call_with_retry",
+    "get_retry_delay",
+]
+
+logger = get_logger(__name__)
+
+# Status codes of throttled or temporarily unavailable requests that are safe to retry.
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+DEFAULT_RETRIES = 5
+# Seconds of the first backoff after throttling, doubled on every further attempt.
+RETRY_BACKOFF = 1
+RETRY_MAX_BACKOFF = 60
 
 
 class IoTHubProvider(object):
@@ -29,3 +49,39 @@ class IoTHubProvider(object):
 
     def get_sdk(self, sdk_type):
         return self.resolver.get_sdk(sdk_type)
+
+
+def get_retry_delay(response, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a throttled request, honouring the Retry-After header
+    and otherwise backing off exponentially with jitter.
+    """
+    retry_after = getattr(response, "headers", {}).get("Retry-After")
+    try:
+        if retry_after:
+            return min(float(retry_after), RETRY_MAX_BACKOFF)
+    except ValueError:
+        pass
+    backoff = min(RETRY_BACKOFF * (2 ** attempt), RETRY_MAX_BACKOFF)
+    return backoff * random.uniform(0.5, 1)
+
+
+def call_with_retry(operation: Callable, max_retries: int = DEFAULT_RETRIES, **kwargs):
+    """
+    Call a service operation, retrying throttled or unavailable requests with backoff.
+    CloudError is raised once retries are exhausted or the failure is not transient.
+    """
+    attempt = 0
+    while True:
+        try:
+            return operation(**kwargs)
+        except CloudError as e:
+            status_code = getattr(e.response, "status_code", None)
+            if status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                raise
+            delay = get_retry_delay(e.response, attempt)
+            logger.info(
+                "Request throttled (%s), retrying in %.1f seconds.", status_code, delay
+            )
+            sleep(delay)
+            attempt += 1
@@ -0,0 +1,284 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from os.path import exists
+from time import sleep
+from typing import Iterator, List, Optional
+from knack.log import get_logger
+from azure.cli.core.azclierror import (
+    FileOperationError,
+    InvalidArgumentValueError,
+)
+from azext_iot.common.shared import SdkType, DeviceBulkOperationType
+from azext_iot.common.utility import handle_service_exception, unpack_msrest_error
+from azext_iot.iothub.providers.base import (
+    IoTHubProvider,
+    CloudError,
+    DEFAULT_RETRIES,
+    RETRY_STATUS_CODES,
+    get_retry_delay,
+)
+
+
+logger = get_logger(__name__)
+
+# Maximum number of devices the registry bulk API accepts per request.
+MAX_BULK_BATCH_SIZE = 100
+DEFAULT_BULK_CONCURRENCY = 4
+DEFAULT_BULK_RETRIES = DEFAULT_RETRIES
+# Failures that will affect every chunk, so the run is stopped instead.
+BULK_FATAL_STATUS_CODES = [401, 403]
+# A create chunk may have been applied before a server error, so it is only retried
+# when throttled.
+BULK_CREATE_RETRY_STATUS_CODES = [429]
+
+
+class DeviceIdentityProvider(IoTHubProvider):
+    """
+    Device identity registry operations applied to many devices at once through the
+    registry bulk API. Input devices are chunked into requests of up to 100 devices that
+    run concurrently on a shared hub target, retrying throttled or unavailable requests
+    with exponential backoff.
+    """
+
+    def __init__(self, cmd, hub_name, rg, login=None, auth_type_dataplane=None):
+        super(DeviceIdentityProvider, self).__init__(
+            cmd=cmd,
+            hub_name=hub_name,
+            rg=rg,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
+        self._local = threading.local()
+
+    def bulk(
+        self,
+        operation: str,
+        input_path: str,
+        result_path: Optional[str] = None,
+        batch_size: int = MAX_BULK_BATCH_SIZE,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BULK_RETRIES,
+    ) -> dict:
+        if not exists(input_path):
+            raise FileOperationError("Input file '{}' does not exist.".format(input_path))
+        if not batch_size or not 0 < batch_size <= MAX_BULK_BATCH_SIZE:
+            raise InvalidArgumentValueError(
+                "Batch size must be between 1 and {}.".format(MAX_BULK_BATCH_SIZE)
+            )
+        if not concurrency or concurrency < 1:
+            raise InvalidArgumentValueError("Concurrency must be at least 1.")
+        if max_retries is None or max_retries < 0:
+            raise InvalidArgumentValueError("Max retries cannot be negative.")
+
+        result_path = result_path or "{}.result.jsonl".format(input_path)
+        summary = {"operation": operation, "total": 0, "succeeded": 0, "failed": 0}
+
+        with open(input_path, "r", encoding="utf-8") as input_file, open(
+            result_path, "w", encoding="utf-8"
+        ) as result_file, ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+            def write_results(results: List[dict]):
+                for result in results:
+                    summary["total"] += 1
+                    summary["succeeded" if result["succeeded"] else "failed"] += 1
+                    result_file.write(json.dumps(result) + "\n")
+
+            pending = set()
+            for chunk, invalid in _read_chunks(input_file, operation, batch_size):
+                write_results(invalid)
+                if not chunk:
+                    continue
+                # bound the number of chunks held in memory to what the workers can take
+                if len(pending) >= concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write_results(future.result())
+                pending.add(
+                    executor.submit(self._update_registry, operation, chunk, max_retries)
+                )
+
+            for future in pending:
+                write_results(future.result())
+
+        summary["resultFile"] = result_path
+        if summary["failed"]:
+            logger.warning(
+                "%s of %s device %s operations failed. See %s for details.",
+                summary["failed"],
+                summary["total"],
+                operation,
+                result_path,
+            )
+        return summary
+
+    def _get_service_sdk(self):
+        # service clients are not shared between worker threads
+        service_sdk = getattr(self._local, "service_sdk", None)
+        if service_sdk is None:
+            service_sdk = self._local.service_sdk = self.get_sdk(SdkType.service_sdk)
+        return service_sdk
+
+    def _update_registry(self, operation: str, chunk: List[dict], max_retries: int) -> List[dict]:
+        try:
+            response = update_registry(self._get_service_sdk(), chunk, max_retries)
+        except CloudError as e:
+            if getattr(e.response, "status_code", None) in BULK_FATAL_STATUS_CODES:
+                handle_service_exception(e)
+            error = unpack_msrest_error(e)
+            return [
+                _build_result(device["id"], operation, error_status=error)
+                for device in chunk
+            ]
+
+        result = response.output
+        errors = {}
+        for error in (result.errors if result else None) or []:
+            errors.setdefault(error.device_id, error)
+        request_error = get_bulk_request_error(response)
+        if request_error and not any(device["id"] in errors for device in chunk):
+            # the request was rejected as a whole, no device was processed
+            return [
+                _build_result(device["id"], operation, error_status=request_error)
+                for device in chunk
+            ]
+        results = []
+        for device in chunk:
+            error = errors.get(device["id"])
+            results.append(
+                _build_result(
+                    device["id"],
+                    operation,
+                    error_code=error.error_code if error else None,
+                    error_status=error.error_status if error else None,
+                )
+            )
+        return results
+
+
+def update_registry(service_sdk, devices: List[dict], max_retries: int = DEFAULT_BULK_RETRIES):
+    """
+    Send a single registry bulk request for up to 100 ExportImportDevice payloads, retrying
+    throttled or unavailable requests with exponential backoff. Requests creating devices
+    are not idempotent and are only retried when throttled. Returns the raw response, whose
+    output is the BulkRegistryOperationResult with per device errors, and raises CloudError
+    once retries are exhausted or the failure is not transient.
+    """
+    from azext_iot.sdk.iothub.service.models import ExportImportDevice
+
+    payload = [ExportImportDevice.from_dict(device) for device in devices]
+    retry_status_codes = RETRY_STATUS_CODES
+    if any(device.get("importMode") == DeviceBulkOperationType.create.value for device in devices):
+        retry_status_codes = BULK_CREATE_RETRY_STATUS_CODES
+    attempt = 0
+    while True:
+        try:
+            return service_sdk.bulk_registry.update_registry(devices=payload, raw=True)
+        except CloudError as e:
+            status_code = getattr(e.response, "status_code", None)
+            if status_code not in retry_status_codes or attempt >= max_retries:
+                raise
+            delay = get_retry_delay(e.response, attempt)
+            logger.info(
+                "Bulk registry request for %s devices throttled (%s), retrying in %.1f seconds.",
+                len(devices),
+                status_code,
+                delay,
+            )
+            sleep(delay)
+            attempt += 1
+
+
+def get_bulk_request_error(response):
+    """
+    Return the response error of a registry bulk request that was not successful, or None.
+    Bad requests are deserialized as results, including requests rejected as a whole that
+    carry no device errors.
+    """
+    result = response.output
+    if result and result.is_successful:
+        return None
+    return unpack_msrest_error(response)
+
+
+def _read_chunks(input_file, operation: str, batch_size: int) -> Iterator[tuple]:
+    """
+    Lazily read a devices file of one JSON device identity or plain device id per line,
+    yielding chunks of registry operations along with results for unusable lines.
+    """
+    chunk = []
+    invalid = []
+    for line_number, line in enumerate(input_file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chunk.append(_build_operation(line, operation))
+        except (ValueError, TypeError) as e:
+            invalid.append(
+                _build_result(
+                    None,
+                    operation,
+                    error_status="Line {}: {}".format(line_number, e),
+                )
+            )
+        if len(chunk) >= batch_size:
+            yield chunk, invalid
+            chunk, invalid = [], []
+    if chunk or invalid:
+        yield chunk, invalid
+
+
+def _build_operation(line: str, operation: str) -> dict:
+    if not line.startswith("{"):
+        device = {"deviceId": line}
+    else:
+        device = json.loads(line)
+        if not isinstance(device, dict):
+            raise ValueError("expected a JSON object.")
+
+    device = dict(device)
+    device_id = device.pop("deviceId", None) or device.pop("id", None)
+    if not device_id:
+        raise ValueError("device identity has no deviceId.")
+
+    etag = device.pop("etag", None) or device.pop("eTag", None)
+    import_mode = operation
+    if etag and operation != DeviceBulkOperationType.create.value:
+        import_mode = "{}IfMatchETag".format(operation)
+        device["eTag"] = etag
+
+    # an update replaces the whole identity, regenerating keys left out of it
+    if operation == DeviceBulkOperationType.update.value and not device.get("authentication"):
+        raise ValueError(
+            "update replaces the whole device identity, include its authentication."
+        )
+
+    device["id"] = device_id
+    device["importMode"] = import_mode
+    return device
+
+
+def _build_result(
+    device_id: Optional[str],
+    operation: str,
+    error_code: Optional[str] = None,
+    error_status: Optional[str] = None,
+) -> dict:
+    result = {
+        "deviceId": device_id,
+        "operation": operation,
+        "succeeded": not (error_code or error_status),
+    }
+    if error_code:
+        result["errorCode"] = error_code
+    if error_status:
+        result["errorStatus"] = error_status
+    return result
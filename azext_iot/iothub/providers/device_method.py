@@ -0,0 +1,211 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import sys
+import threading
+
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from time import monotonic, perf_counter
+from typing import List, Optional
+from knack.log import get_logger
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from azext_iot.common.shared import SdkType
+from azext_iot.common.utility import handle_service_exception, unpack_msrest_error
+from azext_iot.operations.generic import _iter_query_pages
+from azext_iot.operations.hub import _build_method_request, _get_method_http_timeout
+from azext_iot.iothub.providers.base import IoTHubProvider, CloudError
+
+
+logger = get_logger(__name__)
+
+DEFAULT_METHOD_CONCURRENCY = 16
+# Upper bounds in milliseconds of the latency histogram buckets.
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+LATENCY_PERCENTILES = [50, 90, 99]
+METHOD_FATAL_STATUS_CODES = [401, 403]
+
+
+class DeviceMethodProvider(IoTHubProvider):
+    """
+    Invokes one direct method on every device returned by a query.
+
+    Device ids are streamed page by page from the query and invoked by a bounded pool of
+    workers, each reusing its own service client and HTTP session. Every result is written
+    as a line of JSON as soon as it completes, followed by a summary line with status code
+    counts and latency percentiles and histogram.
+    """
+
+    def __init__(self, cmd, hub_name, rg, login=None, auth_type_dataplane=None):
+        super(DeviceMethodProvider, self).__init__(
+            cmd=cmd,
+            hub_name=hub_name,
+            rg=rg,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
+        self._local = threading.local()
+
+    def invoke_many(
+        self,
+        device_query: str,
+        method_name: str,
+        method_payload=None,
+        module_id: Optional[str] = None,
+        timeout: int = 30,
+        connect_timeout: Optional[int] = None,
+        max_concurrency: int = DEFAULT_METHOD_CONCURRENCY,
+        stream=None,
+    ) -> dict:
+        if not max_concurrency or max_concurrency < 1:
+            raise InvalidArgumentValueError("Max concurrency must be at least 1.")
+
+        request_body = _build_method_request(method_name, method_payload, timeout, connect_timeout)
+        http_timeout = _get_method_http_timeout(timeout, connect_timeout)
+
+        stream = stream or sys.stdout
+        summary = _MethodSummary()
+        service_sdk = self.get_sdk(SdkType.service_sdk)
+
+        def collect(futures):
+            lines = []
+            for future in futures:
+                result = future.result()
+                summary.add(result)
+                lines.append(json.dumps(result, separators=(",", ":")) + "\n")
+            if lines:
+                stream.write("".join(lines))
+                stream.flush()
+
+        pending = set()
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            for page in _iter_query_pages([device_query], service_sdk.query.get_twins):
+                for twin in page:
+                    device_id = twin.get("deviceId") if isinstance(twin, dict) else None
+                    if not device_id:
+                        raise InvalidArgumentValueError(
+                            "Device query results must include the deviceId property."
+                        )
+                    # bound the number of queued invocations to what the workers can take
+                    if len(pending) >= max_concurrency * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(
+                        executor.submit(
+                            self._invoke, device_id, module_id, request_body, http_timeout
+                        )
+                    )
+            collect(as_completed(pending))
+            pending = set()
+        except CloudError as e:
+            handle_service_exception(e)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        result = summary.to_dict()
+        stream.write(json.dumps({"summary": result}, separators=(",", ":")) + "\n")
+        stream.flush()
+        if summary.failed:
+            logger.warning(
+                "%s of %s method invocations failed.", summary.failed, summary.total
+            )
+        return result
+
+    def _get_service_sdk(self):
+        # service clients are not shared between worker threads
+        service_sdk = getattr(self._local, "service_sdk", None)
+        if service_sdk is None:
+            service_sdk = self._local.service_sdk = self.get_sdk(SdkType.service_sdk)
+            # Prevent msrest locking up shell
+            service_sdk.config.retry_policy.retries = 1
+        return service_sdk
+
+    def _invoke(
+        self, device_id: str, module_id: Optional[str], request_body: dict, http_timeout: int
+    ) -> dict:
+        service_sdk = self._get_service_sdk()
+        result = {"deviceId": device_id}
+        if module_id:
+            result["moduleId"] = module_id
+        start = perf_counter()
+        try:
+            if module_id:
+                response = service_sdk.modules.invoke_method(
+                    device_id=device_id,
+                    module_id=module_id,
+                    direct_method_request=request_body,
+                    timeout=http_timeout,
+                )
+            else:
+                response = service_sdk.devices.invoke_method(
+                    device_id=device_id,
+                    direct_method_request=request_body,
+                    timeout=http_timeout,
+                )
+            result["status"] = response.status
+            result["payload"] = response.payload
+        except CloudError as e:
+            status_code = getattr(e.response, "status_code", None)
+            if status_code in METHOD_FATAL_STATUS_CODES:
+                handle_service_exception(e)
+            result["status"] = status_code
+            result["error"] = unpack_msrest_error(e)
+        except Exception as e:  # pylint: disable=broad-except
+            # connection failures and client side timeouts only affect this device
+            result["status"] = None
+            result["error"] = str(e)
+        result["latencyMs"] = round((perf_counter() - start) * 1000, 3)
+        return result
+
+
+class _MethodSummary:
+    def __init__(self):
+        self._start = monotonic()
+        self.total = 0
+        self.failed = 0
+        self.status_codes = {}
+        self.latencies: List[float] = []
+
+    def add(self, result: dict):
+        self.total += 1
+        if "error" in result:
+            self.failed += 1
+        status = str(result["status"]) if result["status"] is not None else "none"
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        self.latencies.append(result["latencyMs"])
+
+    def to_dict(self) -> dict:
+        return {
+            "devices": self.total,
+            "succeeded": self.total - self.failed,
+            "failed": self.failed,
+            "elapsedSeconds": round(monotonic() - self._start, 3),
+            "statusCodes": self.status_codes,
+            "latencyMs": _summarize_latencies(self.latencies),
+        }
+
+
+def _summarize_latencies(latencies: List[float]) -> dict:
+    if not latencies:
+        return {}
+    samples = sorted(latencies)
+    summary = {"min": samples[0], "max": samples[-1]}
+    for p in LATENCY_PERCENTILES:
+        summary["p{}".format(p)] = samples[min(len(samples) - 1, len(samples) * p // 100)]
+
+    counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for latency in samples:
+        counts[bisect_right(LATENCY_BUCKETS_MS, latency)] += 1
+    histogram = {
+        "<{}".format(bound): count for bound, count in zip(LATENCY_BUCKETS_MS, counts)
+    }
+    histogram[">={}".format(LATENCY_BUCKETS_MS[-1])] = counts[-1]
+    summary["histogram"] = histogram
+    return summary
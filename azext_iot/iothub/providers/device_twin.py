@@ -0,0 +1,310 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import monotonic, sleep
+from typing import Optional, Set
+from knack.log import get_logger
+from azure.cli.core.azclierror import (
+    FileOperationError,
+    InvalidArgumentValueError,
+    RequiredArgumentMissingError,
+)
+from azext_iot.common.shared import SdkType
+from azext_iot.common.utility import (
+    handle_service_exception,
+    process_json_arg,
+    unpack_msrest_error,
+)
+from azext_iot.operations.generic import _iter_query_pages
+from azext_iot.iothub.providers.base import (
+    IoTHubProvider,
+    CloudError,
+    DEFAULT_RETRIES,
+    RETRY_STATUS_CODES,
+    get_retry_delay,
+)
+
+
+logger = get_logger(__name__)
+
+DEFAULT_TWIN_CONCURRENCY = 8
+# Seconds between progress reports written to stderr.
+TWIN_PROGRESS_INTERVAL = 5
+TWIN_FATAL_STATUS_CODES = [401, 403]
+TWIN_PRECONDITION_FAILED = 412
+
+CHECKPOINT_FILE_VERSION = 1
+
+
+class DeviceTwinProvider(IoTHubProvider):
+    """
+    Applies one twin patch to every device matching a query.
+
+    Matching device ids and twin etags are streamed page by page from the query and
+    patched by a bounded pool of workers, retrying throttled or unavailable requests with
+    exponential backoff. Patched devices are appended to an optional checkpoint file so an
+    interrupted run can be resumed, skipping devices that were already patched.
+    """
+
+    def __init__(self, cmd, hub_name, rg, login=None, auth_type_dataplane=None):
+        super(DeviceTwinProvider, self).__init__(
+            cmd=cmd,
+            hub_name=hub_name,
+            rg=rg,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
+        self._local = threading.local()
+
+    def update_many(
+        self,
+        query_condition: str,
+        desired=None,
+        tags=None,
+        match_etag: bool = False,
+        concurrency: int = DEFAULT_TWIN_CONCURRENCY,
+        max_retries: int = DEFAULT_RETRIES,
+        checkpoint_file: Optional[str] = None,
+        progress_interval: float = TWIN_PROGRESS_INTERVAL,
+    ) -> dict:
+        if not query_condition:
+            raise RequiredArgumentMissingError("A query condition is required.")
+        if not concurrency or concurrency < 1:
+            raise InvalidArgumentValueError("Concurrency must be at least 1.")
+        if max_retries is None or max_retries < 0:
+            raise InvalidArgumentValueError("Max retries cannot be negative.")
+
+        patch = {}
+        if desired:
+            patch["properties"] = {"desired": process_json_arg(desired, "desired")}
+        if tags:
+            patch["tags"] = process_json_arg(tags, "tags")
+        if not patch:
+            raise RequiredArgumentMissingError(
+                "Provide --desired and/or --tags to patch the matching device twins."
+            )
+
+        query = _build_query(query_condition)
+        checkpoint = (
+            TwinUpdateCheckpoint(checkpoint_file, query, patch) if checkpoint_file else None
+        )
+        progress = _TwinUpdateProgress(progress_interval)
+        service_sdk = self.get_sdk(SdkType.service_sdk)
+
+        def collect(futures):
+            for future in futures:
+                device_id, error = future.result()
+                if error:
+                    progress.failures.append({"deviceId": device_id, "error": error})
+                else:
+                    progress.updated += 1
+                    if checkpoint:
+                        checkpoint.add(device_id)
+            if checkpoint:
+                checkpoint.flush()
+            progress.report()
+
+        pending = set()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for page in _iter_query_pages([query], service_sdk.query.get_twins):
+                for twin in page:
+                    progress.matched += 1
+                    device_id = twin["deviceId"]
+                    if checkpoint and device_id in checkpoint:
+                        progress.skipped += 1
+                        continue
+                    # bound the number of queued patches to what the workers can take
+                    if len(pending) >= concurrency * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(
+                        executor.submit(
+                            self._update_twin,
+                            device_id,
+                            patch,
+                            twin.get("etag") if match_etag else None,
+                            max_retries,
+                        )
+                    )
+            collect(pending)
+        except CloudError as e:
+            handle_service_exception(e)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if checkpoint:
+                checkpoint.close()
+
+        summary = progress.summary()
+        if checkpoint:
+            summary["checkpointFile"] = checkpoint_file
+        if progress.failures:
+            logger.warning(
+                "%s of %s twin updates failed.",
+                len(progress.failures),
+                progress.matched - progress.skipped,
+            )
+        return summary
+
+    def _get_service_sdk(self):
+        # service clients are not shared between worker threads
+        service_sdk = getattr(self._local, "service_sdk", None)
+        if service_sdk is None:
+            service_sdk = self._local.service_sdk = self.get_sdk(SdkType.service_sdk)
+        return service_sdk
+
+    def _update_twin(self, device_id: str, patch: dict, etag: Optional[str], max_retries: int):
+        """
+        Patch a single twin. Returns the device id and an error message, which is None
+        when the patch was applied.
+        """
+        service_sdk = self._get_service_sdk()
+        headers = {"If-Match": '"{}"'.format(etag if etag else "*")}
+        attempt = 0
+        while True:
+            try:
+                service_sdk.devices.update_twin(
+                    id=device_id, device_twin_info=patch, custom_headers=headers
+                )
+                return device_id, None
+            except CloudError as e:
+                status_code = getattr(e.response, "status_code", None)
+                if status_code in TWIN_FATAL_STATUS_CODES:
+                    handle_service_exception(e)
+                if status_code == TWIN_PRECONDITION_FAILED:
+                    return device_id, "Twin etag changed since it was queried."
+                if status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return device_id, unpack_msrest_error(e)
+                delay = get_retry_delay(e.response, attempt)
+                logger.info(
+                    "Twin update of %s throttled (%s), retrying in %.1f seconds.",
+                    device_id,
+                    status_code,
+                    delay,
+                )
+                sleep(delay)
+                attempt += 1
+
+
+class TwinUpdateCheckpoint:
+    """
+    Append only record of device twins already patched by update-many.
+
+    The first line identifies the query and patch the checkpoint belongs to, so that a
+    checkpoint is never resumed with a different patch. Every following line is the id
+    of a patched device.
+    """
+
+    def __init__(self, path: str, query: str, patch: dict):
+        self._path = path
+        self._header = {
+            "version": CHECKPOINT_FILE_VERSION,
+            "query": query,
+            "patch": hashlib.sha256(
+                json.dumps(patch, sort_keys=True).encode("utf-8")
+            ).hexdigest(),
+        }
+        self._done: Set[str] = set()
+        self._load()
+        try:
+            self._file = open(path, "a", encoding="utf-8")
+            if not self._done and os.path.getsize(path) == 0:
+                self._file.write(json.dumps(self._header) + "\n")
+        except OSError as e:
+            raise FileOperationError("Unable to write checkpoint file {}: {}".format(path, e))
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._done
+
+    def add(self, device_id: str):
+        self._done.add(device_id)
+        self._file.write(device_id + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def _load(self):
+        if not os.path.exists(self._path) or os.path.getsize(self._path) == 0:
+            return
+        with open(self._path, "r", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None
+            if header != self._header:
+                raise InvalidArgumentValueError(
+                    "Checkpoint file {} belongs to a different query or twin patch. "
+                    "Use a new checkpoint file.".format(self._path)
+                )
+            for line in f:
+                # a partially written last line is not a completed update
+                if line.endswith("\n"):
+                    self._done.add(line[:-1])
+
+
+class _TwinUpdateProgress:
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._start = monotonic()
+        self._last_report = self._start
+        self.matched = 0
+        self.skipped = 0
+        self.updated = 0
+        self.failures = []
+
+    def report(self):
+        now = monotonic()
+        if not self._interval or now - self._last_report < self._interval:
+            return
+        self._last_report = now
+        print(
+            "[progress] {} matched, {} updated, {} failed, {} skipped, {:.1f} twins/sec".format(
+                self.matched,
+                self.updated,
+                len(self.failures),
+                self.skipped,
+                self._rate(now),
+            ),
+            file=sys.stderr,
+            flush=True,
+        )
+
+    def summary(self) -> dict:
+        now = monotonic()
+        return {
+            "matched": self.matched,
+            "updated": self.updated,
+            "failed": len(self.failures),
+            "skipped": self.skipped,
+            "elapsedSeconds": round(now - self._start, 3),
+            "twinsPerSecond": round(self._rate(now), 2),
+            "failures": self.failures,
+        }
+
+    def _rate(self, now: float) -> float:
+        return (self.updated + len(self.failures)) / max(now - self._start, 1e-9)
+
+
+def _build_query(query_condition: str) -> str:
+    condition = query_condition.strip()
+    if condition.lower().startswith("where "):
+        condition = condition[len("where "):].strip()
+    query = "select deviceId, etag from devices"
+    if condition and condition != "*":
+        query = "{} where {}".format(query, condition)
+    return query
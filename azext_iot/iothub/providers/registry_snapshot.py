@@ -0,0 +1,415 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import zlib
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Dict, Iterable, Iterator, List, Optional
+from knack.log import get_logger
+from azure.cli.core.azclierror import (
+    FileOperationError,
+    InvalidArgumentValueError,
+)
+from functools import partial
+from azext_iot.constants import DEVICE_DEVICESCOPE_PREFIX
+from azext_iot.common.shared import SdkType
+from azext_iot.common.utility import handle_service_exception
+from azext_iot.operations.generic import _execute_query, _iter_query_pages
+from azext_iot.iothub.providers.base import (
+    IoTHubProvider,
+    CloudError,
+    call_with_retry,
+)
+
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FILE_VERSION = 1
+DEFAULT_SNAPSHOT_CONCURRENCY = 8
+# Number of temporary partitions a diff is split into, bounding memory to one partition.
+DIFF_PARTITIONS = 64
+# Identity properties that change without any change to the device configuration.
+VOLATILE_IDENTITY_PROPERTIES = [
+    "etag",
+    "generationId",
+    "connectionState",
+    "connectionStateUpdatedTime",
+    "statusUpdatedTime",
+    "lastActivityTime",
+    "cloudToDeviceMessageCount",
+]
+HASH_SECTIONS = ["identity", "twin", "modules"]
+
+
+class RegistrySnapshotProvider(IoTHubProvider):
+    """
+    Reads the identity registry of an IoT Hub into snapshot records, one per device.
+
+    Device twins are streamed page by page from a registry query and every page is
+    completed by a pool of workers with the device identities, including keys, and the
+    identities and twins of their modules. Each record carries a content hash of the
+    device configuration so snapshots can be compared without comparing full records.
+    """
+
+    def __init__(self, cmd, hub_name, rg, login=None, auth_type_dataplane=None):
+        super(RegistrySnapshotProvider, self).__init__(
+            cmd=cmd,
+            hub_name=hub_name,
+            rg=rg,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
+        self._local = threading.local()
+
+    def create(
+        self, snapshot_file: str, concurrency: int = DEFAULT_SNAPSHOT_CONCURRENCY
+    ) -> dict:
+        _validate_concurrency(concurrency)
+        start = monotonic()
+        devices = modules = 0
+        # an interrupted snapshot is never left in place, it would read as complete
+        temp_file = "{}.tmp".format(snapshot_file)
+        try:
+            try:
+                with gzip.open(temp_file, "wt", encoding="utf-8") as f:
+                    f.write(_dumps({"snapshot": self._build_header()}) + "\n")
+                    for record in self.iter_records(concurrency):
+                        f.write(_dumps(record) + "\n")
+                        devices += 1
+                        modules += len(record["modules"])
+                os.replace(temp_file, snapshot_file)
+            except OSError as e:
+                raise FileOperationError(
+                    "Unable to write snapshot file {}: {}".format(snapshot_file, e)
+                )
+        finally:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError as e:
+                    logger.warning("Failed to remove %s: %s", temp_file, e)
+
+        elapsed = monotonic() - start
+        return {
+            "snapshotFile": snapshot_file,
+            "devices": devices,
+            "modules": modules,
+            "elapsedSeconds": round(elapsed, 3),
+            "devicesPerSecond": round(devices / max(elapsed, 1e-9), 2),
+        }
+
+    def iter_records(
+        self, concurrency: int = DEFAULT_SNAPSHOT_CONCURRENCY
+    ) -> Iterator[dict]:
+        """
+        Yield a snapshot record for every device in the hub, in no particular order.
+        """
+        _validate_concurrency(concurrency)
+        service_sdk = self.get_sdk(SdkType.service_sdk)
+        pending = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                for page in _iter_query_pages(
+                    ["select * from devices"],
+                    partial(_query_with_retry, service_sdk.query.get_twins),
+                ):
+                    if not page:
+                        continue
+                    # bound the number of pages held in memory to what the workers can take
+                    if len(pending) >= concurrency * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield from future.result()
+                    pending.add(executor.submit(self._read_devices, page))
+                for future in as_completed(pending):
+                    yield from future.result()
+                pending = set()
+            except CloudError as e:
+                handle_service_exception(e)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _build_header(self) -> dict:
+        return {
+            "version": SNAPSHOT_FILE_VERSION,
+            "hub": self.target["entity"],
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _get_service_sdk(self):
+        # service clients are not shared between worker threads
+        service_sdk = getattr(self._local, "service_sdk", None)
+        if service_sdk is None:
+            service_sdk = self._local.service_sdk = self.get_sdk(SdkType.service_sdk)
+        return service_sdk
+
+    def _read_devices(self, twins: List[dict]) -> List[dict]:
+        service_sdk = self._get_service_sdk()
+        module_twins = self._query_module_twins(
+            service_sdk, [twin["deviceId"] for twin in twins]
+        )
+        records = []
+        for twin in twins:
+            device_id = twin["deviceId"]
+            identity = _get_json(service_sdk.devices.get_identity, id=device_id)
+            if identity is None:
+                logger.debug("Device %s was deleted while taking the snapshot.", device_id)
+                continue
+
+            modules = []
+            twins_by_module = {
+                module["moduleId"]: module for module in module_twins.get(device_id, [])
+            }
+            # ids that cannot be queried are always checked for modules
+            if twins_by_module or "'" in device_id:
+                module_identities = _get_json(
+                    service_sdk.modules.get_modules_on_device, id=device_id
+                )
+                for module_identity in module_identities or []:
+                    module_id = module_identity["moduleId"]
+                    module_twin = twins_by_module.get(module_id) or _get_json(
+                        service_sdk.modules.get_twin, id=device_id, mid=module_id
+                    )
+                    if module_twin is None:
+                        continue
+                    modules.append(
+                        {"moduleId": module_id, "identity": module_identity, "twin": module_twin}
+                    )
+            records.append(build_snapshot_record(identity, twin, modules))
+        return records
+
+    def _query_module_twins(self, service_sdk, device_ids: List[str]) -> Dict[str, List[dict]]:
+        query_ids = [device_id for device_id in device_ids if "'" not in device_id]
+        if not query_ids:
+            return {}
+        query = "select * from devices.modules where deviceId IN [{}]".format(
+            ", ".join("'{}'".format(device_id) for device_id in query_ids)
+        )
+        module_twins = {}
+        for module_twin in call_with_retry(
+            _execute_query, query_args=[query], query_method=service_sdk.query.get_twins
+        ):
+            module_twins.setdefault(module_twin["deviceId"], []).append(module_twin)
+        return module_twins
+
+
+def build_snapshot_record(identity: dict, twin: dict, modules: List[dict]) -> dict:
+    modules = sorted(modules, key=lambda module: module["moduleId"])
+    hashes = {
+        "identity": _hash_content(_identity_content(identity)),
+        "twin": _hash_content(_twin_content(twin)),
+        "modules": _hash_content(
+            [
+                {
+                    "moduleId": module["moduleId"],
+                    "identity": _identity_content(module["identity"]),
+                    "twin": _twin_content(module["twin"]),
+                }
+                for module in modules
+            ]
+        ),
+    }
+    return {
+        "deviceId": identity["deviceId"],
+        "hash": _hash_content(hashes),
+        "hashes": hashes,
+        "identity": identity,
+        "twin": twin,
+        "modules": modules,
+    }
+
+
+def read_snapshot(snapshot_file: str) -> Iterator[dict]:
+    """
+    Yield the device records of a snapshot file one at a time.
+    """
+    if not os.path.exists(snapshot_file):
+        raise FileOperationError("Snapshot file '{}' does not exist.".format(snapshot_file))
+    try:
+        with gzip.open(snapshot_file, "rt", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline()).get("snapshot")
+            except (ValueError, AttributeError):
+                header = None
+            if not header or header.get("version") != SNAPSHOT_FILE_VERSION:
+                raise InvalidArgumentValueError(
+                    "{} is not a supported registry snapshot file.".format(snapshot_file)
+                )
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except (OSError, EOFError) as e:
+        raise FileOperationError(
+            "Unable to read snapshot file {}: {}".format(snapshot_file, e)
+        )
+
+
+def diff_snapshots(
+    source: Iterable[dict],
+    target: Iterable[dict],
+    stream=None,
+    partitions: int = DIFF_PARTITIONS,
+) -> dict:
+    """
+    Compare two streams of snapshot records by device id and content hash.
+
+    Both streams are first split by device id into temporary partition files holding only
+    ids and hashes, then compared one partition at a time, so memory is bounded by the
+    largest partition rather than the registry size. Differences are written to stream
+    (stdout by default) as newline delimited JSON, followed by a summary line: devices only
+    in the target are "added", devices only in the source are "removed" and devices whose
+    hashes differ are "changed" with the differing sections.
+    """
+    stream = stream or sys.stdout
+    summary = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+
+    def write(differences: List[dict]):
+        if differences:
+            stream.write("".join(_dumps(difference) + "\n" for difference in differences))
+            stream.flush()
+
+    with tempfile.TemporaryDirectory() as partition_dir:
+        _partition_records(source, partition_dir, "source", partitions)
+        _partition_records(target, partition_dir, "target", partitions)
+
+        for partition in range(partitions):
+            source_hashes = {
+                entry[0]: entry
+                for entry in _read_partition(partition_dir, "source", partition)
+            }
+            differences = []
+            for entry in _read_partition(partition_dir, "target", partition):
+                device_id = entry[0]
+                source_entry = source_hashes.pop(device_id, None)
+                if source_entry is None:
+                    differences.append({"deviceId": device_id, "change": "added"})
+                elif source_entry[1] != entry[1]:
+                    differences.append(
+                        {
+                            "deviceId": device_id,
+                            "change": "changed",
+                            "sections": [
+                                section
+                                for i, section in enumerate(HASH_SECTIONS, 2)
+                                if source_entry[i] != entry[i]
+                            ],
+                        }
+                    )
+                else:
+                    summary["unchanged"] += 1
+            differences.extend(
+                {"deviceId": device_id, "change": "removed"} for device_id in source_hashes
+            )
+            for difference in differences:
+                summary[difference["change"]] += 1
+            write(differences)
+
+    write([{"summary": summary}])
+    return summary
+
+
+def _partition_records(records: Iterable[dict], partition_dir: str, side: str, partitions: int):
+    files = {}
+    try:
+        for record in records:
+            device_id = record["deviceId"]
+            partition = zlib.crc32(device_id.encode("utf-8")) % partitions
+            partition_file = files.get(partition)
+            if partition_file is None:
+                partition_file = files[partition] = open(
+                    _partition_path(partition_dir, side, partition), "w", encoding="utf-8"
+                )
+            hashes = record["hashes"]
+            partition_file.write(
+                _dumps([device_id, record["hash"]] + [hashes[section] for section in HASH_SECTIONS])
+                + "\n"
+            )
+    finally:
+        for partition_file in files.values():
+            partition_file.close()
+
+
+def _read_partition(partition_dir: str, side: str, partition: int) -> Iterator[list]:
+    path = _partition_path(partition_dir, side, partition)
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _partition_path(partition_dir: str, side: str, partition: int) -> str:
+    return os.path.join(partition_dir, "{}-{}.jsonl".format(side, partition))
+
+
+def _get_json(operation, **kwargs) -> Optional[dict]:
+    """
+    Return the JSON body of a service GET, or None when the entity no longer exists.
+    """
+    try:
+        return call_with_retry(operation, raw=True, **kwargs).response.json()
+    except CloudError as e:
+        if getattr(e.response, "status_code", None) == 404:
+            return None
+        raise
+
+
+def _query_with_retry(query_method, *query_args, **kwargs):
+    return call_with_retry(partial(query_method, *query_args), **kwargs)
+
+
+def _identity_content(identity: dict) -> dict:
+    content = {
+        key: value
+        for key, value in identity.items()
+        if key not in VOLATILE_IDENTITY_PROPERTIES
+    }
+    # edge scopes embed the generation id of the edge device, they are compared by the
+    # device id they reference
+    if content.get("deviceScope"):
+        content["deviceScope"] = _normalize_scope(content["deviceScope"])
+    if content.get("parentScopes"):
+        content["parentScopes"] = [_normalize_scope(scope) for scope in content["parentScopes"]]
+    return content
+
+
+def _normalize_scope(scope: str) -> str:
+    # ms-azure-iot-edge://{deviceId}-{generationId}
+    if not scope.startswith(DEVICE_DEVICESCOPE_PREFIX) or "-" not in scope[len(DEVICE_DEVICESCOPE_PREFIX):]:
+        return scope
+    return scope.rsplit("-", 1)[0]
+
+
+def _twin_content(twin: dict) -> dict:
+    desired = dict((twin.get("properties") or {}).get("desired") or {})
+    desired.pop("$metadata", None)
+    desired.pop("$version", None)
+    return {"tags": twin.get("tags") or {}, "desired": desired}
+
+
+def _hash_content(content) -> str:
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def _dumps(content) -> str:
+    return json.dumps(content, separators=(",", ":"))
+
+
+def _validate_concurrency(concurrency: int):
+    if not concurrency or concurrency < 1:
+        raise InvalidArgumentValueError("Concurrency must be at least 1.")
@@ -4,17 +4,32 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
+import threading
+
 from enum import Enum
 from collections import deque
+from os.path import exists, join
+from typing import List, Optional
 
 from knack.log import get_logger
 from azext_iot.common.utility import process_json_arg
+from azext_iot.constants import EDGE_DEPLOYMENT_ROOT_SCHEMAS_PATH
 
 from jsonschema import Draft4Validator, Draft7Validator
 
 
 logger = get_logger(__name__)
 
+EDGE_SCHEMA_FILE_NAMES = {
+    "$edgeAgent": "azure-iot-edgeagent-deployment-{}.json",
+    "$edgeHub": "azure-iot-edgehub-deployment-{}.json",
+}
+
+# Compiled validators per (system module, schema version), None when no schema is available.
+_edge_schema_validators = {}
+_edge_schema_lock = threading.Lock()
+
 
 class JsonSchemaType(Enum):
     """
@@ -26,22 +41,28 @@ class JsonSchemaType(Enum):
 
 
 class JsonSchemaValidator(object):
+    """
+    Validates content against a json schema. The underlying draft validator is compiled
+    once, so an instance can be reused for many validations, including across threads.
+    """
+
     def __init__(self, schema, schema_type):
         self.schema = schema
         self.schema_type = schema_type
         self.errors = []
+        self._validator = self._get_validator()
 
-    def _add_error(self, error_msg, content_path, schema_path):
+    @staticmethod
+    def _format_error(error_msg, content_path, schema_path):
         if isinstance(content_path, deque):
             content_path = ".".join(map(str, list(content_path)))
         if isinstance(schema_path, deque):
             schema_path = ".".join(map(str, list(schema_path)))
-        e = {
+        return {
             "description": error_msg,
             "contentPath": content_path,
             "schemaPath": schema_path,
         }
-        self.errors.append(e)
 
     def _get_validator(self):
         if self.schema_type == JsonSchemaType.draft4:
@@ -54,16 +75,96 @@ class JsonSchemaValidator(object):
         if isinstance(content, str):
             content = process_json_arg(content, argument_name="content")
 
-        validator = self._get_validator()
-
-        if not validator:
+        errors = []
+        if not self._validator:
             logger.info("Json schema type not supported, skipping validation...")
-            return self.errors
+            self.errors = errors
+            return errors
 
         try:
-            for error in sorted(validator.iter_errors(content), key=str):
-                self._add_error(error.message, error.path, error.schema_path)
+            for error in sorted(self._validator.iter_errors(content), key=str):
+                errors.append(self._format_error(error.message, error.path, error.schema_path))
         except Exception:
             logger.info("Invalid json schema, skipping validation...")
 
-        return self.errors
+        self.errors = errors
+        return errors
+
+
+def get_edge_schema_validator(system_module: str, schema_version: str) -> Optional[JsonSchemaValidator]:
+    """
+    Get the validator of an edge system module schema version. Each schema file is read,
+    parsed and compiled once per process.
+    """
+    key = (system_module, schema_version)
+    with _edge_schema_lock:
+        if key not in _edge_schema_validators:
+            _edge_schema_validators[key] = _load_edge_schema_validator(system_module, schema_version)
+        return _edge_schema_validators[key]
+
+
+def _load_edge_schema_validator(system_module: str, schema_version: str) -> Optional[JsonSchemaValidator]:
+    schema_path = join(
+        EDGE_DEPLOYMENT_ROOT_SCHEMAS_PATH,
+        EDGE_SCHEMA_FILE_NAMES[system_module].format(schema_version),
+    )
+    logger.info("Attempting to fetch schema content from %s...", schema_path)
+    if not exists(schema_path):
+        logger.info("Invalid schema path %s, skipping validation...", schema_path)
+        return None
+
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    except Exception:
+        logger.info("Unable to fetch schema content from %s skipping validation...", schema_path)
+        return None
+
+    draft_version = JsonSchemaType.draft4
+    if "$schema" in schema and "/draft-07/" in schema["$schema"]:
+        draft_version = JsonSchemaType.draft7
+    return JsonSchemaValidator(schema, draft_version)
+
+
+def get_edge_deployment_errors(modules_content: dict) -> List[dict]:
+    """
+    Validate the $edgeAgent and $edgeHub desired properties of edge deployment modules
+    content against the schema of their declared schema version.
+    """
+    errors = []
+    for system_module in EDGE_SCHEMA_FILE_NAMES:
+        desired = modules_content.get(system_module, {}).get("properties.desired")
+        if not isinstance(desired, dict) or "schemaVersion" not in desired:
+            continue
+        validator = get_edge_schema_validator(system_module, desired["schemaVersion"])
+        if not validator:
+            continue
+        logger.info("Validating %s of deployment payload against schema...", system_module)
+        errors.extend(validator.validate({system_module: modules_content[system_module]}))
+    return errors
+
+
+def validate_edge_deployment_file(path: str) -> dict:
+    """
+    Validate the edge deployment manifest stored in a file. Returns the file path and a
+    list of errors, which is empty when the manifest is valid.
+    """
+    result = {"file": path, "errors": []}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except (OSError, ValueError) as e:
+        result["errors"].append({"description": "Unable to read deployment manifest: {}".format(e)})
+        return result
+
+    if isinstance(content, dict) and "content" in content:
+        content = content["content"]
+    modules_content = None
+    if isinstance(content, dict):
+        modules_content = content.get("modulesContent", content.get("moduleContent"))
+    if not isinstance(modules_content, dict):
+        result["errors"].append({"description": "Edge deployment manifests require property: modulesContent"})
+        return result
+
+    result["errors"] = get_edge_deployment_errors(modules_content)
+    return result
@@ -5,6 +5,7 @@
 # --------------------------------------------------------------------------------------------
 
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class AbstractBaseParser(ABC):
@@ -23,3 +24,23 @@ class AbstractBaseEventsHandler(ABC):
     @abstractmethod
     def parse_message(self, message):
         raise NotImplementedError()
+
+    def parse_messages(self, messages: list):
+        for message in messages:
+            self.parse_message(message)
+
+    def format_message(self, message) -> Optional[str]:
+        """
+        Filter and render a message without emitting it.
+        Returns None when the message is filtered out.
+        """
+        raise NotImplementedError()
+
+    def record_message(self) -> bool:
+        """
+        Record an emitted message. Returns True once the monitor should stop.
+        """
+        return False
+
+    def completion_string(self) -> str:
+        return ""
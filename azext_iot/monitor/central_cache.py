@@ -0,0 +1,235 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Optional
+from azure.cli.core.azclierror import ResourceNotFoundError
+from knack.log import get_logger
+
+from azext_iot.constants import CENTRAL_ENDPOINT
+from azext_iot.central import services as central_services
+from azext_iot.central.models.v2022_06_30_preview import TemplatePreview
+
+logger = get_logger(__name__)
+
+# Seconds a resolved device template or device to template mapping is reused.
+DEFAULT_CACHE_TTL = 300
+# Seconds a failed device or template lookup is remembered before it is retried.
+DEFAULT_NEGATIVE_CACHE_TTL = 60
+DEFAULT_CACHE_SIZE = 1024
+
+CACHE_FILE_VERSION = 1
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread safe least recently used cache whose entries expire after a time to live.
+    Expiry uses wall clock time so that entries can be persisted and reloaded.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None, expires: Optional[float] = None):
+        if expires is None:
+            expires = time.time() + (self._ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def items(self):
+        now = time.time()
+        with self._lock:
+            return [
+                (key, value, expires)
+                for key, (value, expires) in self._entries.items()
+                if expires > now
+            ]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class _Miss:
+    """
+    Negative cache entry, remembering why a lookup failed.
+    """
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class CentralTemplateCache:
+    """
+    Shared cache resolving the device template of IoT Central devices for telemetry validation.
+
+    Device to template id mappings and parsed templates are kept in TTL bounded LRU caches,
+    failed lookups are remembered for a shorter negative TTL so that unknown devices do not
+    trigger a request per message, and resolved entries can be persisted to a file to warm
+    start later runs against the same app.
+    """
+
+    def __init__(
+        self,
+        cmd,
+        app_id: str,
+        token=None,
+        central_dns_suffix=CENTRAL_ENDPOINT,
+        ttl: float = DEFAULT_CACHE_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        cache_file: Optional[str] = None,
+    ):
+        self._cmd = cmd
+        self._app_id = app_id
+        self._token = token
+        self._central_dns_suffix = central_dns_suffix
+        self._negative_ttl = negative_ttl
+        self._cache_file = cache_file
+        self._devices = TTLCache(max_size=max_size, ttl=ttl)
+        self._templates = TTLCache(max_size=max_size, ttl=ttl)
+        if cache_file:
+            self.load(cache_file)
+
+    def get_template(self, device_id: str) -> TemplatePreview:
+        template_id = self._get_template_id(device_id)
+        return self._get_device_template(template_id)
+
+    def _get_template_id(self, device_id: str) -> str:
+        template_id = self._lookup(self._devices, device_id)
+        if template_id is not _MISSING:
+            return template_id
+
+        try:
+            device = central_services.device.get_device(
+                cmd=self._cmd,
+                app_id=self._app_id,
+                device_id=device_id,
+                token=self._token,
+                central_dns_suffix=self._central_dns_suffix,
+            )
+            if not device:
+                raise ResourceNotFoundError(
+                    "No device found with id: '{}'.".format(device_id)
+                )
+        except Exception as e:
+            self._devices.set(device_id, _Miss(e), ttl=self._negative_ttl)
+            raise
+
+        self._devices.set(device_id, device.template)
+        return device.template
+
+    def _get_device_template(self, template_id: str) -> TemplatePreview:
+        template = self._lookup(self._templates, template_id)
+        if template is not _MISSING:
+            return template
+
+        try:
+            template = central_services.device_template.get_device_template(
+                cmd=self._cmd,
+                app_id=self._app_id,
+                device_template_id=template_id,
+                token=self._token,
+                central_dns_suffix=self._central_dns_suffix,
+            )
+            if not template:
+                raise ResourceNotFoundError(
+                    "No device template for device template with id: '{}'.".format(
+                        template_id
+                    )
+                )
+        except Exception as e:
+            self._templates.set(template_id, _Miss(e), ttl=self._negative_ttl)
+            raise
+
+        self._templates.set(template_id, template)
+        return template
+
+    def _lookup(self, cache: TTLCache, key):
+        value = cache.get(key, _MISSING)
+        if isinstance(value, _Miss):
+            raise value.error
+        return value
+
+    def load(self, path: str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable template cache %s: %s", path, e)
+            return
+
+        if content.get("version") != CACHE_FILE_VERSION or content.get("app_id") != self._app_id:
+            return
+
+        now = time.time()
+        for device_id, entry in content.get("devices", {}).items():
+            if entry["expires"] > now:
+                self._devices.set(device_id, entry["template"], expires=entry["expires"])
+        for template_id, entry in content.get("templates", {}).items():
+            if entry["expires"] <= now:
+                continue
+            try:
+                template = TemplatePreview(entry["template"])
+            except Exception:  # pylint: disable=broad-except
+                continue
+            self._templates.set(template_id, template, expires=entry["expires"])
+
+    def save(self, path: Optional[str] = None):
+        path = path or self._cache_file
+        if not path:
+            return
+
+        content = {
+            "version": CACHE_FILE_VERSION,
+            "app_id": self._app_id,
+            "devices": {
+                device_id: {"template": template_id, "expires": expires}
+                for device_id, template_id, expires in self._devices.items()
+                if not isinstance(template_id, _Miss)
+            },
+            "templates": {
+                template_id: {"template": template.raw_template, "expires": expires}
+                for template_id, template, expires in self._templates.items()
+                if not isinstance(template, _Miss)
+            },
+        }
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            temp_path = "{}.tmp".format(path)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(content, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write template cache %s: %s", path, e)
@@ -4,7 +4,19 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-from azext_iot.monitor.central_validator.validate_schema import validate
+from azext_iot.monitor.central_validator.validate_schema import validate, compile_validator
 from azext_iot.monitor.central_validator.utils import extract_schema_type
+from azext_iot.monitor.central_validator.template_validator import (
+    FieldValidator,
+    TemplateValidator,
+    get_template_validator,
+)
 
-__all__ = ["validate", "extract_schema_type"]
+__all__ = [
+    "validate",
+    "compile_validator",
+    "extract_schema_type",
+    "FieldValidator",
+    "TemplateValidator",
+    "get_template_validator",
+]
@@ -0,0 +1,86 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import weakref
+
+from typing import Dict, Optional, Tuple
+
+from azext_iot.monitor.central_validator import utils
+from azext_iot.monitor.central_validator.validate_schema import compile_validator
+
+_template_validators = weakref.WeakKeyDictionary()
+_template_validators_lock = threading.Lock()
+
+
+class FieldValidator:
+    """
+    Schema, expected type and compiled validation function of a single template field.
+    """
+
+    __slots__ = ["schema", "schema_type", "validate"]
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.schema_type = utils.extract_schema_type(schema)
+        self.validate = compile_validator(schema)
+
+
+class TemplateValidator:
+    """
+    Flat lookup table of compiled field validators for a device template.
+
+    Fields are keyed by (interface or component, name), with a separate table resolving
+    names without an identifier to the first interface defining them, so that lookups
+    match Template.get_schema without scanning every interface.
+    """
+
+    def __init__(self, template):
+        self.interfaces = self._compile_entities(template.interfaces)
+        self.components = self._compile_entities(template.components or {})
+        self._interface_names = self._index_names(self.interfaces)
+        self._component_names = self._index_names(self.components)
+
+    def get(
+        self, name: str, is_component=False, identifier=""
+    ) -> Optional[FieldValidator]:
+        if identifier:
+            entities = self.components if is_component else self.interfaces
+            return entities.get((identifier, name))
+
+        names = self._component_names if is_component else self._interface_names
+        return names.get(name)
+
+    def _compile_entities(self, entities: dict) -> Dict[Tuple[str, str], FieldValidator]:
+        return {
+            (identifier, name): FieldValidator(schema)
+            for identifier, entry in entities.items()
+            if isinstance(entry, dict)
+            for name, schema in entry.items()
+            if schema
+        }
+
+    def _index_names(
+        self, compiled: Dict[Tuple[str, str], FieldValidator]
+    ) -> Dict[str, FieldValidator]:
+        # first definition of a name wins, as when scanning entities in order
+        names = {}
+        for (_, name), field_validator in compiled.items():
+            names.setdefault(name, field_validator)
+        return names
+
+
+def get_template_validator(template) -> TemplateValidator:
+    """
+    Return the compiled validator of a template, compiling it on first use.
+    Validators live as long as their template object.
+    """
+    with _template_validators_lock:
+        validator = _template_validators.get(template)
+        if validator is None:
+            validator = TemplateValidator(template)
+            _template_validators[template] = validator
+        return validator
@@ -3,6 +3,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+from functools import partial
+from typing import Callable
+
 from azext_iot.common.utility import ISO8601Validator
 from azext_iot.monitor.central_validator import utils
 from azext_iot.monitor.central_validator.validators import enum, geopoint, obj, vector
@@ -49,3 +52,34 @@ def validate(schema, value):
         return False
 
     return validate_function(schema, value)
+
+
+# builders returning a single argument validator with the schema already interpreted,
+# types not listed here bind the schema to their validation_function_factory entry
+compile_function_factory = {
+    "Enum": enum.create_validator,
+    "Object": obj.create_validator,
+}
+
+
+def compile_validator(schema) -> Callable[[object], bool]:
+    """
+    Interpret a schema once and return a function validating values against it,
+    equivalent to calling validate(schema, value).
+    """
+    schema_type = utils.extract_schema_type(schema)
+    compile_function = compile_function_factory.get(schema_type)
+    if compile_function:
+        check = compile_function(schema)
+    elif schema_type in validation_function_factory:
+        check = partial(validation_function_factory[schema_type], schema)
+    else:
+        # no or invalid schema type detected
+        def check(value):
+            return False
+
+    def _validate(value):
+        # if theres nothing to validate, then its valid
+        return value is None or check(value)
+
+    return _validate
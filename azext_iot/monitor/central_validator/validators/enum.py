@@ -15,3 +15,21 @@ def validate(schema, value):
     allowed_values = [item["enumValue"] for item in enum_values if "enumValue" in item]
 
     return value in allowed_values
+
+
+def create_validator(schema):
+    enum_values = schema.get("schema", {}).get("enumValues", [])
+    allowed_values = [item["enumValue"] for item in enum_values if "enumValue" in item]
+    try:
+        allowed_values = frozenset(allowed_values)
+    except TypeError:
+        pass
+
+    def _validate(value):
+        try:
+            return value in allowed_values
+        except TypeError:
+            # unhashable values can not be enum values
+            return False
+
+    return _validate
@@ -25,3 +25,23 @@ def validate(schema: dict, value: dict):
             return False
 
     return True
+
+
+def create_validator(schema: dict):
+    fields = schema.get("schema", {}).get("fields", [])
+    field_validators = {
+        field["name"]: validate_schema.compile_validator(field) for field in fields
+    }
+
+    def _validate(value):
+        if not isinstance(value, dict):
+            return False
+
+        for key, val in value.items():
+            field_validator = field_validators.get(key)
+            if not field_validator or not field_validator(val):
+                return False
+
+        return True
+
+    return _validate
@@ -0,0 +1,115 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import json
+import os
+import re
+import threading
+
+from typing import Dict, Optional
+from knack.log import get_logger
+
+from azext_iot.monitor.models.target import Target
+
+logger = get_logger(__name__)
+
+# Seconds between periodic checkpoint flushes.
+CHECKPOINT_FLUSH_INTERVAL = 5
+
+OFFSET_IDENTIFIER = b"x-opt-offset"
+SEQUENCE_NUMBER_IDENTIFIER = b"x-opt-sequence-number"
+ENQUEUED_TIME_IDENTIFIER = b"x-opt-enqueued-time"
+
+
+class CheckpointStore:
+    """
+    Local file based store of the last received offset per Event Hub partition.
+
+    Checkpoints are kept in memory as messages are received and written to disk
+    periodically and on shutdown. Each partition has its own file under a directory
+    per event hub and consumer group, so monitors sharding the same hub across
+    processes never write to the same file.
+    """
+
+    def __init__(self, directory: str, flush_interval: int = CHECKPOINT_FLUSH_INTERVAL):
+        self._directory = directory
+        self._flush_interval = flush_interval
+        self._checkpoints: Dict[str, dict] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def get_offset(self, target: Target, partition: str) -> Optional[str]:
+        path = self._get_path(target, partition)
+        checkpoint = self._checkpoints.get(path)
+        if checkpoint is None:
+            checkpoint = self._load(path)
+            self._checkpoints[path] = checkpoint
+        return checkpoint.get("offset")
+
+    def update(self, target: Target, partition: str, message):
+        annotations = message.annotations or {}
+        offset = annotations.get(OFFSET_IDENTIFIER)
+        if offset is None:
+            return
+        if isinstance(offset, bytes):
+            offset = str(offset, "utf8")
+
+        path = self._get_path(target, partition)
+        with self._lock:
+            self._checkpoints[path] = {
+                "partition": partition,
+                "consumer_group": target.consumer_group,
+                "offset": str(offset),
+                "sequence_number": annotations.get(SEQUENCE_NUMBER_IDENTIFIER),
+                "enqueued_time": annotations.get(ENQUEUED_TIME_IDENTIFIER),
+            }
+            self._dirty.add(path)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._flush_handle = loop.call_later(self._flush_interval, self._periodic_flush, loop)
+
+    def stop(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending = {path: dict(self._checkpoints[path]) for path in self._dirty}
+            self._dirty.clear()
+
+        for path, checkpoint in pending.items():
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = "{}.tmp".format(path)
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(checkpoint, f, default=str)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning("Failed to write checkpoint %s: %s", path, e)
+
+    def _periodic_flush(self, loop: asyncio.AbstractEventLoop):
+        self.flush()
+        self._flush_handle = loop.call_later(self._flush_interval, self._periodic_flush, loop)
+
+    def _get_path(self, target: Target, partition: str) -> str:
+        name = "{}_{}_{}".format(target.hostname, target.path, target.consumer_group)
+        return os.path.join(
+            self._directory, re.sub(r"[^\w.-]", "_", name), "{}.json".format(partition)
+        )
+
+    def _load(self, path: str) -> dict:
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+            return {}
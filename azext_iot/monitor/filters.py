@@ -0,0 +1,136 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import re
+
+from typing import Callable, Dict, List, Optional
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from uamqp.message import Message
+
+from azext_iot.monitor.models.arguments import CommonHandlerArguments
+from azext_iot.monitor.parsers.common_parser import (
+    DEVICE_ID_IDENTIFIER,
+    MODULE_ID_IDENTIFIER,
+    INTERFACE_NAME_IDENTIFIER_V1,
+    INTERFACE_NAME_IDENTIFIER_V2,
+)
+
+
+def parse_property_filters(property_filters: Optional[List[str]]) -> Dict[str, str]:
+    """
+    Convert a list of key=value strings into a property filter dictionary.
+    """
+    result = {}
+    for property_filter in property_filters or []:
+        key, sep, value = property_filter.partition("=")
+        if not sep or not key:
+            raise InvalidArgumentValueError(
+                "Property filter '{}' must be in the format key=value.".format(property_filter)
+            )
+        result[key] = value
+    return result
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf8")
+
+
+def _compile_id_match(expected_id: str) -> Optional[Callable[[bytes], bool]]:
+    """
+    Build a matcher over the raw (utf8 encoded) annotation value. Supports * and ? wildcards.
+    """
+    if not expected_id:
+        return None
+
+    expected = expected_id.encode("utf8")
+    if "*" not in expected_id and "?" not in expected_id:
+        return lambda actual: actual == expected
+
+    regex = re.compile(
+        re.escape(expected).replace(b"\\*", b".*").replace(b"\\?", b".") + b"$"
+    )
+    return lambda actual: actual is not None and regex.match(actual) is not None
+
+
+class MessageFilter:
+    """
+    Device, module, interface and application property filters for monitored events.
+
+    Filters are compiled once and evaluated against the raw AMQP annotations and
+    application properties, so messages that are filtered out are never decoded.
+    """
+
+    def __init__(
+        self,
+        device_id: str = "",
+        devices: Optional[list] = None,
+        module_id: str = "",
+        interface_name: str = "",
+        property_filters: Optional[Dict[str, str]] = None,
+    ):
+        self._device_match = _compile_id_match(device_id)
+        self._devices = frozenset(_to_bytes(device) for device in devices or [])
+        self._module_match = _compile_id_match(module_id)
+        self._interface_name = interface_name.encode("utf8") if interface_name else None
+        self._property_matches = [
+            (_to_bytes(key), _compile_id_match(value) or (lambda actual: actual == b""))
+            for key, value in (property_filters or {}).items()
+        ]
+        self.is_empty = not (
+            self._device_match
+            or self._devices
+            or self._module_match
+            or self._interface_name
+            or self._property_matches
+        )
+
+    @classmethod
+    def from_handler_args(cls, common_handler_args: CommonHandlerArguments):
+        return cls(
+            device_id=common_handler_args.device_id,
+            devices=common_handler_args.devices,
+            module_id=common_handler_args.module_id,
+            interface_name=common_handler_args.interface_name,
+            property_filters=common_handler_args.property_filters,
+        )
+
+    def matches(self, message: Message) -> bool:
+        if self.is_empty:
+            return True
+
+        annotations = message.annotations or {}
+
+        if self._device_match or self._devices:
+            device_id = annotations.get(DEVICE_ID_IDENTIFIER)
+            if self._device_match and not self._device_match(device_id):
+                return False
+            if self._devices and device_id not in self._devices:
+                return False
+
+        if self._module_match:
+            module_id = annotations.get(MODULE_ID_IDENTIFIER) or b""
+            if not self._module_match(module_id):
+                return False
+
+        if self._interface_name:
+            interface_name = annotations.get(
+                INTERFACE_NAME_IDENTIFIER_V1
+            ) or annotations.get(INTERFACE_NAME_IDENTIFIER_V2)
+            if interface_name != self._interface_name:
+                return False
+
+        if self._property_matches:
+            application_properties = message.application_properties or {}
+            for key, match in self._property_matches:
+                value = application_properties.get(key)
+                if value is None:
+                    value = application_properties.get(key.decode("utf8"))
+                if value is None or not match(_to_bytes(value)):
+                    return False
+
+        return True
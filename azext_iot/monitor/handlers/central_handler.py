@@ -7,7 +7,7 @@
 import csv
 import sys
 
-from typing import List
+from typing import List, Optional
 from knack.log import get_logger
 
 from azext_iot.monitor.utility import stop_monitor, get_loop
@@ -15,6 +15,7 @@ from azext_iot.central.providers import (
     CentralDeviceProvider,
     CentralDeviceTemplateProvider,
 )
+from azext_iot.monitor.central_cache import CentralTemplateCache
 from azext_iot.monitor.handlers import CommonHandler
 from azext_iot.monitor.models.arguments import CentralHandlerArguments
 from azext_iot.monitor.parsers.central_parser import CentralParser
@@ -30,6 +31,7 @@ class CentralHandler(CommonHandler):
         central_template_provider: CentralDeviceTemplateProvider,
         central_handler_args: CentralHandlerArguments,
         central_dns_suffix: str,
+        template_cache: Optional[CentralTemplateCache] = None,
     ):
         super(CentralHandler, self).__init__(
             common_handler_args=central_handler_args.common_handler_args
@@ -37,6 +39,7 @@ class CentralHandler(CommonHandler):
 
         self._central_device_provider = central_device_provider
         self._central_template_provider = central_template_provider
+        self._template_cache = template_cache
 
         self._central_handler_args = central_handler_args
 
@@ -52,20 +55,18 @@ class CentralHandler(CommonHandler):
             )
 
     def validate_message(self, message):
+        if not self._filter.matches(message):
+            return
+
         parser = CentralParser(
             message=message,
             common_parser_args=self._common_handler_args.common_parser_args,
             central_device_provider=self._central_device_provider,
             central_template_provider=self._central_template_provider,
             central_dns_suffix=self._central_dns_suffix,
+            template_cache=self._template_cache,
         )
 
-        if not self._should_process_device(parser.device_id):
-            return
-
-        if not self._should_process_module(parser.module_id):
-            return
-
         parsed_message = parser.parse_message()
 
         self._messages.append(parsed_message)
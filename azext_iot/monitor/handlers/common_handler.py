@@ -5,12 +5,16 @@
 # --------------------------------------------------------------------------------------------
 
 import json
-import re
 import yaml
 
+from typing import Optional, Union
+
 from azext_iot.monitor.base_classes import AbstractBaseEventsHandler
+from azext_iot.monitor.filters import MessageFilter
 from azext_iot.monitor.parsers.common_parser import CommonParser
 from azext_iot.monitor.models.arguments import CommonHandlerArguments
+from azext_iot.monitor.models.enum import OutputFormatType
+from azext_iot.monitor.sinks import load_msgpack
 from azext_iot.monitor.utility import stop_monitor
 
 
@@ -18,72 +22,54 @@ class CommonHandler(AbstractBaseEventsHandler):
     def __init__(self, common_handler_args: CommonHandlerArguments):
         super(CommonHandler, self).__init__()
         self._common_handler_args = common_handler_args
+        self._filter = MessageFilter.from_handler_args(common_handler_args)
         self.message_count = 0
+        self._output_format = common_handler_args.output_format
+        self._msgpack = None
+        if self._output_format == OutputFormatType.msgpack.value:
+            self._msgpack = load_msgpack()
 
     def parse_message(self, message):
-        parser = CommonParser(
-            message=message,
-            common_parser_args=self._common_handler_args.common_parser_args,
-        )
-
-        if not self._should_process_device(parser.device_id):
+        dump = self.format_message(message)
+        if dump is None:
             return
 
-        if not self._should_process_interface(parser.interface_name):
-            return
-
-        if not self._should_process_module(parser.module_id):
-            return
-
-        result = parser.parse_message()
-
-        if self._common_handler_args.output.lower() == "json":
-            dump = json.dumps(result, indent=4)
-        else:
-            dump = yaml.safe_dump(result, default_flow_style=False)
-
         print(dump, flush=True)
 
-        self.message_count += 1
-        if self._common_handler_args.max_messages and self.message_count == self._common_handler_args.max_messages:
-            message = "Successfully parsed {} message(s).".format(self._common_handler_args.max_messages)
-            print(message, flush=True)
+        if self.record_message():
+            print(self.completion_string(), flush=True)
             stop_monitor()
 
-    def _should_process_device(self, device_id):
-        expected_device_id = self._common_handler_args.device_id
-        expected_devices = self._common_handler_args.devices
+    def format_message(self, message) -> Optional[Union[str, bytes]]:
+        if not self._filter.matches(message):
+            return None
 
-        process_device = self._perform_id_match(expected_device_id, device_id)
+        parser = CommonParser(
+            message=message,
+            common_parser_args=self._common_handler_args.common_parser_args,
+        )
 
-        if expected_devices and device_id not in expected_devices:
-            return False
+        result = parser.parse_message()
 
-        return process_device
+        if self._output_format == OutputFormatType.ndjson.value:
+            return json.dumps(result, separators=(",", ":"), default=str)
 
-    def _perform_id_match(self, expected_id, actual_id):
-        if expected_id and expected_id != actual_id:
-            if "*" in expected_id or "?" in expected_id:
-                regex = (
-                    re.escape(expected_id).replace("\\*", ".*").replace("\\?", ".")
-                    + "$"
-                )
-                if not re.match(regex, actual_id):
-                    return False
-            else:
-                return False
-        return True
+        if self._msgpack:
+            return self._msgpack.packb(result, use_bin_type=True, default=str)
 
-    def _should_process_interface(self, interface_name):
-        expected_interface_name = self._common_handler_args.interface_name
+        if self._common_handler_args.output.lower() == "json":
+            return json.dumps(result, indent=4)
 
-        # if no filter is specified, then process all interfaces
-        if not expected_interface_name:
-            return True
+        return yaml.safe_dump(result, default_flow_style=False)
 
-        # only process if the expected and actual interface name match
-        return expected_interface_name == interface_name
+    def record_message(self) -> bool:
+        self.message_count += 1
+        return bool(
+            self._common_handler_args.max_messages
+            and self.message_count == self._common_handler_args.max_messages
+        )
 
-    def _should_process_module(self, module_id):
-        expected_module_id = self._common_handler_args.module_id
-        return self._perform_id_match(expected_module_id, module_id)
+    def completion_string(self) -> str:
+        return "Successfully parsed {} message(s).".format(
+            self._common_handler_args.max_messages
+        )
@@ -0,0 +1,224 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import multiprocessing
+import queue
+
+from typing import List, Optional, Union
+from knack.log import get_logger
+
+from azext_iot.monitor.models.arguments import CommonHandlerArguments
+from azext_iot.monitor.sinks import StreamSink
+
+logger = get_logger(__name__)
+
+# Seconds to wait for monitor processes to exit before they are terminated.
+SHUTDOWN_TIMEOUT = 10
+RECORD_QUEUE_SIZE = 1024
+# Seconds between liveness checks of the monitor processes while no records arrive.
+PROCESS_POLL_INTERVAL = 1
+
+_OUTPUT = "output"
+_NOTICE = "notice"
+_ERROR = "error"
+_DONE = "done"
+
+
+class _QueueSink:
+    """
+    Event pipeline sink forwarding buffered output to the launcher process.
+    Each write carries whole records, so output from different processes never interleaves
+    within a record.
+    """
+
+    def __init__(self, records):
+        self._records = records
+
+    def write(self, data: Union[str, bytes]):
+        self._records.put((_OUTPUT, data))
+
+    def flush(self):
+        pass
+
+    def notice(self, text: str):
+        self._records.put((_NOTICE, text))
+
+    def close(self):
+        pass
+
+
+def start_sharded_monitors(
+    target: dict,
+    partition_groups: List[List[str]],
+    consumer_group: str,
+    enqueued_time_utc,
+    on_start_string: str,
+    common_handler_args: CommonHandlerArguments,
+    timeout=0,
+    prefetch=0,
+    batch_size: Optional[int] = None,
+    checkpoint_store_directory: Optional[str] = None,
+    sink=None,
+    flush_interval: Optional[float] = None,
+    stats_format: Optional[str] = None,
+    stats_interval: Optional[int] = None,
+):
+    """
+    Fan out event monitoring across one process per partition group and merge their output.
+
+    :param target:
+        IoT Hub target dictionary, including resolved "events" endpoint information.
+    :param partition_groups:
+        Partition ids assigned to each monitor process.
+    :param sink:
+        Sink receiving the merged output, stdout by default.
+    :param stats_format:
+        When set, each process reports stats for its own partitions to stderr.
+    """
+    sink = sink or StreamSink()
+    context = multiprocessing.get_context("spawn")
+    records = context.Queue(maxsize=RECORD_QUEUE_SIZE)
+    # the cli command is not serializable and is not needed to build event targets
+    target = {key: value for key, value in target.items() if key != "cmd"}
+
+    processes = [
+        context.Process(
+            target=_run_monitor_process,
+            kwargs={
+                "target": target,
+                "partitions": partitions,
+                "consumer_group": consumer_group,
+                "enqueued_time_utc": enqueued_time_utc,
+                "common_handler_args": common_handler_args,
+                "timeout": timeout,
+                "prefetch": prefetch,
+                "batch_size": batch_size,
+                "checkpoint_store_directory": checkpoint_store_directory,
+                "flush_interval": flush_interval,
+                "stats_format": stats_format,
+                "stats_interval": stats_interval,
+                "records": records,
+                "shard": shard,
+            },
+            daemon=True,
+        )
+        for shard, partitions in enumerate(partition_groups)
+    ]
+
+    sink.notice(on_start_string)
+    for process in processes:
+        process.start()
+
+    errors = []
+    try:
+        done = set()
+        # processes found dead on the previous poll, their last records may still be queued
+        exited = set()
+        while len(done) < len(processes):
+            try:
+                kind, payload = records.get(timeout=PROCESS_POLL_INTERVAL)
+            except queue.Empty:
+                failed = [
+                    shard
+                    for shard, process in enumerate(processes)
+                    if shard not in done and not process.is_alive() and shard in exited
+                ]
+                if failed:
+                    errors.extend(
+                        "Monitor process for partitions {} exited unexpectedly with exit code {}.".format(
+                            ", ".join(partition_groups[shard]), processes[shard].exitcode
+                        )
+                        for shard in failed
+                    )
+                    break
+                exited = {
+                    shard for shard, process in enumerate(processes) if not process.is_alive()
+                }
+                continue
+            if kind == _OUTPUT:
+                sink.write(payload)
+                sink.flush()
+            elif kind == _NOTICE:
+                sink.notice(payload)
+            elif kind == _ERROR:
+                errors.append(payload)
+            elif kind == _DONE:
+                done.add(payload)
+    except KeyboardInterrupt:
+        sink.notice("Stopping event monitor...")
+    finally:
+        for process in processes:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        sink.close()
+
+    if errors:
+        logger.debug(errors)
+        raise RuntimeError(errors[0])
+
+
+def _run_monitor_process(
+    target: dict,
+    partitions: List[str],
+    consumer_group: str,
+    enqueued_time_utc,
+    common_handler_args: CommonHandlerArguments,
+    timeout,
+    prefetch,
+    batch_size,
+    checkpoint_store_directory,
+    flush_interval,
+    stats_format,
+    stats_interval,
+    records,
+    shard,
+):
+    from azext_iot.monitor.builders.hub_target_builder import EventTargetBuilder
+    from azext_iot.monitor.checkpoint import CheckpointStore
+    from azext_iot.monitor.handlers import CommonHandler
+    from azext_iot.monitor.pipeline import EventPipeline
+    from azext_iot.monitor.stats import DEFAULT_STATS_INTERVAL, MonitorStats
+    from azext_iot.monitor.telemetry import start_single_monitor
+
+    try:
+        event_target = EventTargetBuilder().build_iot_hub_target(target)
+        event_target.partitions = partitions
+        event_target.add_consumer_group(consumer_group)
+
+        handler = CommonHandler(common_handler_args)
+        stats = (
+            MonitorStats(
+                stats_format=stats_format, interval=stats_interval or DEFAULT_STATS_INTERVAL
+            )
+            if stats_format
+            else None
+        )
+        start_single_monitor(
+            target=event_target,
+            enqueued_time_utc=enqueued_time_utc,
+            on_start_string=None,
+            on_message_received=handler.parse_message,
+            timeout=timeout,
+            pipeline=EventPipeline(
+                handler=handler,
+                sink=_QueueSink(records),
+                flush_interval=flush_interval,
+                stats=stats,
+            ),
+            prefetch=prefetch,
+            batch_size=batch_size,
+            checkpoint_store=(
+                CheckpointStore(checkpoint_store_directory) if checkpoint_store_directory else None
+            ),
+            stats=stats,
+        )
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:  # pylint: disable=broad-except
+        records.put((_ERROR, str(e)))
+    finally:
+        records.put((_DONE, shard))
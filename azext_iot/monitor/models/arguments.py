@@ -4,8 +4,9 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from azure.cli.core.azclierror import InvalidArgumentValueError
 from azure.cli.core.commands import AzCliCommand
-from azext_iot.common.utility import init_monitoring
+from azext_iot.common.utility import init_monitoring, init_receive_settings
 from azext_iot.monitor.models.enum import Severity
 from typing import Optional
 
@@ -19,6 +20,10 @@ class TelemetryArguments:
         enqueued_time: int,
         repair: bool,
         yes: bool,
+        prefetch: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        stats: Optional[str] = None,
+        stats_interval: Optional[int] = None,
     ):
         (enqueued_time, unique_properties, timeout_ms, output, _) = init_monitoring(
             cmd=cmd,
@@ -28,10 +33,17 @@ class TelemetryArguments:
             repair=repair,
             yes=yes,
         )
+        (prefetch, batch_size) = init_receive_settings(prefetch, batch_size)
+        if stats_interval is not None and stats_interval <= 0:
+            raise InvalidArgumentValueError("Stats interval must be greater than 0.")
         self.output = output
         self.timeout = timeout_ms
         self.properties = unique_properties
         self.enqueued_time = enqueued_time
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.stats = stats
+        self.stats_interval = stats_interval
 
 
 class CommonParserArguments:
@@ -52,6 +64,8 @@ class CommonHandlerArguments:
         interface_name="",
         module_id="",
         max_messages: Optional[int] = None,
+        property_filters: Optional[dict] = None,
+        output_format: Optional[str] = None,
     ):
         self.output = output
         self.devices = devices or []
@@ -60,6 +74,8 @@ class CommonHandlerArguments:
         self.module_id = module_id or ""
         self.common_parser_args = common_parser_args
         self.max_messages = max_messages
+        self.property_filters = property_filters or {}
+        self.output_format = output_format
 
 
 class CentralHandlerArguments:
@@ -5,10 +5,28 @@
 # --------------------------------------------------------------------------------------------
 
 
-from enum import IntEnum
+from enum import Enum, IntEnum
 
 
 class Severity(IntEnum):
     info = 1
     warning = 2
     error = 3
+
+
+class OutputFormatType(Enum):
+    """
+    Machine readable formats for streamed monitor output.
+    """
+
+    ndjson = "ndjson"
+    msgpack = "msgpack"
+
+
+class StatsFormatType(Enum):
+    """
+    Formats of event monitor stats reports.
+    """
+
+    text = "text"
+    json = "json"
@@ -6,12 +6,14 @@
 
 import re
 
+from typing import Optional
 from uamqp.message import Message
 
 from azext_iot.central.providers import CentralDeviceProvider
 from azext_iot.central.providers import CentralDeviceTemplateProvider
+from azext_iot.monitor.central_cache import CentralTemplateCache
 from azext_iot.monitor.parsers import strings
-from azext_iot.monitor.central_validator import validate, extract_schema_type
+from azext_iot.monitor.central_validator import FieldValidator, get_template_validator
 from azext_iot.monitor.models.arguments import CommonParserArguments
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.monitor.parsers.common_parser import CommonParser
@@ -27,12 +29,14 @@ class CentralParser(CommonParser):
         central_device_provider: CentralDeviceProvider,
         central_template_provider: CentralDeviceTemplateProvider,
         central_dns_suffix=CENTRAL_ENDPOINT,
+        template_cache: Optional[CentralTemplateCache] = None,
     ):
         super(CentralParser, self).__init__(
             message=message, common_parser_args=common_parser_args
         )
         self._central_device_provider = central_device_provider
         self._central_template_provider = central_template_provider
+        self._template_cache = template_cache
         self._central_dns_suffix = central_dns_suffix
         self._template_id = None
 
@@ -119,12 +123,15 @@ class CentralParser(CommonParser):
 
     def _get_template(self):
         try:
-            device = self._central_device_provider.get_device(
-                self.device_id, central_dns_suffix=self._central_dns_suffix
-            )
-            template = self._central_template_provider.get_device_template(
-                device.template, central_dns_suffix=self._central_dns_suffix
-            )
+            if self._template_cache:
+                template = self._template_cache.get_template(self.device_id)
+            else:
+                device = self._central_device_provider.get_device(
+                    self.device_id, central_dns_suffix=self._central_dns_suffix
+                )
+                template = self._central_template_provider.get_device_template(
+                    device.template, central_dns_suffix=self._central_dns_suffix
+                )
             self._template_id = template.id
             return template
         except Exception as e:
@@ -137,17 +144,18 @@ class CentralParser(CommonParser):
     def _validate_payload(
         self, payload: dict, template: TemplatePreview, is_component: bool
     ):
+        template_validator = get_template_validator(template)
         name_miss = []
         for telemetry_name, telemetry in payload.items():
-            schema = template.get_schema(
+            field_validator = template_validator.get(
                 name=telemetry_name,
                 identifier=self.component_name,
                 is_component=is_component,
             )
-            if not schema:
+            if not field_validator:
                 name_miss.append(telemetry_name)
             else:
-                self._process_telemetry(telemetry_name, schema, telemetry)
+                self._process_telemetry(telemetry_name, field_validator, telemetry)
 
         if name_miss:
             if is_component:
@@ -161,9 +169,11 @@ class CentralParser(CommonParser):
                 )
             self._add_central_issue(severity=Severity.warning, details=details)
 
-    def _process_telemetry(self, telemetry_name: str, schema, telemetry):
-        expected_type = extract_schema_type(schema)
-        is_payload_valid = validate(schema, telemetry)
+    def _process_telemetry(
+        self, telemetry_name: str, field_validator: FieldValidator, telemetry
+    ):
+        expected_type = field_validator.schema_type
+        is_payload_valid = field_validator.validate(telemetry)
         if expected_type and not is_payload_valid:
             details = strings.invalid_primitive_schema_mismatch_template(
                 telemetry_name, expected_type, telemetry
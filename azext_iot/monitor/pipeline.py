@@ -0,0 +1,264 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import itertools
+import os
+import queue
+import threading
+import time
+
+from typing import List, Optional
+from knack.log import get_logger
+
+from azext_iot.monitor.base_classes import AbstractBaseEventsHandler
+from azext_iot.monitor.checkpoint import CheckpointStore
+from azext_iot.monitor.sinks import StreamSink
+from azext_iot.monitor.stats import MonitorStats
+from azext_iot.monitor.utility import stop_monitor
+
+logger = get_logger(__name__)
+
+DEFAULT_PARSER_WORKERS = min(4, os.cpu_count() or 1)
+# Capacity of each stage in received batches; single messages are queued as a batch of one.
+DEFAULT_QUEUE_SIZE = 4096
+# Maximum number of rendered events held before the writer forces a flush.
+DEFAULT_WRITE_BUFFER_SIZE = 256
+# Minimum seconds between repeated backpressure warnings.
+BACKPRESSURE_WARNING_INTERVAL = 5
+BACKPRESSURE_WAIT = 0.01
+# Seconds between flushes of streamed machine readable output.
+OUTPUT_FLUSH_INTERVAL = 1
+
+_SENTINEL = object()
+
+
+class EventPipeline:
+    """
+    Staged event processing pipeline for the event monitor.
+
+    Receive tasks enqueue raw AMQP messages into a bounded queue, a pool of parser
+    threads filter and render them through the handler, and a single writer thread
+    performs buffered output to the sink. Batches are numbered as they are received and
+    the writer outputs them in that order, so events of a partition keep their order
+    regardless of which parser rendered them. Without a flush interval the writer flushes
+    whenever it runs out of pending records, so output stays interactive at low rates
+    and is batched under load. With a flush interval, flushes happen on that timer or
+    when the write buffer is full.
+
+    With a checkpoint store, batches carry the Event Hub partition they were received
+    from, and the partition checkpoint only advances once their records have been written
+    and flushed, so a resumed monitor never skips events that were not output.
+    """
+
+    def __init__(
+        self,
+        handler: AbstractBaseEventsHandler,
+        workers: int = DEFAULT_PARSER_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        write_buffer_size: int = DEFAULT_WRITE_BUFFER_SIZE,
+        sink=None,
+        flush_interval: Optional[float] = None,
+        stats: Optional[MonitorStats] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+    ):
+        self._handler = handler
+        self._workers_count = max(1, workers or 1)
+        self._write_buffer_size = max(1, write_buffer_size)
+        self._sink = sink or StreamSink()
+        self._flush_interval = flush_interval
+        self._receive_queue = queue.Queue(maxsize=queue_size)
+        self._output_queue = queue.Queue(maxsize=queue_size)
+        self._sequence = itertools.count()
+        self.checkpoint_store = checkpoint_store
+        # last written message per (target, partition), checkpointed on the next flush
+        self._pending_checkpoints = {}
+        self._workers: List[threading.Thread] = []
+        self._writer: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._completed = threading.Event()
+        self._last_backpressure_warning = 0
+        self.backpressure_count = 0
+        self._stats = stats
+        if stats:
+            stats.set_queue_depth(lambda: self.queue_depth)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._receive_queue.qsize()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        for i in range(self._workers_count):
+            worker = threading.Thread(
+                target=self._parse_events, name="monitor-parser-{}".format(i), daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        self._writer = threading.Thread(
+            target=self._write_events, name="monitor-writer", daemon=True
+        )
+        self._writer.start()
+
+    def stop(self):
+        """
+        Drain in-flight events and stop all pipeline threads.
+        """
+        for _ in self._workers:
+            self._receive_queue.put(_SENTINEL)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+        if self._writer:
+            self._output_queue.put(_SENTINEL)
+            self._writer.join()
+            self._writer = None
+
+        self._sink.close()
+
+    def notice(self, text: str):
+        self._sink.notice(text)
+
+    async def put(self, message, checkpoint: Optional[tuple] = None):
+        await self.put_batch([message], checkpoint=checkpoint)
+
+    async def put_batch(self, messages: list, checkpoint: Optional[tuple] = None):
+        """
+        Enqueue a batch of received messages. When the queue is full the calling receive
+        task yields until parser workers catch up, applying backpressure to the link.
+
+        :param checkpoint: The (target, partition) the messages were received from.
+        """
+        if self._completed.is_set():
+            return
+
+        item = (next(self._sequence), messages, checkpoint)
+        while True:
+            try:
+                self._receive_queue.put_nowait(item)
+                return
+            except queue.Full:
+                self._report_backpressure()
+                await asyncio.sleep(BACKPRESSURE_WAIT)
+
+    def _report_backpressure(self):
+        self.backpressure_count += 1
+        now = time.monotonic()
+        if now - self._last_backpressure_warning >= BACKPRESSURE_WARNING_INTERVAL:
+            self._last_backpressure_warning = now
+            logger.warning(
+                "Event queue is full (%s pending batches). Receiving is paused until parsing catches up.",
+                self._receive_queue.maxsize,
+            )
+
+    def _parse_events(self):
+        while True:
+            item = self._receive_queue.get()
+            if item is _SENTINEL:
+                return
+            sequence, messages, checkpoint = item
+            # batches are handed on after completion too, so the writer does not wait for them
+            records = [] if self._completed.is_set() else self._format_messages(messages)
+            self._output_queue.put((sequence, records, messages[-1] if messages else None, checkpoint))
+
+    def _format_messages(self, messages: list) -> list:
+        """
+        Returns the rendered messages, each paired with its message.
+        """
+        records = []
+        for message in messages:
+            start = time.perf_counter() if self._stats else None
+            try:
+                dump = self._handler.format_message(message)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug("Failed to parse event: %s", e)
+                continue
+            finally:
+                if start is not None:
+                    self._stats.record_timing("parse", time.perf_counter() - start)
+            if dump is not None:
+                records.append((dump, message))
+        return records
+
+    def _write_events(self):
+        buffer = []
+        # batches rendered ahead of an earlier batch, by sequence number
+        pending = {}
+        next_sequence = 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._output_queue.get(timeout=self._get_flush_wait(buffer, last_flush))
+            except queue.Empty:
+                self._flush(buffer)
+                last_flush = time.monotonic()
+                continue
+
+            if item is _SENTINEL:
+                self._flush(buffer)
+                return
+
+            pending[item[0]] = item[1:]
+            while next_sequence in pending:
+                self._write_records(*pending.pop(next_sequence), buffer=buffer)
+                next_sequence += 1
+
+            now = time.monotonic()
+            if len(buffer) >= self._write_buffer_size or (
+                self._flush_interval is not None and now - last_flush >= self._flush_interval
+            ):
+                self._flush(buffer)
+                last_flush = now
+
+    def _write_records(self, records: list, last_message, checkpoint: Optional[tuple], buffer: list):
+        checkpoint = checkpoint if self.checkpoint_store else None
+        for dump, message in records:
+            if self._completed.is_set():
+                return
+            buffer.append(dump)
+            if checkpoint:
+                self._pending_checkpoints[checkpoint] = message
+            if self._handler.record_message():
+                self._flush(buffer)
+                self._sink.notice(self._handler.completion_string())
+                self._complete()
+        # filtered messages at the end of the batch need no output before their checkpoint
+        if checkpoint and last_message is not None and not self._completed.is_set():
+            self._pending_checkpoints[checkpoint] = last_message
+
+    def _get_flush_wait(self, buffer: list, last_flush: float) -> Optional[float]:
+        # block until new records arrive when there is nothing to flush
+        if not buffer and not self._pending_checkpoints:
+            return None
+        if self._flush_interval is None:
+            return 0
+        return max(0, last_flush + self._flush_interval - time.monotonic())
+
+    def _flush(self, buffer: list):
+        if buffer:
+            self._write_buffer(buffer)
+        # records are written and flushed, their partitions can move forward
+        for (target, partition), message in self._pending_checkpoints.items():
+            self.checkpoint_store.update(target, partition, message)
+        self._pending_checkpoints.clear()
+
+    def _write_buffer(self, buffer: list):
+        start = time.perf_counter()
+        if isinstance(buffer[0], bytes):
+            # binary records are self-delimiting
+            self._sink.write(b"".join(buffer))
+        else:
+            self._sink.write("\n".join(buffer) + "\n")
+        self._sink.flush()
+        if self._stats:
+            self._stats.record_timing("output", time.perf_counter() - start)
+        buffer.clear()
+
+    def _complete(self):
+        self._completed.set()
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(stop_monitor)
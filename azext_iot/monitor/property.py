@@ -6,9 +6,15 @@
 
 from azext_iot.central.models.enum import ApiVersion
 import datetime
+import heapq
+import random
 
 import isodate
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Callable, List, Optional
+from knack.log import get_logger
 from azext_iot.monitor.parsers import strings
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.constants import (
@@ -18,7 +24,7 @@ from azext_iot.constants import (
     PNP_DTDLV2_COMPONENT_MARKER,
 )
 
-from azext_iot.central.models.devicetwin import Property
+from azext_iot.central.models.devicetwin import DeviceTwin, Property
 
 from azext_iot.central.providers import (
     CentralDeviceProvider,
@@ -26,6 +32,19 @@ from azext_iot.central.providers import (
 )
 from azext_iot.monitor.parsers.issue import IssueHandler
 
+logger = get_logger(__name__)
+
+# Maximum number of device twins requested concurrently when monitoring many devices.
+DEFAULT_POLLING_CONCURRENCY = 8
+# Fraction of the polling interval by which each poll is randomly moved, spreading requests.
+DEFAULT_POLLING_JITTER = 0.1
+PARSED_TIMESTAMP_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PARSED_TIMESTAMP_CACHE_SIZE)
+def _parse_timestamp(value: str) -> float:
+    return isodate.parse_datetime(value).timestamp()
+
 
 class PropertyMonitor:
     def __init__(
@@ -35,54 +54,70 @@ class PropertyMonitor:
         device_id: str,
         token: str,
         central_dns_suffix=CENTRAL_ENDPOINT,
+        central_device_provider: Optional[CentralDeviceProvider] = None,
+        central_template_provider: Optional[CentralDeviceTemplateProvider] = None,
     ):
         self._cmd = cmd
         self._app_id = app_id
         self._device_id = device_id
         self._token = token
         self._central_dns_suffix = central_dns_suffix
-        self._central_device_provider = CentralDeviceProvider(
+        self._central_device_provider = central_device_provider or CentralDeviceProvider(
             cmd=self._cmd,
             app_id=self._app_id,
             token=self._token,
             api_version=ApiVersion.ga.value,
         )
-        self._central_template_provider = CentralDeviceTemplateProvider(
+        self._central_template_provider = central_template_provider or CentralDeviceTemplateProvider(
             cmd=self._cmd,
             app_id=self._app_id,
             token=self._token,
             api_version=ApiVersion.ga.value,
         )
         self._template = self._get_device_template()
+        self._prev_twin: Optional[DeviceTwin] = None
+        self.show_device_id = False
+
+    @property
+    def device_id(self) -> str:
+        return self._device_id
 
     def _compare_properties(self, prev_prop: Property, prop: Property):
         if prev_prop.version == prop.version:
             return
 
+        # computed once per comparison rather than per property
+        updated_within = (
+            datetime.datetime.now()
+            - datetime.timedelta(seconds=DEVICETWIN_MONITOR_TIME_SEC)
+        ).timestamp()
+
         changes = {
             key: self._changed_props(
                 prop.props[key],
                 prop.metadata[key],
                 key,
+                updated_within,
             )
             for key, val in prop.metadata.items()
-            if self._is_relevant(key, val)
+            if self._is_relevant(key, val, updated_within)
         }
 
         return changes
 
-    def _is_relevant(self, key, val):
+    def _is_relevant(self, key, val, updated_within: Optional[float] = None):
         if key in {"$lastUpdated", "$lastUpdatedVersion"}:
             return False
 
-        updated_within = datetime.datetime.now() - datetime.timedelta(
-            seconds=DEVICETWIN_MONITOR_TIME_SEC
-        )
+        if updated_within is None:
+            updated_within = (
+                datetime.datetime.now()
+                - datetime.timedelta(seconds=DEVICETWIN_MONITOR_TIME_SEC)
+            ).timestamp()
 
-        last_updated = isodate.parse_datetime(val["$lastUpdated"])
-        return last_updated.timestamp() >= updated_within.timestamp()
+        return _parse_timestamp(val["$lastUpdated"]) >= updated_within
 
-    def _changed_props(self, prop, metadata, property_name):
+    def _changed_props(self, prop, metadata, property_name, updated_within: Optional[float] = None):
 
         # not an interface - whole thing is change log
         if not self._is_component(prop):
@@ -94,7 +129,7 @@ class PropertyMonitor:
         diff = {
             key: prop[key]
             for key, val in metadata.items()
-            if self._is_relevant(key, val)
+            if self._is_relevant(key, val, updated_within)
         }
         return diff
 
@@ -175,57 +210,162 @@ class PropertyMonitor:
         )
         return template
 
-    def start_property_monitor(
-        self,
-    ):
-        prev_twin = None
+    def get_device_twin(self) -> DeviceTwin:
+        return self._central_device_provider.get_device_twin(
+            device_id=self._device_id,
+            central_dns_suffix=self._central_dns_suffix
+        )
 
-        while True:
-            twin = self._central_device_provider.get_device_twin(
-                device_id=self._device_id,
-                central_dns_suffix=self._central_dns_suffix
-            )
+    def _swap_twin(self, twin: DeviceTwin) -> Optional[DeviceTwin]:
+        prev_twin = self._prev_twin
+        self._prev_twin = twin
+        return prev_twin
+
+    def _print_changes(self, name: str, prop: Property, changes: dict):
+        print("Changes in {}:".format(name))
+        if self.show_device_id:
+            print("device :", self._device_id)
+        print("version :", prop.version)
+        print(changes)
+
+    def process_property_changes(self, twin: DeviceTwin):
+        prev_twin = self._swap_twin(twin)
+        if not prev_twin:
+            return
 
-            if prev_twin:
-                change_d = self._compare_properties(
-                    prev_twin.desired_property,
-                    twin.desired_property,
-                )
-                change_r = self._compare_properties(
-                    prev_twin.reported_property, twin.reported_property
-                )
+        change_d = self._compare_properties(
+            prev_twin.desired_property,
+            twin.desired_property,
+        )
+        change_r = self._compare_properties(
+            prev_twin.reported_property, twin.reported_property
+        )
 
-                if change_d:
-                    print("Changes in desired properties:")
-                    print("version :", twin.desired_property.version)
-                    print(change_d)
+        if change_d:
+            self._print_changes("desired properties", twin.desired_property, change_d)
 
-                if change_r:
-                    print("Changes in reported properties:")
-                    print("version :", twin.reported_property.version)
-                    print(change_r)
+        if change_r:
+            self._print_changes("reported properties", twin.reported_property, change_r)
+
+    def validate_property_changes(self, twin: DeviceTwin, minimum_severity):
+        prev_twin = self._swap_twin(twin)
+        if not prev_twin:
+            return
 
-            time.sleep(DEVICETWIN_POLLING_INTERVAL_SEC)
+        change_r = self._compare_properties(
+            prev_twin.reported_property, twin.reported_property
+        )
+        if change_r:
+            self._validate_payload(change_r, minimum_severity)
 
-            prev_twin = twin
+    def start_property_monitor(
+        self,
+    ):
+        PropertyMonitorScheduler([self]).start(PropertyMonitor.process_property_changes)
 
     def start_validate_property_monitor(self, minimum_severity):
-        prev_twin = None
+        PropertyMonitorScheduler([self]).start(
+            lambda monitor, twin: monitor.validate_property_changes(twin, minimum_severity)
+        )
 
-        while True:
 
-            twin = self._central_device_provider.get_device_twin(
-                device_id=self._device_id,
-                central_dns_suffix=self._central_dns_suffix
-            )
+class PropertyMonitorScheduler:
+    """
+    Polls the twins of many devices from a single scheduler.
 
-            if prev_twin:
-                change_r = self._compare_properties(
-                    prev_twin.reported_property, twin.reported_property
-                )
-                if change_r:
-                    self._validate_payload(change_r, minimum_severity)
+    Each device is polled every interval, offset by a random jitter so that requests for
+    many devices are spread out rather than sent in bursts. Twin requests run on a bounded
+    thread pool while changes are processed on the calling thread, one device at a time.
+    """
 
-            time.sleep(DEVICETWIN_POLLING_INTERVAL_SEC)
+    def __init__(
+        self,
+        monitors: List[PropertyMonitor],
+        interval: float = DEVICETWIN_POLLING_INTERVAL_SEC,
+        concurrency: int = DEFAULT_POLLING_CONCURRENCY,
+        jitter: float = DEFAULT_POLLING_JITTER,
+    ):
+        self._monitors = monitors
+        self._interval = interval
+        self._concurrency = max(1, min(concurrency, len(monitors)))
+        self._jitter = jitter
+        if len(monitors) > 1:
+            for monitor in monitors:
+                monitor.show_device_id = True
+
+    def start(self, on_twin_received: Callable[[PropertyMonitor, DeviceTwin], None]):
+        now = time.monotonic()
+        # spread the first poll of each device across the interval
+        spread = self._interval if len(self._monitors) > 1 else 0
+        schedule = [
+            (now + random.uniform(0, spread), index)
+            for index in range(len(self._monitors))
+        ]
+        heapq.heapify(schedule)
+
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            pending = {}
+            while schedule or pending:
+                now = time.monotonic()
+                while schedule and schedule[0][0] <= now:
+                    _, index = heapq.heappop(schedule)
+                    future = executor.submit(self._monitors[index].get_device_twin)
+                    pending[future] = index
+
+                timeout = max(0, schedule[0][0] - now) if schedule else None
+                if not pending:
+                    time.sleep(timeout)
+                    continue
+
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    monitor = self._monitors[index]
+                    try:
+                        twin = future.result()
+                    except Exception as e:  # pylint: disable=broad-except
+                        if len(self._monitors) == 1:
+                            raise
+                        logger.warning(
+                            "Failed to get the twin of device '%s': %s", monitor.device_id, e
+                        )
+                    else:
+                        on_twin_received(monitor, twin)
+                    heapq.heappush(schedule, (time.monotonic() + self._next_interval(), index))
+
+    def _next_interval(self) -> float:
+        return self._interval * (1 + random.uniform(-self._jitter, self._jitter))
+
+
+def create_property_monitors(
+    cmd,
+    app_id: str,
+    device_ids: List[str],
+    token: str,
+    central_dns_suffix=CENTRAL_ENDPOINT,
+    concurrency: int = DEFAULT_POLLING_CONCURRENCY,
+) -> List[PropertyMonitor]:
+    """
+    Create property monitors for many devices, resolving device templates concurrently.
+    Providers are shared so that device templates are reused across devices.
+    """
+    central_device_provider = CentralDeviceProvider(
+        cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.ga.value
+    )
+    central_template_provider = CentralDeviceTemplateProvider(
+        cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.ga.value
+    )
+
+    def _create(device_id):
+        return PropertyMonitor(
+            cmd=cmd,
+            app_id=app_id,
+            device_id=device_id,
+            token=token,
+            central_dns_suffix=central_dns_suffix,
+            central_device_provider=central_device_provider,
+            central_template_provider=central_template_provider,
+        )
 
-            prev_twin = twin
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(device_ids)))) as executor:
+        return list(executor.map(_create, device_ids))
@@ -0,0 +1,108 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sys
+
+from typing import Union
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+# Default size in bytes at which an output file is rotated.
+DEFAULT_MAX_FILE_BYTES = 100 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+
+def load_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise InvalidArgumentValueError(
+            "The msgpack output format requires the 'msgpack' package. "
+            "Install it into the Azure CLI python environment, e.g. 'pip install msgpack'."
+        )
+    return msgpack
+
+
+class StreamSink:
+    """
+    Writes rendered events to a stream, stdout by default. Binary chunks are written to
+    the underlying binary buffer of text streams. Notices, such as completion messages,
+    go to notice_stream so that they can be kept out of machine readable output.
+    """
+
+    def __init__(self, stream=None, notice_stream=None):
+        self._stream = stream
+        self._notice_stream = notice_stream
+
+    def write(self, data: Union[str, bytes]):
+        stream = self._stream or sys.stdout
+        if isinstance(data, bytes):
+            stream = getattr(stream, "buffer", stream)
+        stream.write(data)
+
+    def flush(self):
+        stream = self._stream or sys.stdout
+        stream.flush()
+        buffer = getattr(stream, "buffer", None)
+        if buffer:
+            buffer.flush()
+
+    def notice(self, text: str):
+        stream = self._notice_stream or self._stream or sys.stdout
+        stream.write(text + "\n")
+        stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class RotatingFileSink:
+    """
+    Appends rendered events to a file, rotating it to <path>.1 .. <path>.<backup_count>
+    once it grows past max_bytes. Rotation only happens between writes, so records are
+    never split across files.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_FILE_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+    ):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "ab")
+
+    def write(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._file.write(data)
+        if self._max_bytes and self._file.tell() >= self._max_bytes:
+            self._rotate()
+
+    def flush(self):
+        self._file.flush()
+
+    def notice(self, text: str):
+        print(text, file=sys.stderr, flush=True)
+
+    def close(self):
+        self._file.close()
+
+    def _rotate(self):
+        self._file.close()
+        if self._backup_count > 0:
+            for i in range(self._backup_count - 1, 0, -1):
+                source = "{}.{}".format(self._path, i)
+                if os.path.exists(source):
+                    os.replace(source, "{}.{}".format(self._path, i + 1))
+            os.replace(self._path, "{}.1".format(self._path))
+        else:
+            os.remove(self._path)
+        self._file = open(self._path, "ab")
@@ -0,0 +1,225 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from azext_iot.monitor.checkpoint import ENQUEUED_TIME_IDENTIFIER
+from azext_iot.monitor.models.enum import StatsFormatType
+
+# Seconds between emitted stats reports.
+DEFAULT_STATS_INTERVAL = 5
+# Maximum number of timing samples kept per report interval for percentiles.
+TIMING_SAMPLE_SIZE = 1024
+PERCENTILES = [50, 90, 99]
+
+
+class _PartitionStats:
+    __slots__ = ["messages", "bytes", "lag"]
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.lag: Optional[float] = None
+
+
+class _Timings:
+    """
+    Reservoir sample of durations in seconds, bounded to TIMING_SAMPLE_SIZE per interval.
+    """
+
+    __slots__ = ["count", "samples"]
+
+    def __init__(self):
+        self.count = 0
+        self.samples: List[float] = []
+
+    def add(self, duration: float):
+        self.count += 1
+        if len(self.samples) < TIMING_SAMPLE_SIZE:
+            self.samples.append(duration)
+            return
+        index = random.randrange(self.count)
+        if index < TIMING_SAMPLE_SIZE:
+            self.samples[index] = duration
+
+    def percentiles(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+        samples = sorted(self.samples)
+        return {
+            "p{}".format(p): round(
+                samples[min(len(samples) - 1, len(samples) * p // 100)] * 1000, 3
+            )
+            for p in PERCENTILES
+        }
+
+
+class MonitorStats:
+    """
+    Opt-in throughput and latency instrumentation for the event monitor.
+
+    Receive loops record per partition message counts, body bytes and end-to-end lag
+    (receive time minus the x-opt-enqueued-time annotation), and the event pipeline records
+    parse and output durations. Every interval a report with rates, the latest lag, timing
+    percentiles in milliseconds and the pipeline queue depth is written to the stats stream,
+    stderr by default, as text or one JSON document per line.
+    """
+
+    def __init__(
+        self,
+        stats_format: str = StatsFormatType.text.value,
+        interval: float = DEFAULT_STATS_INTERVAL,
+        stream=None,
+    ):
+        self._format = stats_format
+        self._interval = interval
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, _PartitionStats] = {}
+        self._timings: Dict[str, _Timings] = {}
+        self._queue_depth: Optional[Callable[[], int]] = None
+        self._interval_start = time.monotonic()
+        self._report_handle: Optional[asyncio.TimerHandle] = None
+
+    def set_queue_depth(self, queue_depth: Callable[[], int]):
+        self._queue_depth = queue_depth
+
+    def record_messages(self, partition: str, messages: list):
+        now = time.time()
+        size = 0
+        lag = None
+        for message in messages:
+            size += _get_body_size(message)
+            enqueued_time = _get_enqueued_time(message)
+            if enqueued_time is not None:
+                lag = now - enqueued_time
+
+        with self._lock:
+            partition_stats = self._partitions.get(partition)
+            if partition_stats is None:
+                partition_stats = self._partitions[partition] = _PartitionStats()
+            partition_stats.messages += len(messages)
+            partition_stats.bytes += size
+            if lag is not None:
+                partition_stats.lag = lag
+
+    def record_timing(self, name: str, duration: float):
+        with self._lock:
+            timings = self._timings.get(name)
+            if timings is None:
+                timings = self._timings[name] = _Timings()
+            timings.add(duration)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._interval_start = time.monotonic()
+        self._report_handle = loop.call_later(self._interval, self._periodic_report, loop)
+
+    def stop(self):
+        if self._report_handle:
+            self._report_handle.cancel()
+            self._report_handle = None
+        self.report()
+
+    def _periodic_report(self, loop: asyncio.AbstractEventLoop):
+        self.report()
+        self._report_handle = loop.call_later(self._interval, self._periodic_report, loop)
+
+    def snapshot(self) -> dict:
+        """
+        Return the stats of the current interval and start a new one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            elapsed = max(now - self._interval_start, 1e-9)
+            self._interval_start = now
+            partitions, self._partitions = self._partitions, {}
+            timings, self._timings = self._timings, {}
+            # idle partitions keep reporting their last known lag
+            for partition, partition_stats in partitions.items():
+                carried = self._partitions[partition] = _PartitionStats()
+                carried.lag = partition_stats.lag
+
+        return {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "interval": round(elapsed, 3),
+            "messagesPerSecond": round(
+                sum(p.messages for p in partitions.values()) / elapsed, 2
+            ),
+            "bytesPerSecond": round(sum(p.bytes for p in partitions.values()) / elapsed, 2),
+            "queueDepth": self._queue_depth() if self._queue_depth else None,
+            "partitions": {
+                partition: {
+                    "messagesPerSecond": round(p.messages / elapsed, 2),
+                    "bytesPerSecond": round(p.bytes / elapsed, 2),
+                    "lagSeconds": round(p.lag, 3) if p.lag is not None else None,
+                }
+                for partition, p in sorted(partitions.items())
+            },
+            "timingsMs": {name: t.percentiles() for name, t in timings.items()},
+        }
+
+    def report(self):
+        stats = self.snapshot()
+        stream = self._stream or sys.stderr
+        if self._format == StatsFormatType.json.value:
+            stream.write(json.dumps(stats, separators=(",", ":")) + "\n")
+        else:
+            stream.write(_format_text(stats) + "\n")
+        stream.flush()
+
+
+def _format_text(stats: dict) -> str:
+    lines = [
+        "[stats] {:.1f} msg/s, {:.1f} B/s{}".format(
+            stats["messagesPerSecond"],
+            stats["bytesPerSecond"],
+            ", queue depth {}".format(stats["queueDepth"])
+            if stats["queueDepth"] is not None
+            else "",
+        )
+    ]
+    for partition, p in stats["partitions"].items():
+        lines.append(
+            "[stats]   partition {}: {:.1f} msg/s, {:.1f} B/s, lag {}".format(
+                partition,
+                p["messagesPerSecond"],
+                p["bytesPerSecond"],
+                "{:.3f}s".format(p["lagSeconds"]) if p["lagSeconds"] is not None else "n/a",
+            )
+        )
+    for name, percentiles in stats["timingsMs"].items():
+        lines.append(
+            "[stats]   {} ms: {}".format(
+                name, ", ".join("{} {}".format(k, v) for k, v in percentiles.items())
+            )
+        )
+    return "\n".join(lines)
+
+
+def _get_body_size(message) -> int:
+    try:
+        return sum(len(data) for data in message.get_data())
+    except Exception:  # pylint: disable=broad-except
+        return 0
+
+
+def _get_enqueued_time(message) -> Optional[float]:
+    annotations = message.annotations or {}
+    enqueued_time = annotations.get(ENQUEUED_TIME_IDENTIFIER)
+    if enqueued_time is None:
+        return None
+    if isinstance(enqueued_time, datetime):
+        return enqueued_time.timestamp()
+    # AMQP timestamps are milliseconds since the epoch
+    return enqueued_time / 1000
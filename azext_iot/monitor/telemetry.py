@@ -6,13 +6,17 @@
 
 import asyncio
 import sys
+import time
 import uamqp
 
 from uuid import uuid4
 from knack.log import get_logger
-from typing import List
+from typing import List, Optional
 from azext_iot.constants import VERSION, USER_AGENT
+from azext_iot.monitor.checkpoint import CheckpointStore
 from azext_iot.monitor.models.target import Target
+from azext_iot.monitor.pipeline import EventPipeline
+from azext_iot.monitor.stats import MonitorStats
 from azext_iot.monitor.utility import get_loop
 
 logger = get_logger(__name__)
@@ -25,11 +29,30 @@ def start_single_monitor(
     on_start_string: str,
     on_message_received,
     timeout=0,
+    pipeline: Optional[EventPipeline] = None,
+    prefetch=0,
+    batch_size: Optional[int] = None,
+    on_batch_received=None,
+    checkpoint_store: Optional[CheckpointStore] = None,
+    stats: Optional[MonitorStats] = None,
 ):
     """
     :param on_message_received:
         A callback to process messages as they arrive from the service.
         It takes a single argument, a ~uamqp.message.Message object.
+    :param pipeline:
+        Optional event pipeline. When provided, received messages are handed off to the
+        pipeline for parsing and output instead of invoking on_message_received inline.
+    :param prefetch:
+        Link credit requested by each partition receiver ahead of processing.
+    :param batch_size:
+        When set, partitions receive up to batch_size messages at a time and hand them
+        to on_batch_received, which takes a list of ~uamqp.message.Message objects.
+    :param checkpoint_store:
+        Optional checkpoint store. Partitions with a stored offset resume after it
+        instead of filtering on enqueued_time_utc.
+    :param stats:
+        Optional stats collector, periodically reporting throughput, lag and timings.
     """
     return start_multiple_monitors(
         targets=[target],
@@ -37,6 +60,12 @@ def start_single_monitor(
         on_start_string=on_start_string,
         on_message_received=on_message_received,
         timeout=timeout,
+        pipeline=pipeline,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        on_batch_received=on_batch_received,
+        checkpoint_store=checkpoint_store,
+        stats=stats,
     )
 
 
@@ -46,18 +75,47 @@ def start_multiple_monitors(
     enqueued_time_utc,
     on_message_received,
     timeout=0,
+    pipeline: Optional[EventPipeline] = None,
+    prefetch=0,
+    batch_size: Optional[int] = None,
+    on_batch_received=None,
+    checkpoint_store: Optional[CheckpointStore] = None,
+    stats: Optional[MonitorStats] = None,
 ):
     """
     :param on_message_received:
         A callback to process messages as they arrive from the service.
         It takes a single argument, a ~uamqp.message.Message object.
+    :param pipeline:
+        Optional event pipeline. When provided, received messages are handed off to the
+        pipeline for parsing and output instead of invoking on_message_received inline.
+    :param prefetch:
+        Link credit requested by each partition receiver ahead of processing.
+    :param batch_size:
+        When set, partitions receive up to batch_size messages at a time and hand them
+        to on_batch_received, which takes a list of ~uamqp.message.Message objects.
+    :param checkpoint_store:
+        Optional checkpoint store. Partitions with a stored offset resume after it
+        instead of filtering on enqueued_time_utc.
+    :param stats:
+        Optional stats collector, periodically reporting throughput, lag and timings.
     """
+    if pipeline and checkpoint_store:
+        # the pipeline advances checkpoints once their events have been written
+        pipeline.checkpoint_store = checkpoint_store
+
     coroutines = [
         _initiate_event_monitor(
             target=target,
             enqueued_time_utc=enqueued_time_utc,
             on_message_received=on_message_received,
             timeout=timeout,
+            prefetch=prefetch,
+            batch_size=batch_size,
+            on_batch_received=on_batch_received,
+            checkpoint_store=checkpoint_store,
+            stats=stats,
+            pipeline=pipeline,
         )
         for target in targets
     ]
@@ -68,11 +126,18 @@ def start_multiple_monitors(
     result = None
 
     try:
-        print(on_start_string, flush=True)
+        if on_start_string:
+            _notify(pipeline, on_start_string)
+        if pipeline:
+            pipeline.start(loop)
+        if checkpoint_store:
+            checkpoint_store.start(loop)
+        if stats:
+            stats.start(loop)
         future.add_done_callback(lambda _: _stop_and_suppress_eloop(loop))
         result = loop.run_until_complete(future)
     except KeyboardInterrupt:
-        print("Stopping event monitor...", flush=True)
+        _notify(pipeline, "Stopping event monitor...")
         try:
             # TODO: remove when deprecating
             # pylint: disable=no-member
@@ -87,6 +152,12 @@ def start_multiple_monitors(
         except RuntimeError:
             pass  # no running loop anymore
     finally:
+        if pipeline:
+            pipeline.stop()
+        if checkpoint_store:
+            checkpoint_store.stop()
+        if stats:
+            stats.stop()
         if result:
             errors = result[0]
             if errors and errors[0]:
@@ -95,7 +166,16 @@ def start_multiple_monitors(
 
 
 async def _initiate_event_monitor(
-    target: Target, enqueued_time_utc, on_message_received, timeout=0
+    target: Target,
+    enqueued_time_utc,
+    on_message_received,
+    timeout=0,
+    prefetch=0,
+    batch_size=None,
+    on_batch_received=None,
+    checkpoint_store=None,
+    stats=None,
+    pipeline=None,
 ):
     if not target.partitions:
         logger.debug("No Event Hub partitions found to listen on.")
@@ -119,6 +199,12 @@ async def _initiate_event_monitor(
                     enqueued_time_utc=enqueued_time_utc,
                     on_message_received=on_message_received,
                     timeout=timeout,
+                    prefetch=prefetch,
+                    batch_size=batch_size,
+                    on_batch_received=on_batch_received,
+                    checkpoint_store=checkpoint_store,
+                    stats=stats,
+                    pipeline=pipeline,
                 )
             )
         return await asyncio.gather(*coroutines, return_exceptions=True)
@@ -131,24 +217,38 @@ async def _monitor_events(
     enqueued_time_utc,
     on_message_received,
     timeout=0,
+    prefetch=0,
+    batch_size=None,
+    on_batch_received=None,
+    checkpoint_store=None,
+    stats=None,
+    pipeline=None,
 ):
     source = uamqp.address.Source(
         "amqps://{}/{}/ConsumerGroups/{}/Partitions/{}".format(
             target.hostname, target.path, target.consumer_group, partition
         )
     )
-    source.set_filter(
-        bytes(
-            "amqp.annotation.x-opt-enqueuedtimeutc > " + str(enqueued_time_utc), "utf8"
+    offset = checkpoint_store.get_offset(target, partition) if checkpoint_store else None
+    if offset:
+        logger.info("Resuming partition %s after offset %s", partition, offset)
+        source.set_filter(
+            bytes("amqp.annotation.x-opt-offset > '{}'".format(offset), "utf8")
+        )
+    else:
+        source.set_filter(
+            bytes(
+                "amqp.annotation.x-opt-enqueuedtimeutc > " + str(enqueued_time_utc), "utf8"
+            )
         )
-    )
 
+    stats_key = "{}/{}".format(target.path, partition)
     exp_cancelled = False
     receive_client = uamqp.ReceiveClientAsync(
         source,
         auth=target.auth,
         timeout=timeout,
-        prefetch=0,
+        prefetch=prefetch,
         client_name=_get_container_id(),
         debug=DEBUG,
     )
@@ -157,8 +257,41 @@ async def _monitor_events(
         if connection:
             await receive_client.open_async(connection=connection)
 
-        async for msg in receive_client.receive_messages_iter_async():
-            on_message_received(msg)
+        if batch_size:
+            while True:
+                batch = await receive_client.receive_message_batch_async(
+                    max_batch_size=batch_size
+                )
+                # an empty batch means the receive timeout has been reached
+                if not batch:
+                    break
+                if stats:
+                    stats.record_messages(stats_key, batch)
+                start = time.perf_counter()
+                if pipeline:
+                    await pipeline.put_batch(batch, checkpoint=(target, partition))
+                elif on_batch_received:
+                    await _dispatch(on_batch_received, batch)
+                else:
+                    for msg in batch:
+                        await _dispatch(on_message_received, msg)
+                if stats:
+                    stats.record_timing("dispatch", time.perf_counter() - start)
+                if checkpoint_store and not pipeline:
+                    checkpoint_store.update(target, partition, batch[-1])
+        else:
+            async for msg in receive_client.receive_messages_iter_async():
+                if stats:
+                    stats.record_messages(stats_key, [msg])
+                start = time.perf_counter()
+                if pipeline:
+                    await pipeline.put(msg, checkpoint=(target, partition))
+                else:
+                    await _dispatch(on_message_received, msg)
+                if stats:
+                    stats.record_timing("dispatch", time.perf_counter() - start)
+                if checkpoint_store and not pipeline:
+                    checkpoint_store.update(target, partition, msg)
 
     except asyncio.CancelledError:
         exp_cancelled = True
@@ -178,6 +311,19 @@ async def _monitor_events(
         logger.info("Closed monitor on partition %s", partition)
 
 
+def _notify(pipeline: Optional[EventPipeline], text: str):
+    if pipeline:
+        pipeline.notice(text)
+    else:
+        print(text, flush=True)
+
+
+async def _dispatch(callback, arg):
+    result = callback(arg)
+    if asyncio.iscoroutine(result):
+        await result
+
+
 def _stop_and_suppress_eloop(loop):
     try:
         loop.stop()
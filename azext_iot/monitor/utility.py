@@ -6,6 +6,9 @@
 
 import asyncio
 
+from typing import List, Optional, Tuple
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
 
 def generate_on_start_string(device_id=None):
     device_filter_txt = None
@@ -28,3 +31,62 @@ def get_loop() -> asyncio.AbstractEventLoop:
         asyncio.set_event_loop(loop)
 
     return loop
+
+
+def parse_shard(shard: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Parse a shard specification in the form "index/count", where index is zero-based.
+    """
+    if not shard:
+        return None
+
+    index, sep, count = shard.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = -1
+
+    if not sep or count <= 0 or not 0 <= index < count:
+        raise InvalidArgumentValueError(
+            "Shard '{}' must be in the format index/count where 0 <= index < count.".format(shard)
+        )
+    return (index, count)
+
+
+def select_partitions(
+    partitions: List[str],
+    partition_ids: Optional[List[str]] = None,
+    shard: Optional[Tuple[int, int]] = None,
+) -> List[str]:
+    """
+    Restrict the partitions to monitor to an explicit subset and/or a shard of the available
+    partitions. Partition ids may be given as separate values or comma separated.
+    Shards are assigned round-robin over the available partition order so that
+    N processes using shards 0/N..N-1/N cover every partition exactly once.
+    """
+    partition_ids = [
+        p.strip() for value in partition_ids or [] for p in value.split(",") if p.strip()
+    ]
+    if partition_ids:
+        unknown = [p for p in partition_ids if p not in partitions]
+        if unknown:
+            raise InvalidArgumentValueError(
+                "Unknown partition(s): {}. Available partitions: {}.".format(
+                    ", ".join(unknown), ", ".join(partitions)
+                )
+            )
+        partitions = [p for p in partitions if p in partition_ids]
+
+    if shard:
+        index, count = shard
+        partitions = [p for i, p in enumerate(partitions) if i % count == index]
+
+    return partitions
+
+
+def split_partitions(partitions: List[str], count: int) -> List[List[str]]:
+    """
+    Split partitions round-robin into at most count non-empty groups.
+    """
+    groups = [partitions[i::count] for i in range(count)]
+    return [group for group in groups if group]
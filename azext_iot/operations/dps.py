@@ -4,11 +4,16 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
+import sys
+
+from os.path import exists
 from knack.log import get_logger
 from azure.cli.core.azclierror import (
     ArgumentUsageError,
     AzureResponseError,
     BadRequestError,
+    FileOperationError,
     InvalidArgumentValueError,
     MutuallyExclusiveArgumentError,
     RequiredArgumentMissingError,
@@ -669,14 +674,26 @@ def iot_dps_device_enrollment_group_delete(
 
 def iot_dps_compute_device_key(
     cmd,
-    registration_id,
+    registration_id=None,
     enrollment_id=None,
     dps_name=None,
     resource_group_name=None,
     symmetric_key=None,
     login=None,
     auth_type_dataplane=None,
+    input_path=None,
 ):
+    if registration_id and input_path:
+        raise MutuallyExclusiveArgumentError(
+            "Provide either a registration ID via --registration-id or a file of registration IDs via --input, not both."
+        )
+    if not (registration_id or input_path):
+        raise RequiredArgumentMissingError(
+            "Provide a registration ID via --registration-id or a file of registration IDs via --input."
+        )
+    if input_path and not exists(input_path):
+        raise FileOperationError("Input file '{}' does not exist.".format(input_path))
+
     if symmetric_key is None:
         if not all([dps_name, enrollment_id]):
             raise RequiredArgumentMissingError(
@@ -709,11 +726,44 @@ def iot_dps_compute_device_key(
         except ProvisioningServiceErrorDetailsException as e:
             raise AzureResponseError(e)
 
+    if input_path:
+        # derived keys are streamed as newline delimited JSON
+        _compute_device_keys(symmetric_key, input_path)
+        return
+
     return compute_device_key(
         primary_key=symmetric_key, registration_id=registration_id
     )
 
 
+def _compute_device_keys(symmetric_key, input_path, stream=None, batch_size=1000):
+    """
+    Write the derived device key of every registration id listed one per line in
+    input_path as a line of JSON. The enrollment group key is decoded once for all ids.
+    """
+    stream = stream or sys.stdout
+    with open(input_path, "r", encoding="utf-8") as input_file:
+        lines = []
+        for line in input_file:
+            registration_id = line.strip()
+            if registration_id:
+                device_key = compute_device_key(
+                    primary_key=symmetric_key, registration_id=registration_id
+                ).decode("utf-8")
+                lines.append(
+                    json.dumps(
+                        {"registrationId": registration_id, "deviceKey": device_key},
+                        separators=(",", ":"),
+                    )
+                    + "\n"
+                )
+            if len(lines) >= batch_size:
+                stream.write("".join(lines))
+                lines = []
+        stream.write("".join(lines))
+        stream.flush()
+
+
 # DPS Connection strings
 
 
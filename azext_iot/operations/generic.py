@@ -4,35 +4,67 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
+import sys
+
 from azure.cli.core.azclierror import InvalidArgumentValueError
 from azext_iot.assets.user_messages import error_param_top_out_of_bounds
 
 
 def _execute_query(query_args, query_method, top=None):
     payload = []
+    for page in _iter_query_pages(query_args, query_method, top):
+        payload.extend(page)
+    return payload
+
+
+def _iter_query_pages(query_args, query_method, top=None):
+    """
+    Yield each page of query results as soon as it is returned by the service,
+    following continuation tokens until the result set or top is exhausted.
+    """
     headers = {"Cache-Control": "no-cache, must-revalidate"}
+    count = 0
 
     if top:
         headers["x-ms-max-item-count"] = str(top)
 
-    result = query_method(*query_args, custom_headers=headers, raw=True)
-    token = result.response.headers.get("x-ms-continuation")
+    while True:
+        result = query_method(*query_args, custom_headers=headers, raw=True)
+        token = result.response.headers.get("x-ms-continuation")
+        page = result.response.json()
+        if top:
+            page = page[:top - count]
+        count += len(page)
+        yield page
 
-    payload.extend(result.response.json())
-    while token:
+        if not token:
+            return
         # In case requested count is > service max page size
         if top:
-            pl = len(payload)
-            if pl < top:
-                page = top - pl
-                headers["x-ms-max-item-count"] = str(page)
+            if count < top:
+                headers["x-ms-max-item-count"] = str(top - count)
             else:
-                break
+                return
         headers["x-ms-continuation"] = token
-        result = query_method(*query_args, custom_headers=headers, raw=True)
-        token = result.response.headers.get("x-ms-continuation")
-        payload.extend(result.response.json())
-    return payload[:top] if top else payload
+
+
+def _stream_query(pages, stream=None) -> int:
+    """
+    Write query results to stream (stdout by default) as newline delimited JSON,
+    flushing after every page. Returns the number of written items.
+    """
+    stream = stream or sys.stdout
+    count = 0
+    for page in pages:
+        if not page:
+            continue
+        stream.write(
+            "".join(json.dumps(item, separators=(",", ":")) + "\n" for item in page)
+        )
+        stream.flush()
+        count += len(page)
+    return count
 
 
 def _process_top(top, upper_limit=None):
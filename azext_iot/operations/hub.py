@@ -9,10 +9,12 @@ from knack.log import get_logger
 from enum import Enum, EnumMeta
 from azure.cli.core.azclierror import (
     ArgumentUsageError,
+    AzureResponseError,
     CLIInternalError,
     ClientRequestError,
     FileOperationError,
     InvalidArgumentValueError,
+    MutuallyExclusiveArgumentError,
     RequiredArgumentMissingError,
     ResourceNotFoundError,
     ValidationError,
@@ -34,25 +36,63 @@ from azext_iot.common.shared import (
     DeviceAuthApiType,
     ConnectionStringParser,
     EntityStatusType,
-    JobType
+    JobType,
+    MetricType,
 )
 from azext_iot.iothub.providers.discovery import IotHubDiscovery
+from azext_iot.iothub.providers.device_identity import (
+    DEFAULT_BULK_CONCURRENCY,
+    MAX_BULK_BATCH_SIZE,
+    get_bulk_request_error,
+    update_registry,
+)
 from azext_iot.common.utility import (
     handle_service_exception,
     read_file_content,
     init_monitoring,
+    init_receive_settings,
     process_json_arg,
     generate_key,
     generate_storage_account_sas_token,
+    unpack_msrest_error,
 )
 from azext_iot._factory import SdkResolver, CloudError
-from azext_iot.operations.generic import _execute_query, _process_top
+from azext_iot.operations.generic import (
+    _execute_query,
+    _iter_query_pages,
+    _process_top,
+    _stream_query,
+)
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import json
+import os
 import pprint
+import re
+import sys
+import threading
 
 logger = get_logger(__name__)
 printer = pprint.PrettyPrinter(indent=2)
 
+# Child devices looked up per registry query and updated per registry bulk request.
+CHILD_DEVICE_BATCH_SIZE = MAX_BULK_BATCH_SIZE
+# Module twins fetched concurrently when diffing edge modules content.
+MODULE_TWIN_CONCURRENCY = 8
+EDGE_SYSTEM_MODULES = ["$edgeAgent", "$edgeHub"]
+# Metric queries of configurations evaluated concurrently.
+CONFIG_METRIC_CONCURRENCY = 8
+# A query selecting plain rows, without TOP, from devices or modules.
+COUNT_QUERY_PATTERN = re.compile(
+    r"^\s*select\s+(?!top\b).+?\s+from\s+(devices(?:\.modules)?\b.*)$", re.IGNORECASE | re.DOTALL
+)
+AGGREGATE_SELECT_PATTERN = re.compile(
+    r"^\s*select\s+(?:(?!\bfrom\b).)*?\b(?:count|sum|avg|min|max)\s*\(.*?\s+from\s", re.IGNORECASE | re.DOTALL
+)
+# Device identities fetched concurrently and written together when generating SAS tokens in bulk.
+SAS_TOKEN_LOOKUP_CONCURRENCY = 8
+SAS_TOKEN_LOOKUP_BATCH_SIZE = 100
+
 
 # Query
 
@@ -64,6 +104,7 @@ def iot_query(
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
+    stream=False,
 ):
     top = _process_top(top)
     discovery = IotHubDiscovery(cmd)
@@ -80,6 +121,10 @@ def iot_query(
         query_args = [query_command]
         query_method = service_sdk.query.get_twins
 
+        if stream:
+            # results are written as they arrive instead of being returned to the formatter
+            _stream_query(_iter_query_pages(query_args, query_method, top))
+            return
         return _execute_query(query_args, query_method, top)
     except CloudError as e:
         handle_service_exception(e)
@@ -564,22 +609,16 @@ def iot_device_children_add(
         login=login,
         auth_type=auth_type_dataplane,
     )
-    devices = []
     edge_device = _iot_device_show(target, device_id)
     _validate_edge_device(edge_device)
-    converted_child_list = child_list
-    for child_device_id in converted_child_list:
-        child_device = _iot_device_show(target, child_device_id.strip())
+    child_device_ids = [child_device_id.strip() for child_device_id in child_list]
+    devices = _iot_device_show_many(target, child_device_ids)
+    for child_device in devices:
         _validate_parent_child_relation(child_device, force)
-        devices.append(child_device)
 
-    for device in devices:
-        _update_device_parent(
-            target,
-            device,
-            device["capabilities"]["iotEdge"],
-            edge_device["deviceScope"],
-        )
+    _update_device_parents(
+        target, _resolve_device_identities(target, devices), edge_device["deviceScope"]
+    )
 
 
 def iot_device_children_remove(
@@ -599,33 +638,28 @@ def iot_device_children_remove(
         login=login,
         auth_type=auth_type_dataplane,
     )
-    devices = []
     if remove_all:
-        result = _iot_device_children_list(
-            cmd, device_id, hub_name, resource_group_name, login
-        )
+        edge_device = _iot_device_show(target, device_id)
+        _validate_edge_device(edge_device)
+        result = _iot_device_children_list(target, edge_device, fields="*")
         if not result:
             raise ClientRequestError(
                 'No registered child devices found for "{}" edge device.'.format(
                     device_id
                 )
             )
-        for child_device_id in [str(x["deviceId"]) for x in result]:
-            child_device = _iot_device_show(target, child_device_id.strip())
-            devices.append(child_device)
+        devices = [_twin_to_device(twin) for twin in result]
     elif child_list:
         edge_device = _iot_device_show(target, device_id)
         _validate_edge_device(edge_device)
-        converted_child_list = child_list
-        for child_device_id in converted_child_list:
-            child_device = _iot_device_show(target, child_device_id.strip())
+        child_device_ids = [child_device_id.strip() for child_device_id in child_list]
+        devices = _iot_device_show_many(target, child_device_ids)
+        for child_device in devices:
             _validate_child_device(child_device)
-            if child_device["parentScopes"] == [edge_device["deviceScope"]]:
-                devices.append(child_device)
-            else:
+            if child_device["parentScopes"] != [edge_device["deviceScope"]]:
                 raise ClientRequestError(
                     'The entered child device "{}" isn\'t assigned as a child of edge device "{}"'.format(
-                        child_device_id.strip(), device_id
+                        child_device["deviceId"], device_id
                     )
                 )
     else:
@@ -633,8 +667,7 @@ def iot_device_children_remove(
             "Please specify child list or use --remove-all to remove all children."
         )
 
-    for device in devices:
-        _update_device_parent(target, device, device["capabilities"]["iotEdge"])
+    _update_device_parents(target, _resolve_device_identities(target, devices))
 
 
 def iot_device_children_list(
@@ -644,26 +677,6 @@ def iot_device_children_list(
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
-):
-    result = _iot_device_children_list(
-        cmd=cmd,
-        device_id=device_id,
-        hub_name=hub_name,
-        resource_group_name=resource_group_name,
-        login=login,
-        auth_type_dataplane=auth_type_dataplane,
-    )
-
-    return [device["deviceId"] for device in result]
-
-
-def _iot_device_children_list(
-    cmd,
-    device_id,
-    hub_name=None,
-    resource_group_name=None,
-    login=None,
-    auth_type_dataplane=None,
 ):
     discovery = IotHubDiscovery(cmd)
     target = discovery.get_target(
@@ -674,22 +687,178 @@ def _iot_device_children_list(
     )
     device = _iot_device_show(target, device_id)
     _validate_edge_device(device)
+    result = _iot_device_children_list(target, device)
+
+    return [device["deviceId"] for device in result]
+
+
+def _iot_device_children_list(target, edge_device, fields="deviceId"):
     query = (
-        "select deviceId from devices where array_contains(parentScopes, '{}')".format(
-            device["deviceScope"]
+        "select {} from devices where array_contains(parentScopes, '{}')".format(
+            fields, edge_device["deviceScope"]
         )
     )
+    resolver = SdkResolver(target=target)
+    service_sdk = resolver.get_sdk(SdkType.service_sdk)
 
-    # TODO: Inefficient
-    return iot_query(
-        cmd=cmd,
-        query_command=query,
-        hub_name=hub_name,
-        top=None,
-        resource_group_name=resource_group_name,
-        login=login,
-        auth_type_dataplane=auth_type_dataplane,
+    try:
+        return _execute_query([query], service_sdk.query.get_twins)
+    except CloudError as e:
+        handle_service_exception(e)
+
+
+def _iot_device_show_many(target, device_ids):
+    """
+    Look up many devices with one registry query per chunk of ids, run concurrently.
+    Results are device twins shaped like device identities, in the order of device_ids
+    without repeated ids. Ids that cannot be quoted in a query literal are fetched individually.
+    """
+    device_ids = list(dict.fromkeys(device_ids))
+    query_ids = [device_id for device_id in device_ids if "'" not in device_id]
+    devices = {}
+    with ThreadPoolExecutor(max_workers=DEFAULT_BULK_CONCURRENCY) as executor:
+        lookups = [
+            executor.submit(_query_devices_by_id, target, query_ids[i:i + CHILD_DEVICE_BATCH_SIZE])
+            for i in range(0, len(query_ids), CHILD_DEVICE_BATCH_SIZE)
+        ]
+        for lookup in lookups:
+            for twin in lookup.result():
+                devices[twin["deviceId"]] = _twin_to_device(twin)
+
+    result = []
+    for device_id in device_ids:
+        device = devices.get(device_id)
+        if device is None:
+            # not found by the query, the identity lookup reports why
+            device = devices[device_id] = _iot_device_show(target, device_id)
+        result.append(device)
+    return result
+
+
+def _query_devices_by_id(target, device_ids):
+    query = "select * from devices where deviceId IN [{}]".format(
+        ", ".join("'{}'".format(device_id) for device_id in device_ids)
     )
+    resolver = SdkResolver(target=target)
+    service_sdk = resolver.get_sdk(SdkType.service_sdk)
+
+    try:
+        return _execute_query([query], service_sdk.query.get_twins)
+    except CloudError as e:
+        handle_service_exception(e)
+
+
+def _twin_to_device(twin):
+    device = {
+        "deviceId": twin["deviceId"],
+        "etag": twin.get("deviceEtag"),
+        "status": twin.get("status"),
+        "statusReason": twin.get("statusReason"),
+        "capabilities": twin.get("capabilities", {"iotEdge": False}),
+        "deviceScope": twin.get("deviceScope"),
+        "parentScopes": twin.get("parentScopes", []),
+    }
+    auth_type = twin.get("authenticationType")
+    if auth_type in [
+        DeviceAuthApiType.selfSigned.value,
+        DeviceAuthApiType.certificateAuthority.value,
+    ]:
+        device["authentication"] = {
+            "type": auth_type,
+            "x509Thumbprint": twin.get("x509Thumbprint"),
+        }
+    return device
+
+
+def _resolve_device_identities(target, devices):
+    """
+    Fetch the full identity of devices looked up by query whose authentication could not
+    be taken from their twin. Twins carry no symmetric keys, and registry updates replace
+    the whole identity.
+    """
+    partial = [
+        i for i, device in enumerate(devices) if "authentication" not in device
+    ]
+    if not partial:
+        return devices
+    devices = list(devices)
+    with ThreadPoolExecutor(max_workers=DEFAULT_BULK_CONCURRENCY) as executor:
+        identities = executor.map(
+            lambda i: _iot_device_show(target, devices[i]["deviceId"]), partial
+        )
+        for i, identity in zip(partial, identities):
+            devices[i] = identity
+    return devices
+
+
+def _update_device_parents(target, devices, device_scope=None):
+    """
+    Set the parent of many devices with registry bulk requests of up to 100 devices,
+    run concurrently. Every update is conditional on the device etag.
+    """
+    # a bulk request cannot update the same device twice
+    devices = list({device["deviceId"]: device for device in devices}.values())
+    operations = []
+    for device in devices:
+        if not device.get("etag"):
+            raise CLIInternalError("device etag not found.")
+        operation = {
+            "id": device["deviceId"],
+            "eTag": device["etag"],
+            "importMode": "updateIfMatchETag",
+            "status": device.get("status"),
+            "statusReason": device.get("statusReason"),
+            "authentication": device.get("authentication"),
+            "capabilities": device.get("capabilities"),
+            "deviceScope": device.get("deviceScope"),
+            "parentScopes": device.get("parentScopes"),
+        }
+        if device["capabilities"]["iotEdge"]:
+            operation["parentScopes"] = [device_scope] if device_scope else []
+        else:
+            operation["deviceScope"] = device_scope or ""
+        operations.append(operation)
+
+    resolver = SdkResolver(target=target)
+
+    def update(chunk):
+        try:
+            return update_registry(resolver.get_sdk(SdkType.service_sdk), chunk)
+        except CloudError as e:
+            handle_service_exception(e)
+
+    errors = []
+    request_errors = []
+    with ThreadPoolExecutor(max_workers=DEFAULT_BULK_CONCURRENCY) as executor:
+        results = executor.map(
+            update,
+            [
+                operations[i:i + CHILD_DEVICE_BATCH_SIZE]
+                for i in range(0, len(operations), CHILD_DEVICE_BATCH_SIZE)
+            ],
+        )
+        for response in results:
+            device_errors = (response.output.errors if response.output else None) or []
+            errors.extend(device_errors)
+            request_error = get_bulk_request_error(response)
+            if request_error and not device_errors:
+                request_errors.append(request_error)
+
+    if request_errors:
+        raise AzureResponseError(
+            "Failed to update the parent of {} devices: {}".format(len(operations), request_errors[0])
+        )
+    if errors:
+        raise AzureResponseError(
+            "Failed to update the parent of {} of {} devices: {}".format(
+                len(errors),
+                len(operations),
+                "; ".join(
+                    '"{}" ({}: {})'.format(e.device_id, e.error_code, e.error_status)
+                    for e in errors
+                ),
+            )
+        )
 
 
 def _update_device_parent(target, device, is_edge, device_scope=None):
@@ -964,6 +1133,10 @@ def iot_device_module_list(
         login=login,
         auth_type=auth_type_dataplane,
     )
+    return _iot_device_module_list(target, device_id, top)
+
+
+def _iot_device_module_list(target, device_id, top=1000):
     resolver = SdkResolver(target=target)
     service_sdk = resolver.get_sdk(SdkType.service_sdk)
 
@@ -1154,6 +1327,7 @@ def iot_edge_set_modules(
     cmd,
     device_id,
     content,
+    diff=None,
     hub_name=None,
     resource_group_name=None,
     login=None,
@@ -1177,13 +1351,82 @@ def iot_edge_set_modules(
             content, config_type=ConfigType.edge
         )
 
-        content = ConfigurationContent(**processed_content)
-        service_sdk.configuration.apply_on_edge_device(id=device_id, content=content)
-        return iot_device_module_list(cmd, device_id, hub_name=hub_name, login=login)
+        if diff:
+            modules_content = processed_content["modules_content"]
+            changes = _get_module_twin_changes(target, device_id, modules_content)
+            for module_id, paths in changes.items():
+                logger.info("Module %s desired properties changed: %s", module_id, ", ".join(paths))
+            # modules not included in the applied content keep their desired properties,
+            # system modules define the running modules and routes and are always included
+            processed_content["modules_content"] = {
+                module_id: module
+                for module_id, module in modules_content.items()
+                if module_id in changes or (changes and module_id in EDGE_SYSTEM_MODULES)
+            }
+
+        if not diff or processed_content["modules_content"]:
+            content = ConfigurationContent(**processed_content)
+            service_sdk.configuration.apply_on_edge_device(id=device_id, content=content)
+        else:
+            logger.info("Modules of device %s are up to date, skipping apply.", device_id)
+        return _iot_device_module_list(target, device_id)
     except CloudError as e:
         handle_service_exception(e)
 
 
+def _get_module_twin_changes(target, device_id, modules_content):
+    """
+    Fetch the twins of the modules in modules content concurrently and return the changed
+    desired property paths of every module whose desired properties differ from the content.
+    """
+    local = threading.local()
+
+    def get_changes(module_id):
+        service_sdk = getattr(local, "service_sdk", None)
+        if service_sdk is None:
+            service_sdk = local.service_sdk = SdkResolver(target=target).get_sdk(SdkType.service_sdk)
+        desired = _strip_null_properties(modules_content[module_id].get("properties.desired", {}))
+        try:
+            twin = service_sdk.modules.get_twin(id=device_id, mid=module_id, raw=True).response.json()
+        except CloudError as e:
+            if getattr(e.response, "status_code", None) != 404:
+                raise
+            return module_id, sorted(desired) or ["properties.desired"]
+        current = {
+            key: value
+            for key, value in twin.get("properties", {}).get("desired", {}).items()
+            if key not in ["$metadata", "$version"]
+        }
+        return module_id, _get_changed_paths(current, desired)
+
+    module_ids = list(modules_content)
+    if not module_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(module_ids), MODULE_TWIN_CONCURRENCY)) as executor:
+        return {module_id: paths for module_id, paths in executor.map(get_changes, module_ids) if paths}
+
+
+def _get_changed_paths(current, desired, prefix=""):
+    paths = []
+    for key in sorted(set(current) | set(desired)):
+        path = prefix + str(key)
+        current_value, desired_value = current.get(key), desired.get(key)
+        if isinstance(current_value, dict) and isinstance(desired_value, dict):
+            paths.extend(_get_changed_paths(current_value, desired_value, path + "."))
+        elif current_value != desired_value:
+            paths.append(path)
+    return paths
+
+
+def _strip_null_properties(properties):
+    # null desired properties are removed from the twin rather than stored
+    return {
+        key: _strip_null_properties(value) if isinstance(value, dict) else value
+        for key, value in properties.items()
+        if value is not None
+    }
+
+
 def iot_edge_deployment_create(
     cmd,
     config_id,
@@ -1383,68 +1626,66 @@ def _process_config_content(content, config_type):
 
 
 def _validate_payload_schema(content):
-    import json
-    from os.path import join
-    from azext_iot.models.validators import JsonSchemaType, JsonSchemaValidator
-    from azext_iot.constants import EDGE_DEPLOYMENT_ROOT_SCHEMAS_PATH as root_schema_path
-    from azext_iot.common.utility import shell_safe_json_parse
-
-    EDGE_AGENT_SCHEMA_PATH = "azure-iot-edgeagent-deployment-{}.json"
-    EDGE_HUB_SCHEMA_PATH = "azure-iot-edgehub-deployment-{}.json"
-    EDGE_SCHEMA_PATH_DICT = {
-        "$edgeAgent": EDGE_AGENT_SCHEMA_PATH,
-        "$edgeHub": EDGE_HUB_SCHEMA_PATH,
-    }
+    from azext_iot.models.validators import get_edge_deployment_errors
+
+    errors = get_edge_deployment_errors(content["modulesContent"])
+    if errors:
+        # Pretty printing schema validation errors
+        raise ValidationError(
+            json.dumps(
+                {"validationErrors": errors},
+                separators=(",", ":"),
+                indent=2,
+            )
+        )
 
-    modules_content = content["modulesContent"]
-    system_modules_for_validation = ["$edgeAgent", "$edgeHub"]
 
-    for sys_module in system_modules_for_validation:
-        if sys_module in modules_content:
-            if (
-                "properties.desired" in modules_content[sys_module]
-                and "schemaVersion"
-                in modules_content[sys_module]["properties.desired"]
-            ):
-                target_schema_ver = modules_content[sys_module][
-                    "properties.desired"
-                ]["schemaVersion"]
-                target_schema_def_path = join(root_schema_path, f"{EDGE_SCHEMA_PATH_DICT[sys_module].format(target_schema_ver)}")
+def iot_edge_deployment_validate(cmd, content_paths, processes=None):
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+    from azext_iot.models.validators import validate_edge_deployment_file
 
-                logger.info("Attempting to fetch schema content from %s...", target_schema_def_path)
-                if not exists(target_schema_def_path):
-                    logger.info("Invalid schema path %s, skipping validation...", target_schema_def_path)
-                    continue
+    files = _get_deployment_manifest_files(content_paths)
+    if not files:
+        raise FileOperationError("No deployment manifests found in {}.".format(", ".join(content_paths)))
+    if processes is not None and processes < 1:
+        raise InvalidArgumentValueError("Processes must be at least 1.")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(files))
 
-                try:
-                    target_schema_def = str(read_file_content(target_schema_def_path))
-                    target_schema_def = shell_safe_json_parse(target_schema_def)
-                except Exception:
-                    logger.info(
-                        "Unable to fetch schema content from %s skipping validation...",
-                        target_schema_def_path,
-                    )
-                    continue
-
-                logger.info(f"Validating {sys_module} of deployment payload against schema...")
-                to_validate_content = {
-                    sys_module: modules_content[sys_module]
-                }
-                draft_version = JsonSchemaType.draft4
-                if "$schema" in target_schema_def and "/draft-07/" in target_schema_def["$schema"]:
-                    draft_version = JsonSchemaType.draft7
-
-                v = JsonSchemaValidator(target_schema_def, draft_version)
-                errors = v.validate(to_validate_content)
-                if errors:
-                    # Pretty printing schema validation errors
-                    raise ValidationError(
-                        json.dumps(
-                            {"validationErrors": errors},
-                            separators=(",", ":"),
-                            indent=2,
-                        )
-                    )
+    if processes == 1:
+        results = [validate_edge_deployment_file(path) for path in files]
+    else:
+        # validation is cpu bound, each worker process compiles every schema version once
+        with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn")) as executor:
+            results = list(
+                executor.map(
+                    validate_edge_deployment_file,
+                    files,
+                    chunksize=max(1, len(files) // (processes * 4)),
+                )
+            )
+
+    failures = [result for result in results if result["errors"]]
+    summary = {"manifests": len(files), "valid": len(files) - len(failures), "invalid": len(failures)}
+    if failures:
+        summary["failures"] = failures
+        raise ValidationError(json.dumps(summary, separators=(",", ":"), indent=2))
+    return summary
+
+
+def _get_deployment_manifest_files(content_paths):
+    files = []
+    for path in content_paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(".json"))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileOperationError("Deployment manifest path {} does not exist.".format(path))
+    return sorted(set(files))
 
 
 def iot_hub_configuration_update(
@@ -1693,6 +1934,178 @@ def iot_hub_configuration_metric_show(
         handle_service_exception(e)
 
 
+def iot_hub_configuration_metrics_evaluate(
+    cmd,
+    config_ids=None,
+    metric_type=None,
+    concurrency=CONFIG_METRIC_CONCURRENCY,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    return _iot_hub_configuration_metrics_evaluate(
+        cmd,
+        config_ids=config_ids,
+        content_keys=["deviceContent", "moduleContent"],
+        metric_type=metric_type,
+        concurrency=concurrency,
+        hub_name=hub_name,
+        resource_group_name=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+
+
+def iot_edge_deployment_metrics_evaluate(
+    cmd,
+    config_ids=None,
+    metric_type=None,
+    concurrency=CONFIG_METRIC_CONCURRENCY,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    return _iot_hub_configuration_metrics_evaluate(
+        cmd,
+        config_ids=config_ids,
+        content_keys=["modulesContent"],
+        metric_type=metric_type,
+        concurrency=concurrency,
+        hub_name=hub_name,
+        resource_group_name=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+
+
+def _iot_hub_configuration_metrics_evaluate(
+    cmd,
+    content_keys,
+    config_ids=None,
+    metric_type=None,
+    concurrency=CONFIG_METRIC_CONCURRENCY,
+    hub_name=None,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+):
+    """
+    Count the devices or modules matching every user and system metric of many
+    configurations, evaluating all metric queries concurrently on one hub target.
+    """
+    if not concurrency or concurrency < 1:
+        raise InvalidArgumentValueError("Concurrency must be at least 1.")
+
+    discovery = IotHubDiscovery(cmd)
+    target = discovery.get_target(
+        resource_name=hub_name,
+        resource_group_name=resource_group_name,
+        login=login,
+        auth_type=auth_type_dataplane,
+    )
+    resolver = SdkResolver(target=target)
+    service_sdk = resolver.get_sdk(SdkType.service_sdk)
+
+    try:
+        # a single list request returns the metric definitions of every configuration
+        configs = service_sdk.configuration.get_configurations(raw=True).response.json() or []
+    except CloudError as e:
+        handle_service_exception(e)
+
+    if config_ids:
+        configs_by_id = {config["id"]: config for config in configs}
+        missing = [config_id for config_id in config_ids if config_id not in configs_by_id]
+        if missing:
+            raise ResourceNotFoundError(
+                "Configurations not found: {}".format(", ".join(missing))
+            )
+        configs = [configs_by_id[config_id] for config_id in config_ids]
+    else:
+        configs = [
+            config
+            for config in configs
+            if any(config["content"].get(key) is not None for key in content_keys)
+        ]
+
+    metric_keys = {MetricType.user.value: "metrics", MetricType.system.value: "systemMetrics"}
+    if metric_type:
+        metric_keys = {metric_type: metric_keys[metric_type]}
+
+    results = []
+    evaluations = []
+    for config in configs:
+        result = {"id": config["id"]}
+        for metric_key in metric_keys.values():
+            result[metric_key] = {}
+            queries = (config.get(metric_key) or {}).get("queries") or {}
+            for metric_id, query in queries.items():
+                evaluations.append((result, metric_key, metric_id, query))
+        results.append(result)
+
+    local = threading.local()
+
+    def evaluate(evaluation):
+        result, metric_key, metric_id, query = evaluation
+        if not query:
+            return evaluation, None, None
+        sdk = getattr(local, "service_sdk", None)
+        if sdk is None:
+            sdk = local.service_sdk = SdkResolver(target=target).get_sdk(SdkType.service_sdk)
+        try:
+            return evaluation, _count_query_results(sdk, query), None
+        except CloudError as e:
+            if getattr(e.response, "status_code", None) in [401, 403]:
+                handle_service_exception(e)
+            return evaluation, None, unpack_msrest_error(e)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for (result, metric_key, metric_id, query), count, error in executor.map(
+            evaluate, evaluations
+        ):
+            result[metric_key][metric_id] = count
+            if error:
+                result.setdefault("errors", {}).setdefault(metric_key, {})[metric_id] = error
+
+    return results
+
+
+def _count_query_results(service_sdk, query):
+    """
+    Evaluate the value of a metric query. Queries that select plain rows are rewritten
+    to SELECT COUNT() so only the count is returned by the service. Queries that aggregate
+    into a single value, such as SELECT COUNT() AS c FROM devices, evaluate to that value,
+    other queries are counted page by page.
+    """
+    count_query = _build_count_query(query)
+    if count_query:
+        result = _execute_query([count_query], service_sdk.query.get_twins)
+        return result[0].get("count", 0) if result else 0
+
+    if _is_aggregate_query(query):
+        result = _execute_query([query], service_sdk.query.get_twins)
+        if len(result) == 1 and len(result[0]) == 1:
+            return next(iter(result[0].values()))
+        return len(result)
+
+    return sum(len(page) for page in _iter_query_pages([query], service_sdk.query.get_twins))
+
+
+def _build_count_query(query):
+    match = COUNT_QUERY_PATTERN.match(query)
+    # aggregated or truncated results do not have one row per matching twin
+    if not match or _is_aggregate_query(query) or re.search(r"\bgroup\s+by\b", query, re.IGNORECASE):
+        return None
+    return "SELECT COUNT() AS count FROM {}".format(match.group(1))
+
+
+def _is_aggregate_query(query):
+    # aggregate queries without GROUP BY return a single row
+    match = AGGREGATE_SELECT_PATTERN.match(query)
+    return bool(match) and not re.search(r"\bgroup\s+by\b", query, re.IGNORECASE)
+
+
 # Device Twin
 
 
@@ -1732,6 +2145,7 @@ def iot_device_twin_list(
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
+    stream=False,
 ):
     query = (
         "select * from devices where capabilities.iotEdge = true"
@@ -1746,9 +2160,10 @@ def iot_device_twin_list(
         resource_group_name=resource_group_name,
         login=login,
         auth_type_dataplane=auth_type_dataplane,
+        stream=stream,
     )
 
-    if not result:
+    if not result and not stream:
         logger.info('No registered devices found on hub "%s".', hub_name)
     return result
 
@@ -1850,11 +2265,14 @@ def iot_device_twin_replace(
 
 def iot_device_method(
     cmd,
-    device_id,
     method_name,
+    device_id=None,
     hub_name=None,
     method_payload="{}",
     timeout=30,
+    method_connect_timeout=None,
+    device_query=None,
+    max_concurrency=None,
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
@@ -1872,6 +2290,22 @@ def iot_device_method(
         raise InvalidArgumentValueError(
             "timeout must be at least {} seconds".format(METHOD_INVOKE_MIN_TIMEOUT_SEC)
         )
+    _validate_method_targets(device_id, device_query, method_connect_timeout)
+
+    if device_query:
+        return _iot_method_fanout(
+            cmd,
+            device_query=device_query,
+            method_name=method_name,
+            method_payload=method_payload,
+            timeout=timeout,
+            method_connect_timeout=method_connect_timeout,
+            max_concurrency=max_concurrency,
+            hub_name=hub_name,
+            resource_group_name=resource_group_name,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
 
     discovery = IotHubDiscovery(cmd)
     target = discovery.get_target(
@@ -1891,33 +2325,114 @@ def iot_device_method(
                 method_payload, argument_name="method-payload"
             )
 
-        request_body = {
-            "methodName": method_name,
-            "payload": method_payload,
-            "responseTimeoutInSeconds": timeout,
-            "connectTimeoutInSeconds": timeout,
-        }
+        request_body = _build_method_request(
+            method_name, method_payload, timeout, method_connect_timeout
+        )
 
         return service_sdk.devices.invoke_method(
             device_id=device_id,
             direct_method_request=request_body,
-            timeout=timeout,
+            timeout=_get_method_http_timeout(timeout, method_connect_timeout),
         )
     except CloudError as e:
         handle_service_exception(e)
 
 
+def _validate_method_targets(device_id, device_query, method_connect_timeout):
+    from azext_iot.constants import METHOD_INVOKE_MAX_TIMEOUT_SEC
+
+    if device_id and device_query:
+        raise MutuallyExclusiveArgumentError(
+            "Provide either --device-id or --device-query, not both."
+        )
+    if not (device_id or device_query):
+        raise RequiredArgumentMissingError(
+            "Provide --device-id or --device-query to select the target devices."
+        )
+    if method_connect_timeout is not None and not (
+        0 <= method_connect_timeout <= METHOD_INVOKE_MAX_TIMEOUT_SEC
+    ):
+        raise InvalidArgumentValueError(
+            "method connect timeout must be between 0 and {} seconds".format(
+                METHOD_INVOKE_MAX_TIMEOUT_SEC
+            )
+        )
+
+
+def _build_method_request(method_name, method_payload, timeout, method_connect_timeout):
+    # without a connect timeout the service waits for the device as long as for its response
+    return {
+        "methodName": method_name,
+        "payload": method_payload,
+        "responseTimeoutInSeconds": timeout,
+        "connectTimeoutInSeconds": timeout
+        if method_connect_timeout is None
+        else method_connect_timeout,
+    }
+
+
+def _get_method_http_timeout(timeout, method_connect_timeout):
+    # the service may wait for the device to connect before waiting for the response
+    if method_connect_timeout is None:
+        return timeout
+    return timeout + method_connect_timeout
+
+
+def _iot_method_fanout(
+    cmd,
+    device_query,
+    method_name,
+    method_payload,
+    timeout,
+    method_connect_timeout,
+    max_concurrency,
+    hub_name,
+    resource_group_name,
+    login,
+    auth_type_dataplane,
+    module_id=None,
+):
+    from azext_iot.iothub.providers.device_method import (
+        DeviceMethodProvider,
+        DEFAULT_METHOD_CONCURRENCY,
+    )
+
+    if method_payload:
+        method_payload = process_json_arg(method_payload, argument_name="method-payload")
+
+    device_method_provider = DeviceMethodProvider(
+        cmd=cmd,
+        hub_name=hub_name,
+        rg=resource_group_name,
+        login=login,
+        auth_type_dataplane=auth_type_dataplane,
+    )
+    # results and summary are streamed as newline delimited JSON
+    device_method_provider.invoke_many(
+        device_query=device_query,
+        method_name=method_name,
+        method_payload=method_payload,
+        module_id=module_id,
+        timeout=timeout,
+        connect_timeout=method_connect_timeout,
+        max_concurrency=max_concurrency or DEFAULT_METHOD_CONCURRENCY,
+    )
+
+
 # Device Module Method Invoke
 
 
 def iot_device_module_method(
     cmd,
-    device_id,
     module_id,
     method_name,
+    device_id=None,
     hub_name=None,
     method_payload="{}",
     timeout=30,
+    method_connect_timeout=None,
+    device_query=None,
+    max_concurrency=None,
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
@@ -1935,6 +2450,23 @@ def iot_device_module_method(
         raise InvalidArgumentValueError(
             "timeout must not be over {} seconds".format(METHOD_INVOKE_MIN_TIMEOUT_SEC)
         )
+    _validate_method_targets(device_id, device_query, method_connect_timeout)
+
+    if device_query:
+        return _iot_method_fanout(
+            cmd,
+            device_query=device_query,
+            method_name=method_name,
+            method_payload=method_payload,
+            module_id=module_id,
+            timeout=timeout,
+            method_connect_timeout=method_connect_timeout,
+            max_concurrency=max_concurrency,
+            hub_name=hub_name,
+            resource_group_name=resource_group_name,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
 
     discovery = IotHubDiscovery(cmd)
     target = discovery.get_target(
@@ -1954,18 +2486,15 @@ def iot_device_module_method(
                 method_payload, argument_name="method-payload"
             )
 
-        request_body = {
-            "methodName": method_name,
-            "payload": method_payload,
-            "responseTimeoutInSeconds": timeout,
-            "connectTimeoutInSeconds": timeout,
-        }
+        request_body = _build_method_request(
+            method_name, method_payload, timeout, method_connect_timeout
+        )
 
         return service_sdk.modules.invoke_method(
             device_id=device_id,
             module_id=module_id,
             direct_method_request=request_body,
-            timeout=timeout,
+            timeout=_get_method_http_timeout(timeout, method_connect_timeout),
         )
     except CloudError as e:
         handle_service_exception(e)
@@ -1986,10 +2515,30 @@ def iot_get_sas_token(
     module_id=None,
     auth_type_dataplane=None,
     connection_string=None,
+    input_path=None,
 ):
     key_type = key_type.lower()
     policy_name = policy_name.lower()
 
+    if input_path:
+        if any([device_id, module_id, connection_string]):
+            raise MutuallyExclusiveArgumentError(
+                "--input cannot be combined with --device-id, --module-id or --connection-string."
+            )
+        # tokens are streamed as newline delimited JSON
+        _iot_get_sas_tokens(
+            cmd,
+            input_path=input_path,
+            hub_name=hub_name,
+            policy_name=policy_name,
+            key_type=key_type,
+            duration=duration,
+            resource_group_name=resource_group_name,
+            login=login,
+            auth_type_dataplane=auth_type_dataplane,
+        )
+        return
+
     if login and policy_name != "iothubowner":
         raise ArgumentUsageError(
             "You are unable to change the sas policy with a hub connection string login."
@@ -2027,6 +2576,115 @@ def iot_get_sas_token(
     }
 
 
+def _iot_get_sas_tokens(
+    cmd,
+    input_path,
+    hub_name=None,
+    policy_name="iothubowner",
+    key_type="primary",
+    duration=3600,
+    resource_group_name=None,
+    login=None,
+    auth_type_dataplane=None,
+    stream=None,
+):
+    """
+    Generate SAS tokens for every device or module listed in a file, one per line as a
+    device id, a "deviceId/moduleId" pair or a JSON object with deviceId and moduleId.
+
+    The hub target is discovered once and identities are fetched concurrently by workers
+    that each reuse one service client. A line of JSON with the token, or the error, is
+    written per input line, in input order.
+    """
+    if not exists(input_path):
+        raise FileOperationError("Input file '{}' does not exist.".format(input_path))
+
+    discovery = IotHubDiscovery(cmd)
+    target = discovery.get_target(
+        resource_name=hub_name,
+        resource_group_name=resource_group_name,
+        policy_name=policy_name,
+        login=login,
+        auth_type=auth_type_dataplane,
+    )
+    local = threading.local()
+    stream = stream or sys.stdout
+
+    def get_token(entry):
+        result, device_id, module_id = entry
+        if "error" in result:
+            return result
+        service_sdk = getattr(local, "service_sdk", None)
+        if service_sdk is None:
+            service_sdk = local.service_sdk = SdkResolver(target=target).get_sdk(
+                SdkType.service_sdk
+            )
+        try:
+            if module_id:
+                entity = service_sdk.modules.get_identity(
+                    id=device_id, mid=module_id, raw=True
+                ).response.json()
+                uri = "{}/devices/{}/modules/{}".format(target["entity"], device_id, module_id)
+            else:
+                entity = service_sdk.devices.get_identity(id=device_id, raw=True).response.json()
+                uri = "{}/devices/{}".format(target["entity"], device_id)
+        except CloudError as e:
+            if getattr(e.response, "status_code", None) in [401, 403]:
+                handle_service_exception(e)
+            result["error"] = unpack_msrest_error(e)
+            return result
+
+        symmetric_key = (entity.get("authentication") or {}).get("symmetricKey") or {}
+        key = symmetric_key.get("{}Key".format(key_type))
+        if not key:
+            result["error"] = "This {} does not support SAS auth.".format(
+                "module" if module_id else "device"
+            )
+            return result
+        result[DeviceAuthApiType.sas.value] = SasTokenAuthentication(
+            uri, None, key, duration
+        ).generate_sas_token()
+        return result
+
+    with open(input_path, "r", encoding="utf-8") as input_file, ThreadPoolExecutor(
+        max_workers=SAS_TOKEN_LOOKUP_CONCURRENCY
+    ) as executor:
+        chunk = []
+        for line in input_file:
+            line = line.strip()
+            if line:
+                chunk.append(_parse_sas_token_entry(line))
+            if len(chunk) >= SAS_TOKEN_LOOKUP_BATCH_SIZE:
+                _write_ndjson(executor.map(get_token, chunk), stream)
+                chunk = []
+        _write_ndjson(executor.map(get_token, chunk), stream)
+
+
+def _parse_sas_token_entry(line):
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+            device_id = entry.get("deviceId")
+            module_id = entry.get("moduleId")
+        except (ValueError, AttributeError) as e:
+            return {"input": line, "error": "Invalid JSON: {}".format(e)}, None, None
+    else:
+        device_id, _, module_id = line.partition("/")
+    if not device_id:
+        return {"input": line, "error": "No device id."}, None, None
+    result = {"deviceId": device_id}
+    if module_id:
+        result["moduleId"] = module_id
+    return result, device_id, module_id or None
+
+
+def _write_ndjson(items, stream):
+    lines = [json.dumps(item, separators=(",", ":")) + "\n" for item in items]
+    if lines:
+        stream.write("".join(lines))
+        stream.flush()
+
+
 def _iot_build_sas_token_from_cs(connection_string, duration=3600):
     uri = None
     policy = None
@@ -2412,6 +3070,18 @@ def iot_hub_monitor_events(
     content_type=None,
     device_query=None,
     message_count: Optional[int] = None,
+    prefetch: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    property_filters=None,
+    partitions=None,
+    shard=None,
+    processes: Optional[int] = None,
+    checkpoint_store=None,
+    output_format=None,
+    output_file=None,
+    output_file_size: Optional[int] = None,
+    stats=None,
+    stats_interval: Optional[int] = None,
 ):
     try:
         _iot_hub_monitor_events(
@@ -2431,6 +3101,18 @@ def iot_hub_monitor_events(
             content_type=content_type,
             device_query=device_query,
             message_count=message_count,
+            prefetch=prefetch,
+            batch_size=batch_size,
+            property_filters=property_filters,
+            partitions=partitions,
+            shard=shard,
+            processes=processes,
+            checkpoint_store=checkpoint_store,
+            output_format=output_format,
+            output_file=output_file,
+            output_file_size=output_file_size,
+            stats=stats,
+            stats_interval=stats_interval,
         )
     except RuntimeError as e:
         raise CLIInternalError(e)
@@ -2504,10 +3186,47 @@ def _iot_hub_monitor_events(
     content_type=None,
     device_query=None,
     message_count: Optional[int] = None,
+    prefetch: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    property_filters=None,
+    partitions=None,
+    shard=None,
+    processes: Optional[int] = None,
+    checkpoint_store=None,
+    output_format=None,
+    output_file=None,
+    output_file_size: Optional[int] = None,
+    stats=None,
+    stats_interval: Optional[int] = None,
 ):
+    from azext_iot.monitor.filters import parse_property_filters
+    from azext_iot.monitor.utility import parse_shard
+
     (enqueued_time, properties, timeout, output, message_count) = init_monitoring(
         cmd, timeout, properties, enqueued_time, repair, yes, message_count
     )
+    (prefetch, batch_size) = init_receive_settings(prefetch, batch_size)
+    property_filters = parse_property_filters(property_filters)
+    shard = parse_shard(shard)
+
+    if processes is not None and processes <= 0:
+        raise InvalidArgumentValueError("Processes must be greater than 0.")
+
+    if processes and processes > 1 and message_count:
+        raise MutuallyExclusiveArgumentError(
+            "--message-count is not supported when monitoring with multiple processes."
+        )
+
+    if stats_interval is not None and stats_interval <= 0:
+        raise InvalidArgumentValueError("Stats interval must be greater than 0.")
+
+    if output_file_size is not None and output_file_size <= 0:
+        raise InvalidArgumentValueError("Output file size must be greater than 0.")
+
+    if output_format == "msgpack" and not output_file:
+        raise RequiredArgumentMissingError(
+            "The msgpack output format requires --output-file."
+        )
 
     device_ids = {}
     if device_query:
@@ -2527,16 +3246,26 @@ def _iot_hub_monitor_events(
     )
 
     from azext_iot.monitor.builders import hub_target_builder
+    from azext_iot.monitor.checkpoint import CheckpointStore
     from azext_iot.monitor.handlers import CommonHandler
+    from azext_iot.monitor.pipeline import EventPipeline, OUTPUT_FLUSH_INTERVAL
+    from azext_iot.monitor.sinks import DEFAULT_MAX_FILE_BYTES, RotatingFileSink, StreamSink
+    from azext_iot.monitor.stats import DEFAULT_STATS_INTERVAL, MonitorStats
     from azext_iot.monitor.telemetry import start_single_monitor
-    from azext_iot.monitor.utility import generate_on_start_string
+    from azext_iot.monitor.utility import (
+        generate_on_start_string,
+        select_partitions,
+        split_partitions,
+    )
     from azext_iot.monitor.models.arguments import (
         CommonParserArguments,
         CommonHandlerArguments,
     )
 
-    target = hub_target_builder.EventTargetBuilder().build_iot_hub_target(target)
+    hub_target = target
+    target = hub_target_builder.EventTargetBuilder().build_iot_hub_target(hub_target)
     target.add_consumer_group(consumer_group)
+    target.partitions = select_partitions(target.partitions, partitions, shard)
 
     on_start_string = generate_on_start_string(device_id=device_id)
 
@@ -2551,9 +3280,52 @@ def _iot_hub_monitor_events(
         interface_name=interface_name,
         module_id=module_id,
         max_messages=message_count,
-    )
+        property_filters=property_filters,
+        output_format=output_format,
+    )
+
+    # Machine readable formats keep status notices out of the output and flush on an
+    # interval rather than per buffer so that downstream readers see a steady stream.
+    flush_interval = OUTPUT_FLUSH_INTERVAL if output_format else None
+    if output_file:
+        sink = RotatingFileSink(
+            output_file,
+            max_bytes=(
+                output_file_size * 1024 * 1024 if output_file_size else DEFAULT_MAX_FILE_BYTES
+            ),
+        )
+    elif output_format:
+        sink = StreamSink(notice_stream=sys.stderr)
+    else:
+        sink = StreamSink()
+
+    if processes and processes > 1:
+        from azext_iot.monitor.launcher import start_sharded_monitors
+
+        start_sharded_monitors(
+            target=hub_target,
+            partition_groups=split_partitions(target.partitions, processes),
+            consumer_group=consumer_group,
+            enqueued_time_utc=enqueued_time,
+            on_start_string=on_start_string,
+            common_handler_args=handler_args,
+            timeout=timeout,
+            prefetch=prefetch,
+            batch_size=batch_size,
+            checkpoint_store_directory=checkpoint_store,
+            sink=sink,
+            flush_interval=flush_interval,
+            stats_format=stats,
+            stats_interval=stats_interval,
+        )
+        return
 
     handler = CommonHandler(handler_args)
+    monitor_stats = (
+        MonitorStats(stats_format=stats, interval=stats_interval or DEFAULT_STATS_INTERVAL)
+        if stats
+        else None
+    )
 
     start_single_monitor(
         target=target,
@@ -2561,6 +3333,13 @@ def _iot_hub_monitor_events(
         on_start_string=on_start_string,
         on_message_received=handler.parse_message,
         timeout=timeout,
+        pipeline=EventPipeline(
+            handler=handler, sink=sink, flush_interval=flush_interval, stats=monitor_stats
+        ),
+        prefetch=prefetch,
+        batch_size=batch_size,
+        checkpoint_store=CheckpointStore(checkpoint_store) if checkpoint_store else None,
+        stats=monitor_stats,
     )
 
 
@@ -6,18 +6,23 @@
 
 import pytest
 import json
+import re
 import responses
+import threading
+import time
 from copy import deepcopy
 from unittest import mock
 from datetime import datetime
 from knack.util import CLIError, todict
+from azure.cli.core.azclierror import RequiredArgumentMissingError
 
 from azure.cli.core.mock import DummyCli
 from azext_iot.central import commands_device
 from azext_iot.central import commands_monitor
 from azext_iot.central.providers import CentralDeviceProvider
 from azext_iot.central.models.devicetwin import DeviceTwin
-from azext_iot.monitor.property import PropertyMonitor
+from azext_iot.monitor.central_cache import CentralTemplateCache, TTLCache
+from azext_iot.monitor.property import PropertyMonitor, PropertyMonitorScheduler
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.tests.helpers import load_json
 from azext_iot.tests.test_constants import FileNames
@@ -145,6 +150,102 @@ class TestCentralHelpers:
             "tokenType": "raw token 0 - A",
         }
 
+    def test_get_aad_token_cached(self, mocker):
+        from azext_iot.common import auth
+
+        class Cmd:
+            cli_ctx = ""
+
+        mocker.patch("azure.cli.core._profile.Profile.__init__", return_value=None)
+        get_raw_token = mocker.patch("azure.cli.core._profile.Profile.get_raw_token")
+        mocker.patch.object(auth, "aad_token_cache", auth.AadTokenCache())
+        expires_on = time.time() + 3600
+        get_raw_token.return_value = [
+            ["Bearer", "token", {"expires_on": expires_on}],
+            "subscription",
+            "tenant",
+        ]
+
+        # tokens are shared until shortly before they expire
+        for _ in range(5):
+            assert auth.get_aad_token(Cmd(), "resource")["accessToken"] == "token"
+        assert get_raw_token.call_count == 1
+        auth.get_aad_token(Cmd(), "other resource")
+        assert get_raw_token.call_count == 2
+
+        get_raw_token.return_value[0][1] = "new token"
+        mocker.patch("azext_iot.common.auth.time", return_value=expires_on - 60)
+        assert auth.get_aad_token(Cmd(), "resource")["accessToken"] == "new token"
+        assert get_raw_token.call_count == 3
+
+    def test_get_aad_token_expires_on(self):
+        from azext_iot.common.auth import _get_token_expiry, TOKEN_EXPIRES_ON_FORMAT
+
+        expiry = datetime.now().replace(microsecond=0)
+        assert _get_token_expiry({"expires_on": "1700000000"}) == 1700000000
+        assert _get_token_expiry({"expiresOn": expiry.strftime(TOKEN_EXPIRES_ON_FORMAT)}) == expiry.timestamp()
+        assert _get_token_expiry({"expiresOn": "N/A"}) is None
+
+
+class TestCentralHttpTransport:
+    url = "https://{}.azureiotcentral.com/api/devices".format(app_id)
+
+    @pytest.fixture()
+    def transport(self, mocker):
+        from azext_iot.central.services._transport import CentralHttpTransport
+
+        mocker.patch("azext_iot.central.services._transport.sleep")
+        transport = CentralHttpTransport(max_retries=2)
+        yield transport
+        transport.close()
+
+    def test_retry_after(self, transport, mocked_response, mocker):
+        sleep = mocker.patch("azext_iot.central.services._transport.sleep")
+        mocked_response.add(responses.GET, self.url, status=429, headers={"Retry-After": "7"})
+        mocked_response.add(responses.GET, self.url, status=503)
+        mocked_response.add(responses.GET, self.url, json={"value": []}, status=200)
+
+        response = transport.get(self.url, headers={"Authorization": "token"})
+
+        assert response.status_code == 200
+        assert len(mocked_response.calls) == 3
+        assert sleep.call_args_list[0] == mock.call(7.0)
+        assert transport.session is transport.session
+
+    @pytest.mark.parametrize(
+        "method, status, calls",
+        [
+            ("POST", 500, 1),
+            ("POST", 429, 3),
+            ("PATCH", 502, 1),
+            ("PUT", 502, 3),
+            ("GET", 404, 1),
+        ],
+    )
+    def test_retry_methods(self, transport, mocked_response, method, status, calls):
+        mocked_response.add(method, self.url, json={"error": "failed"}, status=status)
+
+        response = transport.request(method, self.url, json={})
+
+        # the last response is returned once retries are exhausted
+        assert response.status_code == status
+        assert len(mocked_response.calls) == calls
+
+    def test_gather(self, transport, mocked_response):
+        def callback(request):
+            return (200, {}, json.dumps({"id": request.url.rsplit("/", 1)[-1]}))
+
+        mocked_response.add_callback(
+            responses.GET, re.compile(self.url + "/.*"), callback=callback
+        )
+
+        results = transport.gather(
+            [{"method": "GET", "url": "{}/device{}".format(self.url, i)} for i in range(20)],
+            concurrency=4,
+        )
+
+        assert [r.json()["id"] for r in results] == ["device{}".format(i) for i in range(20)]
+
 
 class TestMonitorEvents:
     @pytest.mark.parametrize("timeout, exception", [(-1, CLIError)])
@@ -236,7 +337,7 @@ class TestCentralDeviceProvider:
         assert mock_device_svc.list_devices.call_count == 1
         assert children_devices == self._edge_children
 
-    @mock.patch("azext_iot.central.services.device.requests")
+    @mock.patch("azext_iot.central.services.device.transport")
     @mock.patch("azext_iot.central.services.device.get_aad_token")
     def test_should_list_device_modules(self, get_aad_token_svc, req_svc):
         # setup
@@ -1325,3 +1426,166 @@ class TestFailback:
         )
         # assert
         assert result == success_resp
+
+
+class TestCentralTemplateCache:
+    _device = load_json(FileNames.central_device_file)
+    _device_template = load_json(FileNames.central_device_template_file)
+
+    def _setup_services(self, mock_device_svc, mock_device_template_svc):
+        mock_device_svc.get_device.return_value = get_object(
+            self._device, "Device", api_version=API_VERSION
+        )
+        mock_device_template_svc.get_device_template.return_value = TemplatePreview(
+            self._device_template
+        )
+
+    @mock.patch("azext_iot.central.services.device_template")
+    @mock.patch("azext_iot.central.services.device")
+    def test_should_cache_template(self, mock_device_svc, mock_device_template_svc):
+        self._setup_services(mock_device_svc, mock_device_template_svc)
+        cache = CentralTemplateCache(cmd=None, app_id=app_id)
+
+        for _ in range(3):
+            template = cache.get_template("someDeviceId")
+
+        assert template.id == self._device_template["@id"]
+        assert mock_device_svc.get_device.call_count == 1
+        assert mock_device_template_svc.get_device_template.call_count == 1
+
+    @mock.patch("azext_iot.central.services.device_template")
+    @mock.patch("azext_iot.central.services.device")
+    def test_should_expire_entries(self, mock_device_svc, mock_device_template_svc):
+        self._setup_services(mock_device_svc, mock_device_template_svc)
+        cache = CentralTemplateCache(cmd=None, app_id=app_id, ttl=0)
+
+        cache.get_template("someDeviceId")
+        cache.get_template("someDeviceId")
+
+        assert mock_device_svc.get_device.call_count == 2
+
+    @mock.patch("azext_iot.central.services.device_template")
+    @mock.patch("azext_iot.central.services.device")
+    def test_should_cache_missing_device(self, mock_device_svc, mock_device_template_svc):
+        mock_device_svc.get_device.side_effect = CLIError("Device not found")
+        cache = CentralTemplateCache(cmd=None, app_id=app_id)
+
+        for _ in range(3):
+            with pytest.raises(CLIError, match="Device not found"):
+                cache.get_template("missingDeviceId")
+
+        assert mock_device_svc.get_device.call_count == 1
+        mock_device_template_svc.get_device_template.assert_not_called()
+
+    @mock.patch("azext_iot.central.services.device_template")
+    @mock.patch("azext_iot.central.services.device")
+    def test_should_warm_start_from_file(
+        self, mock_device_svc, mock_device_template_svc, tmp_path
+    ):
+        self._setup_services(mock_device_svc, mock_device_template_svc)
+        cache_file = str(tmp_path / "template_cache.json")
+        cache = CentralTemplateCache(cmd=None, app_id=app_id, cache_file=cache_file)
+        cache.get_template("someDeviceId")
+        cache.save()
+
+        warm_cache = CentralTemplateCache(cmd=None, app_id=app_id, cache_file=cache_file)
+        template = warm_cache.get_template("someDeviceId")
+        other_app_cache = CentralTemplateCache(
+            cmd=None, app_id="otherapp", cache_file=cache_file
+        )
+        other_app_cache.get_template("someDeviceId")
+
+        assert template.id == self._device_template["@id"]
+        assert mock_device_svc.get_device.call_count == 2
+        assert mock_device_template_svc.get_device_template.call_count == 2
+
+    def test_ttl_cache_evicts_least_recently_used(self):
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+
+class TestPropertyMonitorScheduler:
+    class _StopScheduler(Exception):
+        pass
+
+    class _Monitor:
+        def __init__(self, device_id, tracker):
+            self.device_id = device_id
+            self.show_device_id = False
+            self._tracker = tracker
+
+        def get_device_twin(self):
+            with self._tracker["lock"]:
+                self._tracker["running"] += 1
+                self._tracker["max_running"] = max(
+                    self._tracker["max_running"], self._tracker["running"]
+                )
+            time.sleep(0.005)
+            with self._tracker["lock"]:
+                self._tracker["running"] -= 1
+            return self.device_id
+
+    def test_scheduler_polls_all_devices_with_bounded_concurrency(self):
+        tracker = {"lock": threading.Lock(), "running": 0, "max_running": 0}
+        monitors = [self._Monitor("device{}".format(i), tracker) for i in range(5)]
+        scheduler = PropertyMonitorScheduler(monitors, interval=0.02, concurrency=2)
+        received = []
+
+        def _on_twin_received(monitor, twin):
+            assert monitor.device_id == twin
+            received.append(twin)
+            if len(received) == 20:
+                raise self._StopScheduler()
+
+        with pytest.raises(self._StopScheduler):
+            scheduler.start(_on_twin_received)
+
+        assert tracker["max_running"] <= 2
+        assert set(received) == set(monitor.device_id for monitor in monitors)
+        assert all(monitor.show_device_id for monitor in monitors)
+
+    @mock.patch("azext_iot.central.commands_monitor.create_property_monitors")
+    @mock.patch("azext_iot.central.services.device")
+    def test_property_monitor_devices(self, mock_device_svc, mock_create_monitors):
+        mock_device_svc.list_devices.return_value = [
+            mock.MagicMock(id="device2"),
+            mock.MagicMock(id="device3"),
+        ]
+
+        commands_monitor._build_property_scheduler(
+            fixture_cmd,
+            app_id=app_id,
+            device_id="device1",
+            device_ids=["device2", "device1"],
+            device_filter="type eq 'EdgeDevice'",
+            token=None,
+            central_dns_suffix=None,
+            concurrency=None,
+        )
+
+        assert mock_device_svc.list_devices.call_args[1]["filter"] == "type eq 'EdgeDevice'"
+        assert mock_create_monitors.call_args[1]["device_ids"] == [
+            "device1",
+            "device2",
+            "device3",
+        ]
+
+    def test_property_monitor_requires_devices(self):
+        with pytest.raises(RequiredArgumentMissingError):
+            commands_monitor._build_property_scheduler(
+                fixture_cmd,
+                app_id=app_id,
+                device_id=None,
+                device_ids=None,
+                device_filter=None,
+                token=None,
+                central_dns_suffix=None,
+                concurrency=None,
+            )
@@ -8,7 +8,13 @@ import pytest
 import collections
 
 from azext_iot.central.models.v2022_06_30_preview import TemplatePreview
-from azext_iot.monitor.central_validator import validate, extract_schema_type
+from azext_iot.monitor.central_validator import (
+    TemplateValidator,
+    compile_validator,
+    extract_schema_type,
+    get_template_validator,
+    validate,
+)
 
 from azext_iot.tests.helpers import load_json
 from azext_iot.tests.test_constants import FileNames
@@ -385,3 +391,73 @@ class TestComplexType:
         )
         schema = template.get_schema("RidiculousObject")
         assert validate(schema, value) == expected_result
+
+
+PROBE_VALUES = [
+    None,
+    True,
+    1,
+    2,
+    1.5,
+    "A",
+    "2021-01-01",
+    "2021-01-01T00:00:00Z",
+    "PT1H",
+    {"lat": 1, "lon": 2},
+    {"x": 1, "y": 2, "z": 3},
+    {"Double": 123},
+    {"LayerC": {"Depth1C": {"SomeTelemetry": 100}}},
+    [1, 2],
+]
+
+TEMPLATE_FILES = [
+    FileNames.central_device_template_file,
+    FileNames.central_deeply_nested_device_template_file,
+    FileNames.central_property_validation_template_file,
+]
+
+
+class TestCompiledValidators:
+    @pytest.mark.parametrize("template_file", TEMPLATE_FILES)
+    def test_compiled_validators_match_validate(self, template_file):
+        template = TemplatePreview(load_json(template_file))
+        template_validator = TemplateValidator(template)
+
+        for entities, compiled in [
+            (template.interfaces, template_validator.interfaces),
+            (template.components or {}, template_validator.components),
+        ]:
+            for identifier, entry in entities.items():
+                for name, schema in entry.items():
+                    field_validator = compiled[(identifier, name)]
+                    assert field_validator.schema_type == extract_schema_type(schema)
+                    for value in PROBE_VALUES:
+                        assert field_validator.validate(value) == validate(schema, value)
+
+    @pytest.mark.parametrize("template_file", TEMPLATE_FILES)
+    def test_lookup_matches_get_schema(self, template_file):
+        template = TemplatePreview(load_json(template_file))
+        template_validator = TemplateValidator(template)
+
+        names = set(name for entry in template.interfaces.values() for name in entry)
+        for name in names | {"missing"}:
+            schema = template.get_schema(name)
+            field_validator = template_validator.get(name)
+            assert (field_validator.schema if field_validator else None) == schema
+
+        for identifier, entry in (template.components or {}).items():
+            for name in list(entry) + ["missing"]:
+                schema = template.get_schema(name, is_component=True, identifier=identifier)
+                field_validator = template_validator.get(
+                    name, is_component=True, identifier=identifier
+                )
+                assert (field_validator.schema if field_validator else None) == schema
+
+    def test_invalid_schema(self):
+        assert compile_validator({"schema": "unknown"})(1) is False
+        assert compile_validator({})(1) is False
+        assert compile_validator({})(None) is True
+
+    def test_template_validator_is_cached(self):
+        template = TemplatePreview(load_json(FileNames.central_device_template_file))
+        assert get_template_validator(template) is get_template_validator(template)
@@ -88,6 +88,12 @@ def generate_cs(
     return result.lower() if lower_case else result
 
 
+# Resolved discovery targets are not cached on disk between tests
+@pytest.fixture(autouse=True)
+def disable_discovery_cache(monkeypatch):
+    monkeypatch.setenv("AZURE_IOT_DISCOVERY_CACHE", "false")
+
+
 # Sets current working directory to the directory of the executing file
 @pytest.fixture()
 def set_cwd(request):
@@ -793,3 +793,30 @@ class TestComputeDeviceKey():
         ).decode()
         offline_device_key = offline_device_key.strip("\"'\n")
         assert offline_device_key == GENERATED_KEY
+
+    def test_offline_compute_device_key_input(self, fixture_cmd, tmp_path, capsys):
+        input_path = tmp_path / "registrations.txt"
+        input_path.write_text("{}\n\nother-device\n".format(TEST_KEY_REGISTRATION_ID))
+
+        assert subject.iot_dps_compute_device_key(
+            cmd=fixture_cmd,
+            input_path=str(input_path),
+            symmetric_key=TEST_ENDORSEMENT_KEY
+        ) is None
+
+        results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert results[0] == {"registrationId": TEST_KEY_REGISTRATION_ID, "deviceKey": GENERATED_KEY}
+        assert results[1]["registrationId"] == "other-device"
+        assert results[1]["deviceKey"] == subject.iot_dps_compute_device_key(
+            cmd=fixture_cmd, registration_id="other-device", symmetric_key=TEST_ENDORSEMENT_KEY
+        ).decode()
+
+    @pytest.mark.parametrize("registration_id, input_path", [(None, None), ("device", "ids.txt")])
+    def test_compute_device_key_invalid_args(self, fixture_cmd, registration_id, input_path):
+        with pytest.raises(CLIError):
+            subject.iot_dps_compute_device_key(
+                cmd=fixture_cmd,
+                registration_id=registration_id,
+                input_path=input_path,
+                symmetric_key=TEST_ENDORSEMENT_KEY
+            )
@@ -9,6 +9,7 @@ from azext_iot.tests.generators import generate_generic_id
 import pytest
 import responses
 import json
+import os
 from uuid import uuid4
 from random import randint
 from knack.cli import CLIError
@@ -222,6 +223,117 @@ class TestConfigMetricShow:
             )
 
 
+class TestConfigMetricsEvaluate:
+    @pytest.fixture
+    def service_client(self, mocked_response, fixture_ghcs, sample_config_show):
+        edge_config = dict(sample_config_show, id="edge")
+        device_config = {
+            "id": "device",
+            "content": {"deviceContent": {"properties.desired.x": 1}},
+            "metrics": {
+                "queries": {
+                    "grouped": "SELECT properties.reported.x, COUNT() AS n FROM devices GROUP BY properties.reported.x",
+                    "top": "select top 3 deviceId from devices",
+                    "reported": "SELECT deviceId, properties.reported.x FROM devices WHERE properties.reported.x = 1",
+                    "aggregate": "SELECT COUNT() AS c FROM devices WHERE properties.reported.x = 2",
+                }
+            },
+            "systemMetrics": {"queries": {"targetedCount": "select deviceId from devices where tags.ring = '1'"}},
+        }
+        mocked_response.queries = []
+
+        def query_callback(request):
+            query = json.loads(request.body)["query"]
+            mocked_response.queries.append(query)
+            if query.startswith("SELECT COUNT() AS count FROM "):
+                return (200, {}, json.dumps([{"count": len(query)}]))
+            if query.startswith("SELECT COUNT() AS c FROM "):
+                return (200, {}, json.dumps([{"c": 7}]))
+            if query.startswith("SELECT properties.reported.x"):
+                return (400, {}, json.dumps({"Message": "unsupported"}))
+            # two pages of rows
+            continuation = request.headers.get("x-ms-continuation")
+            headers = {} if continuation else {"x-ms-continuation": "page2"}
+            return (200, headers, json.dumps([{"deviceId": "d"}] * (1 if continuation else 2)))
+
+        mocked_response.add(
+            method=responses.GET,
+            url="https://{}/configurations".format(mock_target["entity"]),
+            body=json.dumps([edge_config, device_config]),
+            status=200,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices/query".format(mock_target["entity"]),
+            callback=query_callback,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        yield mocked_response
+
+    def test_config_metrics_evaluate(self, fixture_cmd, service_client, sample_config_show):
+        result = subject.iot_hub_configuration_metrics_evaluate(
+            cmd=fixture_cmd, concurrency=3, hub_name=mock_target["entity"]
+        )
+
+        count_query = "SELECT COUNT() AS count FROM devices WHERE properties.reported.x = 1"
+        targeted_query = "SELECT COUNT() AS count FROM devices where tags.ring = '1'"
+        assert result == [
+            {
+                "id": "device",
+                "metrics": {"grouped": None, "top": 3, "reported": len(count_query), "aggregate": 7},
+                "systemMetrics": {"targetedCount": len(targeted_query)},
+                "errors": {"metrics": {"grouped": {"Message": "unsupported"}}},
+            }
+        ]
+        assert sorted(set(service_client.queries)) == sorted(
+            [
+                count_query,
+                targeted_query,
+                "select top 3 deviceId from devices",
+                "SELECT COUNT() AS c FROM devices WHERE properties.reported.x = 2",
+                "SELECT properties.reported.x, COUNT() AS n FROM devices GROUP BY properties.reported.x",
+            ]
+        )
+        # a single configuration list request
+        assert len([c for c in service_client.calls if c.request.method == "GET"]) == 1
+
+    def test_edge_deployment_metrics_evaluate(self, fixture_cmd, service_client, sample_config_show):
+        result = subject.iot_edge_deployment_metrics_evaluate(
+            cmd=fixture_cmd, metric_type="system", hub_name=mock_target["entity"]
+        )
+
+        assert len(result) == 1
+        assert result[0]["id"] == "edge"
+        assert "metrics" not in result[0]
+        metrics = result[0]["systemMetrics"]
+        assert metrics["targetedCount"] is None
+        for metric_id, query in sample_config_show["systemMetrics"]["queries"].items():
+            if query:
+                count_query = "SELECT COUNT() AS count FROM {}".format(query.split(" from ", 1)[1])
+                assert metrics[metric_id] == len(count_query)
+        assert len(service_client.queries) == 3
+
+    def test_config_metrics_evaluate_ids(self, fixture_cmd, service_client):
+        result = subject.iot_hub_configuration_metrics_evaluate(
+            cmd=fixture_cmd, config_ids=["edge", "device"], metric_type="user", hub_name=mock_target["entity"]
+        )
+        assert [r["id"] for r in result] == ["edge", "device"]
+        assert list(result[0]["metrics"]) == ["mymetric"]
+
+        service_client.assert_all_requests_are_fired = False
+        with pytest.raises(CLIError):
+            subject.iot_hub_configuration_metrics_evaluate(
+                cmd=fixture_cmd, config_ids=["edge", "missing"], hub_name=mock_target["entity"]
+            )
+        with pytest.raises(CLIError):
+            subject.iot_hub_configuration_metrics_evaluate(
+                cmd=fixture_cmd, concurrency=0, hub_name=mock_target["entity"]
+            )
+
+
 class TestConfigShow:
     @pytest.fixture(params=[200])
     def serviceclient(
@@ -591,6 +703,66 @@ class TestConfigCreate:
             )
 
 
+class TestEdgeDeploymentValidate:
+    @pytest.fixture
+    def manifests(self, set_cwd, tmp_path):
+        valid = read_file_content("test_edge_deployment.json")
+        malformed = read_file_content("test_edge_deployment_malformed.json")
+        (tmp_path / "nested").mkdir()
+        for name, content in [
+            ("a.json", valid),
+            ("b.json", malformed),
+            ("nested/c.json", valid),
+            ("notes.txt", "not a manifest"),
+            ("d.json", "{}"),
+        ]:
+            (tmp_path / name).write_text(content)
+        return tmp_path
+
+    @pytest.mark.parametrize("processes", [1, 2])
+    def test_edge_deployment_validate(self, fixture_cmd, manifests, processes):
+        with pytest.raises(CLIError) as exc:
+            subject.iot_edge_deployment_validate(
+                cmd=fixture_cmd, content_paths=[str(manifests)], processes=processes
+            )
+
+        result = json.loads(str(exc.value))
+        assert result["manifests"] == 4
+        assert result["valid"] == 2
+        assert result["invalid"] == 2
+        failures = {os.path.basename(f["file"]): f["errors"] for f in result["failures"]}
+        assert sorted(failures) == ["b.json", "d.json"]
+        for error in failures["b.json"]:
+            assert "contentPath" in error and "schemaPath" in error
+        assert failures["d.json"] == [
+            {"description": "Edge deployment manifests require property: modulesContent"}
+        ]
+
+        result = subject.iot_edge_deployment_validate(
+            cmd=fixture_cmd,
+            content_paths=[str(manifests / "a.json"), str(manifests / "nested")],
+        )
+        assert result == {"manifests": 2, "valid": 2, "invalid": 0}
+
+    def test_edge_deployment_validate_invalid_args(self, fixture_cmd, manifests):
+        for content_paths, processes in [
+            ([str(manifests / "missing.json")], None),
+            ([str(manifests / "nested")], 0),
+        ]:
+            with pytest.raises(CLIError):
+                subject.iot_edge_deployment_validate(
+                    cmd=fixture_cmd, content_paths=content_paths, processes=processes
+                )
+
+    def test_edge_schema_validator_cache(self):
+        from azext_iot.models.validators import get_edge_schema_validator
+
+        validator = get_edge_schema_validator("$edgeAgent", "1.1")
+        assert validator is get_edge_schema_validator("$edgeAgent", "1.1")
+        assert validator is not get_edge_schema_validator("$edgeHub", "1.1")
+        assert get_edge_schema_validator("$edgeHub", "0.1") is None
+
+
 class TestConfigDelete:
     @pytest.fixture(params=[204])
     def serviceclient(self, mocker, fixture_ghcs, fixture_sas, request):
@@ -899,3 +1071,120 @@ class TestConfigApply:
                 hub_name=mock_target["entity"],
                 content=sample_config_edge_malformed,
             )
+
+
+class TestConfigApplyDiff:
+    device_id = "test-device-01"
+
+    @pytest.fixture
+    def service_client(self, mocked_response, fixture_ghcs, set_cwd):
+        import re
+        from urllib.parse import unquote
+
+        content = json.loads(read_file_content("test_edge_deployment.json"))["content"]
+        mocked_response.twins = {
+            module_id: {
+                "moduleId": module_id,
+                "properties": {
+                    "desired": dict(module["properties.desired"], **{"$version": 3, "$metadata": {}})
+                },
+            }
+            for module_id, module in content["modulesContent"].items()
+        }
+        mocked_response.applied = []
+
+        def twin_callback(request):
+            module_id = unquote(request.url.split("/modules/")[1].split("?")[0])
+            twin = mocked_response.twins.get(module_id)
+            if not twin:
+                return (404, {}, json.dumps({"Message": "not found"}))
+            return (200, {}, json.dumps(twin))
+
+        def apply_callback(request):
+            mocked_response.applied.append(json.loads(request.body))
+            return (200, {}, "{}")
+
+        for method, url, callback in [
+            (
+                responses.GET,
+                re.compile(r"https://{}/twins/{}/modules/".format(mock_target["entity"], self.device_id)),
+                twin_callback,
+            ),
+            (
+                responses.POST,
+                "https://{}/devices/{}/applyConfigurationContent".format(mock_target["entity"], self.device_id),
+                apply_callback,
+            ),
+        ]:
+            mocked_response.add_callback(
+                method=method,
+                url=url,
+                callback=callback,
+                content_type="application/json",
+                match_querystring=False,
+            )
+        mocked_response.add(
+            method=responses.GET,
+            url="https://{}/devices/{}/modules".format(mock_target["entity"], self.device_id),
+            body=json.dumps([{"moduleId": module_id} for module_id in mocked_response.twins]),
+            status=200,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        mocked_response.assert_all_requests_are_fired = False
+        mocked_response.content = content
+        yield mocked_response
+
+    def set_modules(self, fixture_cmd, content):
+        return subject.iot_edge_set_modules(
+            cmd=fixture_cmd,
+            device_id=self.device_id,
+            content=json.dumps({"content": content}),
+            diff=True,
+            hub_name=mock_target["entity"],
+        )
+
+    def test_config_apply_diff_unchanged(self, fixture_cmd, service_client):
+        result = self.set_modules(fixture_cmd, service_client.content)
+
+        assert service_client.applied == []
+        assert [m.module_id for m in result] == list(service_client.twins)
+        twin_calls = [c for c in service_client.calls if "/twins/" in c.request.url]
+        assert len(twin_calls) == len(service_client.twins)
+
+    def test_config_apply_diff_changed(self, fixture_cmd, service_client):
+        content = json.loads(json.dumps(service_client.content))
+        modules_content = content["modulesContent"]
+        modules_content["mymodule0"]["properties.desired"]["setting"] = {"interval": 10}
+        modules_content["newmodule"] = {"properties.desired": {"enabled": True}}
+        # null desired properties are not stored in the twin
+        modules_content["$edgeHub"]["properties.desired"]["unset"] = None
+
+        self.set_modules(fixture_cmd, content)
+
+        assert len(service_client.applied) == 1
+        applied = service_client.applied[0]["modulesContent"]
+        assert applied == {
+            "$edgeAgent": modules_content["$edgeAgent"],
+            "$edgeHub": modules_content["$edgeHub"],
+            "mymodule0": modules_content["mymodule0"],
+            "newmodule": modules_content["newmodule"],
+        }
+
+    def test_config_apply_diff_custom_module_only(self, fixture_cmd, service_client):
+        content = json.loads(json.dumps(service_client.content))
+        modules_content = content["modulesContent"]
+        modules_content["mymodule0"]["properties.desired"]["setting"] = {"interval": 10}
+
+        self.set_modules(fixture_cmd, content)
+
+        # system modules are applied along with the changed custom module
+        assert len(service_client.applied) == 1
+        assert service_client.applied[0]["modulesContent"] == modules_content
+        assert "routes" in service_client.applied[0]["modulesContent"]["$edgeHub"]["properties.desired"]
+
+    def test_get_changed_paths(self):
+        current = {"a": 1, "b": {"c": 2, "d": 3}, "e": [1]}
+        desired = {"a": 1, "b": {"c": 2, "d": 4, "f": 5}, "e": [1, 2], "g": True}
+        assert subject._get_changed_paths(current, desired) == ["b.d", "b.f", "e", "g"]
+        assert subject._get_changed_paths(current, current) == []
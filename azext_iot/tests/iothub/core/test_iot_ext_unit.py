@@ -16,6 +16,7 @@ import json
 import os
 import responses
 import re
+import threading
 from azext_iot.operations import hub as subject
 from azext_iot.common.utility import read_file_content
 from azext_iot.common.sas_token_auth import SasTokenAuthentication
@@ -1447,6 +1448,38 @@ class TestQuery:
         else:
             assert not headers.get("x-ms-max-item-count")
 
+    @pytest.mark.parametrize(
+        "servresult, servtotal, top",
+        [
+            ([generate_device_twin_show(), generate_device_twin_show()], 6, None),
+            ([generate_device_twin_show(), generate_device_twin_show()], 5, 3),
+            ([generate_device_twin_show()], 1, 100),
+        ],
+    )
+    def test_query_stream(self, serviceclient, capsys, servresult, servtotal, top):
+        pagesize = len(servresult)
+        continuation = [generate_generic_id() for _ in range(-(-servtotal // pagesize))]
+        continuation[-1] = None
+
+        serviceclient.return_value = build_mock_response(
+            status_code=200, payload=servresult, headers_get_side_effect=continuation
+        )
+
+        result = subject.iot_query(
+            cmd=None,
+            hub_name=mock_target["entity"],
+            query_command=generic_query,
+            top=top,
+            stream=True,
+        )
+        assert result is None
+
+        targetcount = min(top, servtotal) if top else servtotal
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == targetcount
+        for line in lines:
+            assert json.loads(line) in servresult
+
     @pytest.mark.parametrize("top", [-2, 0])
     def test_query_invalid_args(self, top):
         with pytest.raises(CLIError):
@@ -1540,6 +1573,123 @@ class TestDeviceMethodInvoke:
                 method_payload='{"key":"value"}',
             )
 
+    @pytest.mark.parametrize("module, connect_timeout", [(None, 5), ("$edgeAgent", 5), (None, None)])
+    def test_device_method_fanout(self, fixture_cmd, mocked_response, fixture_ghcs, capsys, module, connect_timeout):
+        devices = ["device{}".format(i) for i in range(12)]
+        method_url = re.compile(
+            r"https://{}/twins/([^/?]+)/(modules/[^/?]+/)?methods".format(mock_target["entity"])
+        )
+        bodies = []
+        http_timeouts = []
+        lock = threading.Lock()
+
+        def query_callback(request):
+            continuation = request.headers.get("x-ms-continuation")
+            start = int(continuation) if continuation else 0
+            headers = {}
+            if start + 5 < len(devices):
+                headers["x-ms-continuation"] = str(start + 5)
+            page = [{"deviceId": d} for d in devices[start:start + 5]]
+            return (200, headers, json.dumps(page))
+
+        def method_callback(request):
+            target = method_url.match(request.url).group(1)
+            with lock:
+                bodies.append(json.loads(request.body))
+                http_timeouts.append(request.req_kwargs["timeout"])
+            if target == "device7":
+                return (404, {}, json.dumps({"Message": "Device is not online."}))
+            return (200, {}, json.dumps({"status": 200, "payload": {"device": target}}))
+
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices/query".format(mock_target["entity"]),
+            callback=query_callback,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url=method_url,
+            callback=method_callback,
+            content_type="application/json",
+            match_querystring=False,
+        )
+
+        kwargs = {
+            "cmd": fixture_cmd,
+            "hub_name": mock_target["entity"],
+            "method_name": "diagnostics",
+            "method_payload": '{"level": 2}',
+            "timeout": 20,
+            "method_connect_timeout": connect_timeout,
+            "device_query": "select deviceId from devices",
+            "max_concurrency": 3,
+        }
+        if module:
+            assert subject.iot_device_module_method(module_id=module, **kwargs) is None
+        else:
+            assert subject.iot_device_method(**kwargs) is None
+
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        results, summary = lines[:-1], lines[-1]["summary"]
+        assert sorted(r["deviceId"] for r in results) == sorted(devices)
+        for result in results:
+            assert result.get("moduleId") == module
+            assert result["latencyMs"] >= 0
+            if result["deviceId"] == "device7":
+                assert result["status"] == 404
+                assert "error" in result
+            else:
+                assert result["status"] == 200
+                assert result["payload"] == {"device": result["deviceId"]}
+
+        assert summary["devices"] == 12
+        assert summary["succeeded"] == 11
+        assert summary["failed"] == 1
+        assert summary["statusCodes"] == {"200": 11, "404": 1}
+        assert sum(summary["latencyMs"]["histogram"].values()) == 12
+        assert summary["latencyMs"]["min"] <= summary["latencyMs"]["p50"] <= summary["latencyMs"]["max"]
+        expected_body = {
+            "methodName": "diagnostics",
+            "payload": {"level": 2},
+            "responseTimeoutInSeconds": 20,
+            "connectTimeoutInSeconds": 20 if connect_timeout is None else connect_timeout,
+        }
+        assert all(body == expected_body for body in bodies)
+        assert set(http_timeouts) == {20 + (connect_timeout or 0)}
+
+        # a single device invocation sends the same request
+        del bodies[:], http_timeouts[:]
+        kwargs.pop("device_query")
+        kwargs.pop("max_concurrency")
+        if module:
+            subject.iot_device_module_method(module_id=module, device_id="device0", **kwargs)
+        else:
+            subject.iot_device_method(device_id="device0", **kwargs)
+        assert bodies == [expected_body]
+        assert http_timeouts == [20 + (connect_timeout or 0)]
+
+    @pytest.mark.parametrize(
+        "target_device_id, device_query, connect_timeout",
+        [
+            (None, None, None),
+            (device_id, "select deviceId from devices", None),
+            (device_id, None, -1),
+            (None, "select deviceId from devices", 1000),
+        ],
+    )
+    def test_device_method_invalid_targets(self, fixture_ghcs, target_device_id, device_query, connect_timeout):
+        with pytest.raises(CLIError):
+            subject.iot_device_method(
+                cmd=fixture_cmd,
+                device_id=target_device_id,
+                device_query=device_query,
+                method_connect_timeout=connect_timeout,
+                hub_name=mock_target["entity"],
+                method_name="mymethod",
+            )
+
 
 class TestDeviceModuleMethodInvoke:
     @pytest.fixture(params=[200])
@@ -1683,6 +1833,54 @@ class TestSasTokenAuth:
         )
         assert "skn=iothubowner" in token
 
+    def test_generate_sas_token_cached(self, mocker):
+        from azext_iot.common.sas_token_auth import token_cache
+
+        token_cache.clear()
+        patched_time = mocker.patch("azext_iot.common.sas_token_auth.time")
+        access_key = "+XLy+MVZ+aTeOnVzN2kLeB16O+kSxmz6g3rS6fAf6rw="
+        uri = "iot-hub-for-test.azure-devices.net/devices/iot-device-for-test"
+
+        patched_time.return_value = 960
+        token = SasTokenAuthentication(uri, None, access_key, 3600).generate_sas_token()
+        assert "se=4560" in token
+
+        # reused within the cache window, by new instances as well
+        patched_time.return_value = 1019
+        assert SasTokenAuthentication(uri, None, access_key, 3600).generate_sas_token() == token
+        assert len(token_cache) == 1
+
+        # a different expiry, policy or key is a different token
+        assert SasTokenAuthentication(uri, None, access_key, 1800).generate_sas_token() != token
+        assert SasTokenAuthentication(uri, "registryRead", access_key, 3600).generate_sas_token() != token
+        other_key = "c2VjcmV0c2VjcmV0c2VjcmV0c2VjcmV0c2VjcmV0MTI="
+        assert SasTokenAuthentication(uri, None, other_key, 3600).generate_sas_token() != token
+
+        # a new token once the window has passed
+        patched_time.return_value = 1020
+        refreshed = SasTokenAuthentication(uri, None, access_key, 3600).generate_sas_token()
+        assert "se=4620" in refreshed
+
+        # short lived tokens are reused for at most a tenth of their lifetime
+        patched_time.return_value = 960
+        short = SasTokenAuthentication(uri, None, access_key, 30).generate_sas_token()
+        patched_time.return_value = 963
+        assert SasTokenAuthentication(uri, None, access_key, 30).generate_sas_token() != short
+        token_cache.clear()
+
+    def test_sas_token_cache_bounded(self):
+        from azext_iot.common.sas_token_auth import SasTokenCache
+
+        cache = SasTokenCache(max_size=2)
+        cache.set("a", "token-a")
+        cache.set("b", "token-b")
+        assert cache.get("a") == "token-a"
+        cache.set("c", "token-c")
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == "token-a"
+        assert cache.get("c") == "token-c"
+
 
 class TestMonitorEvents:
     @pytest.fixture(params=[200])
@@ -1797,6 +1995,36 @@ def generate_child_device(**kvp):
     return payload
 
 
+def generate_child_twin(**kvp):
+    device = generate_child_device()
+    payload = {
+        "deviceId": device["deviceId"],
+        "deviceEtag": device["etag"],
+        "etag": "AAAAAAAAAAE=",
+        "capabilities": device["capabilities"],
+        "status": device["status"],
+        "deviceScope": device["deviceScope"],
+        "authenticationType": "sas",
+    }
+    for k in kvp:
+        payload["deviceEtag" if k == "etag" else k] = kvp[k]
+    return payload
+
+
+bulk_success = {"isSuccessful": True, "errors": [], "warnings": []}
+bulk_failure = {
+    "isSuccessful": False,
+    "errors": [
+        {
+            "deviceId": child_device_id,
+            "errorCode": "PreconditionFailed",
+            "errorStatus": "Precondition failed: Device version did not match.",
+        }
+    ],
+    "warnings": [],
+}
+
+
 class TestEdgeOffline:
 
     # get-parent
@@ -1956,10 +2184,16 @@ class TestEdgeOffline:
             child_kvp.setdefault("capabilities", {"iotEdge": True})
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
+            build_mock_response(
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
+            ),
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[0], {}),
+            build_mock_response(mocker, request.param[0], bulk_success),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -1968,15 +2202,175 @@ class TestEdgeOffline:
         subject.iot_device_children_add(
             None, device_id, [child_device_id], True, mock_target["entity"]
         )
+        query_body = sc_addchildren.call_args_list[1][0][2]
+        assert query_body["query"] == "select * from devices where deviceId IN ['{}']".format(
+            child_device_id
+        )
         args = sc_addchildren.call_args
         url = args[0][0].url
         body = args[0][2]
-        assert "{}/devices/{}?".format(mock_target["entity"], child_device_id) in url
-        assert args[0][0].method == "PUT"
-        assert body["deviceId"] == child_device_id
-        assert body["deviceScope"] == generate_parent_device().get(
+        assert "{}/devices?".format(mock_target["entity"]) in url
+        assert args[0][0].method == "POST"
+        assert len(body) == 1
+        assert body[0]["id"] == child_device_id
+        assert body[0]["importMode"] == "updateIfMatchETag"
+        assert body[0]["eTag"] == "abcd"
+        assert body[0]["deviceScope"] == generate_parent_device().get(
             "deviceScope"
-        ) or body["parentScopes"] == [generate_parent_device().get("deviceScope")]
+        ) or body[0]["parentScopes"] == [generate_parent_device().get("deviceScope")]
+
+    def test_device_children_add_x509(self, mocker, fixture_ghcs, fixture_sas):
+        service_client = mocker.patch(path_service_client)
+        thumbprint = {"primaryThumbprint": "123", "secondaryThumbprint": "456"}
+        service_client.side_effect = [
+            build_mock_response(mocker, 200, generate_parent_device()),
+            build_mock_response(
+                mocker,
+                200,
+                [
+                    generate_child_twin(
+                        authenticationType="selfSigned", x509Thumbprint=thumbprint
+                    )
+                ],
+                {"x-ms-continuation": None},
+            ),
+            build_mock_response(mocker, 200, bulk_success),
+        ]
+        subject.iot_device_children_add(
+            None, device_id, [child_device_id], False, mock_target["entity"]
+        )
+
+        # authentication is taken from the twin without fetching the identity
+        assert service_client.call_count == 3
+        body = service_client.call_args[0][2]
+        assert body[0]["authentication"] == {"type": "selfSigned", "x509Thumbprint": thumbprint}
+        assert body[0]["deviceScope"] == generate_parent_device().get("deviceScope")
+
+    def test_device_children_add_many(self, fixture_cmd, mocked_response, fixture_ghcs):
+        child_ids = ["child{}".format(i) for i in range(250)]
+        queries = []
+        updates = []
+        lock = threading.Lock()
+
+        def query_callback(request):
+            query = json.loads(request.body)["query"]
+            ids = re.findall(r"'([^']+)'", query)
+            with lock:
+                queries.append(ids)
+            twins = [
+                generate_child_twin(
+                    deviceId=i,
+                    authenticationType="certificateAuthority",
+                    deviceEtag="etag-{}".format(i),
+                )
+                for i in ids
+            ]
+            return (200, {"Content-Type": "application/json"}, json.dumps(twins))
+
+        def bulk_callback(request):
+            with lock:
+                updates.append(json.loads(request.body))
+            return (200, {"Content-Type": "application/json"}, json.dumps(bulk_success))
+
+        mocked_response.add(
+            method=responses.GET,
+            url="https://{}/devices/{}".format(mock_target["entity"], device_id),
+            body=json.dumps(generate_parent_device()),
+            status=200,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices/query".format(mock_target["entity"]),
+            callback=query_callback,
+            match_querystring=False,
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices".format(mock_target["entity"]),
+            callback=bulk_callback,
+            match_querystring=False,
+        )
+
+        subject.iot_device_children_add(
+            fixture_cmd, device_id, child_ids, False, mock_target["entity"]
+        )
+
+        assert sorted(len(q) for q in queries) == [50, 100, 100]
+        assert sorted(len(u) for u in updates) == [50, 100, 100]
+        assert len(mocked_response.calls) == 7
+        updated = {device["id"]: device for update in updates for device in update}
+        assert sorted(updated) == sorted(child_ids)
+        for i in child_ids:
+            assert updated[i]["eTag"] == "etag-{}".format(i)
+            assert updated[i]["deviceScope"] == generate_parent_device()["deviceScope"]
+
+    @pytest.fixture
+    def sc_children_bulk(self, mocked_response, fixture_ghcs):
+        mocked_response.queries = []
+        mocked_response.updates = []
+        mocked_response.bulk_response = (200, bulk_success)
+
+        def query_callback(request):
+            ids = re.findall(r"'([^']+)'", json.loads(request.body)["query"])
+            mocked_response.queries.append(ids)
+            twins = [
+                generate_child_twin(
+                    deviceId=i,
+                    authenticationType="certificateAuthority",
+                    parentScopes=[generate_parent_device()["deviceScope"]],
+                )
+                for i in ids
+            ]
+            return (200, {"Content-Type": "application/json"}, json.dumps(twins))
+
+        def bulk_callback(request):
+            mocked_response.updates.append(json.loads(request.body))
+            status, body = mocked_response.bulk_response
+            return (status, {"Content-Type": "application/json"}, json.dumps(body))
+
+        mocked_response.add(
+            method=responses.GET,
+            url="https://{}/devices/{}".format(mock_target["entity"], device_id),
+            body=json.dumps(generate_parent_device()),
+            status=200,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices/query".format(mock_target["entity"]),
+            callback=query_callback,
+            match_querystring=False,
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices".format(mock_target["entity"]),
+            callback=bulk_callback,
+            match_querystring=False,
+        )
+        yield mocked_response
+
+    @pytest.mark.parametrize("command, kwargs", [("add", {"force": True}), ("remove", {})])
+    def test_device_children_duplicate_ids(self, fixture_cmd, sc_children_bulk, command, kwargs):
+        getattr(subject, "iot_device_children_{}".format(command))(
+            fixture_cmd, device_id, ["child0", "child1", " child0"], hub_name=mock_target["entity"], **kwargs
+        )
+
+        assert sc_children_bulk.queries == [["child0", "child1"]]
+        assert [[d["id"] for d in update] for update in sc_children_bulk.updates] == [["child0", "child1"]]
+
+    @pytest.mark.parametrize("command, kwargs", [("add", {"force": True}), ("remove", {})])
+    def test_device_children_request_rejected(self, fixture_cmd, sc_children_bulk, command, kwargs):
+        message = "ErrorCode:ArgumentInvalid;Invalid request."
+        sc_children_bulk.bulk_response = (400, {"Message": message})
+
+        with pytest.raises(CLIError) as e:
+            getattr(subject, "iot_device_children_{}".format(command))(
+                fixture_cmd, device_id, ["child0", "child1"], hub_name=mock_target["entity"], **kwargs
+            )
+        assert message in str(e.value)
 
     @pytest.fixture(params=[(200, 0), (200, 1)])
     def sc_invalid_args_addchildren(self, mocker, fixture_ghcs, fixture_sas, request):
@@ -1992,7 +2386,10 @@ class TestEdgeOffline:
                 mocker, request.param[0], generate_parent_device(**parent_kvp)
             ),
             build_mock_response(
-                mocker, request.param[0], generate_child_device(**child_kvp)
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
             ),
         ]
         service_client.side_effect = test_side_effect
@@ -2005,13 +2402,19 @@ class TestEdgeOffline:
                 fixture_cmd, device_id, [child_device_id], False, mock_target["entity"]
             )
 
-    @pytest.fixture(params=[(200, 400), (200, 401), (200, 500)])
+    @pytest.fixture(params=[(200, 400), (200, 401), (200, 404)])
     def sc_addchildren_error(self, mocker, fixture_ghcs, fixture_sas, request):
         service_client = mocker.patch(path_service_client)
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
+            build_mock_response(
+                mocker,
+                request.param[0],
+                [generate_child_twin()],
+                {"x-ms-continuation": None},
+            ),
             build_mock_response(mocker, request.param[0], generate_child_device()),
-            build_mock_response(mocker, request.param[1], {}),
+            build_mock_response(mocker, request.param[1], bulk_failure),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -2029,6 +2432,12 @@ class TestEdgeOffline:
         child_kvp.setdefault("etag", None)
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
+            build_mock_response(
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
+            ),
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
@@ -2037,7 +2446,7 @@ class TestEdgeOffline:
         return service_client
 
     @pytest.mark.parametrize("exp", [CLIError])
-    def test_device_addchildren_invalid_etag(self, sc_invalid_etag_setparent, exp):
+    def test_device_addchildren_invalid_etag(self, sc_invalid_etag_addchildren, exp):
         with pytest.raises(exp):
             subject.iot_device_children_add(
                 fixture_cmd, device_id, [child_device_id], True, mock_target["entity"]
@@ -2103,10 +2512,16 @@ class TestEdgeOffline:
         )
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
+            build_mock_response(
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
+            ),
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[0], {}),
+            build_mock_response(mocker, request.param[0], bulk_success),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -2117,8 +2532,11 @@ class TestEdgeOffline:
         )
         args = sc_removechildrenlist.call_args
         url = args[0][0].url
-        assert "{}/devices/{}?".format(mock_target["entity"], child_device_id) in url
-        assert args[0][0].method == "PUT"
+        body = args[0][2]
+        assert "{}/devices?".format(mock_target["entity"]) in url
+        assert args[0][0].method == "POST"
+        assert body[0]["id"] == child_device_id
+        assert body[0]["deviceScope"] == ""
 
     @pytest.fixture(params=[(200, 0), (200, 1), (200, 2), (200, 3)])
     def sc_invalid_args_removechildrenlist(
@@ -2140,7 +2558,10 @@ class TestEdgeOffline:
                 mocker, request.param[0], generate_parent_device(**parent_kvp)
             ),
             build_mock_response(
-                mocker, request.param[0], generate_child_device(**child_kvp)
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
             ),
         ]
         service_client.side_effect = test_side_effect
@@ -2167,10 +2588,16 @@ class TestEdgeOffline:
         child_kvp.setdefault("etag", None)
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
+            build_mock_response(
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
+            ),
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[0], {}),
+            build_mock_response(mocker, request.param[0], bulk_success),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -2184,7 +2611,7 @@ class TestEdgeOffline:
                 fixture_cmd, device_id, [child_device_id], False, mock_target["entity"]
             )
 
-    @pytest.fixture(params=[(200, 400), (200, 401), (200, 500)])
+    @pytest.fixture(params=[(200, 400), (200, 401), (200, 404)])
     def sc_removechildrenlist_error(self, mocker, fixture_ghcs, fixture_sas, request):
         service_client = mocker.patch(path_service_client)
         child_kvp = {}
@@ -2193,10 +2620,16 @@ class TestEdgeOffline:
         )
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
+            build_mock_response(
+                mocker,
+                request.param[0],
+                [generate_child_twin(**child_kvp)],
+                {"x-ms-continuation": None},
+            ),
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[1], {}),
+            build_mock_response(mocker, request.param[1], bulk_failure),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -2204,7 +2637,7 @@ class TestEdgeOffline:
     def test_device_removechildrenlist_error(self, sc_removechildrenlist_error):
         with pytest.raises(CLIError):
             subject.iot_device_children_remove(
-                fixture_cmd, device_id, child_device_id, False, mock_target["entity"]
+                fixture_cmd, device_id, [child_device_id], False, mock_target["entity"]
             )
 
     @pytest.fixture(params=[(200, 200)])
@@ -2215,7 +2648,7 @@ class TestEdgeOffline:
             "parentScopes", [generate_parent_device().get("deviceScope")]
         )
         result = []
-        result.append(generate_child_device(**child_kvp))
+        result.append(generate_child_twin(**child_kvp))
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
             build_mock_response(
@@ -2224,7 +2657,7 @@ class TestEdgeOffline:
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[0], {}),
+            build_mock_response(mocker, request.param[0], bulk_success),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -2233,10 +2666,15 @@ class TestEdgeOffline:
         subject.iot_device_children_remove(
             fixture_cmd, device_id, None, True, mock_target["entity"]
         )
+        query_body = sc_removechildrenall.call_args_list[1][0][2]
+        assert query_body["query"].startswith("select * from devices where array_contains")
         args = sc_removechildrenall.call_args
         url = args[0][0].url
-        assert "{}/devices/{}?".format(mock_target["entity"], child_device_id) in url
-        assert args[0][0].method == "PUT"
+        body = args[0][2]
+        assert "{}/devices?".format(mock_target["entity"]) in url
+        assert args[0][0].method == "POST"
+        assert body[0]["id"] == child_device_id
+        assert body[0]["deviceScope"] == ""
 
     @pytest.fixture(params=[(200, 0), (200, 1)])
     def sc_invalid_args_removechildrenall(
@@ -2249,7 +2687,7 @@ class TestEdgeOffline:
             "parentScopes", [generate_parent_device().get("deviceScope")]
         )
         result = []
-        result.append(generate_child_device(**child_kvp))
+        result.append(generate_child_twin(**child_kvp))
         if request.param[1] == 0:
             parent_kvp.setdefault("capabilities", {"iotEdge": False})
         if request.param[1] == 1:
@@ -2285,7 +2723,7 @@ class TestEdgeOffline:
         )
         child_kvp.setdefault("etag", None)
         result = []
-        result.append(generate_child_device(**child_kvp))
+        result.append(generate_child_twin(**child_kvp))
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
             build_mock_response(
@@ -2294,7 +2732,7 @@ class TestEdgeOffline:
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[0], {}),
+            build_mock_response(mocker, request.param[0], bulk_success),
         ]
         service_client.side_effect = test_side_effect
         return service_client
@@ -2308,7 +2746,7 @@ class TestEdgeOffline:
                 fixture_cmd, device_id, None, True, mock_target["entity"]
             )
 
-    @pytest.fixture(params=[(200, 400), (200, 401), (200, 500)])
+    @pytest.fixture(params=[(200, 400), (200, 401), (200, 404)])
     def sc_removechildrenall_error(self, mocker, fixture_ghcs, fixture_sas, request):
         service_client = mocker.patch(path_service_client)
         child_kvp = {}
@@ -2316,7 +2754,7 @@ class TestEdgeOffline:
             "parentScopes", [generate_parent_device().get("deviceScope")]
         )
         result = []
-        result.append(generate_child_device(**child_kvp))
+        result.append(generate_child_twin(**child_kvp))
         test_side_effect = [
             build_mock_response(mocker, request.param[0], generate_parent_device()),
             build_mock_response(
@@ -2325,7 +2763,7 @@ class TestEdgeOffline:
             build_mock_response(
                 mocker, request.param[0], generate_child_device(**child_kvp)
             ),
-            build_mock_response(mocker, request.param[1], {}),
+            build_mock_response(mocker, request.param[1], bulk_failure),
         ]
         service_client.side_effect = test_side_effect
         return service_client
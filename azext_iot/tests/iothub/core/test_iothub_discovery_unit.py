@@ -4,7 +4,10 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
+import os
 import pytest
+from time import time
 from azext_iot.iothub.providers.discovery import IotHubDiscovery
 from azext_iot.common._azure import parse_iot_hub_connection_string
 
@@ -56,3 +59,135 @@ class TestIoTHubDiscovery:
         assert target["entity"] == parsed_fake_login["HostName"]
         assert target["policy"] == parsed_fake_login["SharedAccessKeyName"]
         assert target["primarykey"] == parsed_fake_login["SharedAccessKey"]
+
+
+class TestDiscoveryCache:
+    @pytest.fixture
+    def discover(self, mocker, fixture_cmd, monkeypatch, tmp_path):
+        monkeypatch.setenv("AZURE_IOT_DISCOVERY_CACHE", "true")
+        monkeypatch.setenv("AZURE_CONFIG_DIR", str(tmp_path))
+
+        def initialize_client(self):
+            self.sub_id = "mysubscription"
+
+        mocker.patch.object(IotHubDiscovery, "_initialize_client", initialize_client)
+        discover = mocker.patch.object(IotHubDiscovery, "_discover_target")
+        discover.side_effect = lambda resource_name, resource_group_name, **kwargs: {
+            "cs": "HostName={}.azure-devices.net;SharedAccessKeyName=iothubowner;SharedAccessKey=key".format(
+                resource_name
+            ),
+            "entity": "{}.azure-devices.net".format(resource_name),
+            "policy": "iothubowner",
+            "cmd": fixture_cmd,
+        }
+        return discover
+
+    def test_get_target_cached(self, fixture_cmd, discover, tmp_path):
+        target = IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+        cached = IotHubDiscovery(fixture_cmd).get_target(resource_name="MyHub")
+
+        assert discover.call_count == 1
+        assert cached == target
+        assert cached["cmd"] is fixture_cmd
+
+        # cached targets are keyed by resource group, policy and auth type
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub", resource_group_name="myrg")
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub", policy_name="service")
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub", auth_type="login")
+        assert discover.call_count == 4
+
+        entries = list((tmp_path / "object_cache" / "iot_discovery").iterdir())
+        assert len(entries) == 4
+        if os.name == "posix":
+            assert all(entry.stat().st_mode & 0o777 == 0o600 for entry in entries)
+            assert entries[0].parent.stat().st_mode & 0o777 == 0o700
+        assert all("cmd" not in json.loads(entry.read_text())["target"] for entry in entries)
+
+    def test_get_target_cache_expired(self, fixture_cmd, discover, mocker):
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+        now = time()
+        mocker.patch("azext_iot.common.discovery_cache.time", return_value=now + 3601)
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+
+        assert discover.call_count == 2
+
+    def test_get_target_cache_disabled(self, fixture_cmd, discover, monkeypatch):
+        monkeypatch.setenv("AZURE_IOT_DISCOVERY_CACHE", "false")
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+
+        assert discover.call_count == 2
+
+    def test_get_target_cache_invalidated_on_unauthorized(self, fixture_cmd, discover, mocker):
+        from azure.cli.core.azclierror import UnauthorizedError
+        from azext_iot.common.utility import handle_service_exception
+
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="otherhub")
+
+        error = mocker.MagicMock(name="error")
+        error.response.status_code = 401
+        error.response.request.url = "https://myhub.azure-devices.net/devices/d0?api-version=2021-04-12"
+        with pytest.raises(UnauthorizedError):
+            handle_service_exception(error)
+
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="myhub")
+        IotHubDiscovery(fixture_cmd).get_target(resource_name="otherhub")
+        assert [c.kwargs.get("resource_name", c.args[0] if c.args else None) for c in discover.call_args_list] == [
+            "myhub",
+            "otherhub",
+            "myhub",
+        ]
+
+
+class TestGetTargets:
+    def test_get_targets_concurrent(self, fixture_cmd, mocker):
+        import threading
+        from types import SimpleNamespace
+        from azure.core.exceptions import HttpResponseError
+
+        def make_hub(name):
+            return SimpleNamespace(
+                name=name,
+                additional_properties={"resourcegroup": "rg-{}".format(name)},
+                properties=SimpleNamespace(host_name="{}.azure-devices.net".format(name)),
+                location="westus2",
+                sku=SimpleNamespace(tier="Standard"),
+            )
+
+        hubs = [make_hub("hub{}".format(i)) for i in range(4)]
+        # every policy lookup waits for the others, so a serial loop would time out
+        barrier = threading.Barrier(len(hubs), timeout=10)
+
+        def list_keys(resource_name, resource_group_name):
+            barrier.wait()
+            assert resource_group_name == "rg-{}".format(resource_name)
+            if resource_name == "hub2":
+                raise HttpResponseError(message="Forbidden")
+            policy = SimpleNamespace(
+                key_name="iothubowner",
+                rights="RegistryWrite, ServiceConnect, DeviceConnect",
+                primary_key="pk-{}".format(resource_name),
+                secondary_key="sk",
+            )
+            return mocker.MagicMock(by_page=lambda: iter([[policy]]))
+
+        client = mocker.MagicMock()
+        client.list_by_subscription.return_value.by_page.return_value = iter([hubs])
+        client.list_keys.side_effect = list_keys
+        mocker.patch.object(IotHubDiscovery, "_initialize_client")
+
+        discovery = IotHubDiscovery(fixture_cmd)
+        discovery.client = client
+        discovery.track2 = True
+        targets = discovery.get_targets(concurrency=4)
+
+        assert [t["entity"] for t in targets] == [
+            "hub0.azure-devices.net",
+            "hub1.azure-devices.net",
+            "hub3.azure-devices.net",
+        ]
+        assert [t["primarykey"] for t in targets] == ["pk-hub0", "pk-hub1", "pk-hub3"]
+        assert all(t["resourcegroup"] == "rg-{}".format(t["entity"].split(".")[0]) for t in targets)
+        # listed resources are not fetched again by name
+        assert client.get.call_count == 0
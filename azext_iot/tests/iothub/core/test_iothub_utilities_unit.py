@@ -5,9 +5,14 @@
 # --------------------------------------------------------------------------------------------
 
 from azext_iot.common.sas_token_auth import SasTokenAuthentication
+import json
+import re
 import pytest
+import responses
 from knack.cli import CLIError
+from urllib.parse import unquote
 from azext_iot.operations import hub as subject
+from azext_iot.tests.conftest import mock_target
 from azext_iot.tests.generators import generate_generic_id
 
 
@@ -83,3 +88,158 @@ class TestGenerateSasToken:
                 cmd=fixture_cmd,
                 connection_string=req["connection_string"],
             )
+
+
+class TestGenerateSasTokenBatch:
+    @pytest.fixture()
+    def service(self, mocked_response, fixture_ghcs):
+        identity_url = re.compile(
+            r"https://{}/devices/([^/?]+)(?:/modules/([^/?]+))?\?".format(mock_target["entity"])
+        )
+
+        def callback(request):
+            device_id, module_id = [
+                unquote(v) if v else v for v in identity_url.match(request.url).groups()
+            ]
+            if device_id == "missing":
+                return (404, {}, json.dumps({"Message": "Device not found."}))
+            if device_id == "x509":
+                return (200, {}, json.dumps({"deviceId": device_id, "authentication": {"type": "selfSigned"}}))
+            key = "{}-{}".format(device_id, module_id or "device").encode()
+            import base64
+
+            entity = {
+                "deviceId": device_id,
+                "authentication": {
+                    "type": "sas",
+                    "symmetricKey": {
+                        "primaryKey": base64.b64encode(key).decode(),
+                        "secondaryKey": base64.b64encode(key + b"2").decode(),
+                    },
+                },
+            }
+            if module_id:
+                entity["moduleId"] = module_id
+            return (200, {}, json.dumps(entity))
+
+        mocked_response.add_callback(
+            method=responses.GET,
+            url=identity_url,
+            callback=callback,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        yield mocked_response
+
+    @pytest.mark.parametrize("key_type", ["primary", "secondary"])
+    def test_generate_sas_token_input(self, fixture_cmd, service, tmp_path, capsys, key_type):
+        import base64
+
+        lines = ["device{}".format(i) for i in range(150)]
+        lines += ["edge1/$edgeAgent", '{"deviceId": "edge2", "moduleId": "sensor"}', "", "missing", "x509", "{bad"]
+        input_path = tmp_path / "devices.txt"
+        input_path.write_text("\n".join(lines))
+
+        assert subject.iot_get_sas_token(
+            cmd=fixture_cmd,
+            hub_name=mock_target["entity"],
+            key_type=key_type,
+            duration=600,
+            input_path=str(input_path),
+        ) is None
+
+        results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert len(results) == 155
+        assert [r.get("deviceId") for r in results[:150]] == lines[:150]
+        for result in results[:152]:
+            module_id = result.get("moduleId")
+            key = "{}-{}".format(result["deviceId"], module_id or "device").encode()
+            if key_type == "secondary":
+                key += b"2"
+            uri = "{}/devices/{}".format(mock_target["entity"], result["deviceId"])
+            if module_id:
+                uri = "{}/modules/{}".format(uri, module_id)
+            expected = SasTokenAuthentication(uri, None, base64.b64encode(key).decode(), 600)
+            assert result["sas"] == expected.generate_sas_token()
+
+        assert results[150]["moduleId"] == "$edgeAgent"
+        assert results[151]["moduleId"] == "sensor"
+        assert results[152]["deviceId"] == "missing" and "error" in results[152]
+        assert results[153]["error"] == "This device does not support SAS auth."
+        assert "error" in results[154] and "sas" not in results[154]
+
+    def test_generate_sas_token_input_invalid(self, fixture_cmd, tmp_path):
+        input_path = tmp_path / "devices.txt"
+        input_path.write_text("device0")
+        with pytest.raises(CLIError):
+            subject.iot_get_sas_token(
+                cmd=fixture_cmd,
+                hub_name=mock_target["entity"],
+                device_id="device0",
+                input_path=str(input_path),
+            )
+        with pytest.raises(CLIError):
+            subject.iot_get_sas_token(
+                cmd=fixture_cmd,
+                hub_name=mock_target["entity"],
+                input_path=str(tmp_path / "missing.txt"),
+            )
+
+
+class TestSdkConnectionPools:
+    @pytest.fixture
+    def pools(self, mocker):
+        from azext_iot._factory import SdkConnectionPools
+
+        pools = SdkConnectionPools()
+        mocker.patch("azext_iot._factory.sdk_connection_pools", pools)
+        yield pools
+        pools.clear()
+
+    def test_sdk_clients_not_shared(self, pools, fixture_cmd):
+        from azext_iot._factory import SdkResolver
+        from azext_iot.common.shared import SdkType
+        from azext_iot.constants import USER_AGENT
+
+        target = dict(mock_target, cmd=fixture_cmd)
+        service_sdk = SdkResolver(target=target).get_sdk(SdkType.service_sdk)
+        other_sdk = SdkResolver(target=dict(target)).get_sdk(SdkType.service_sdk)
+
+        # clients keep their own configuration
+        assert other_sdk is not service_sdk
+        assert other_sdk.config is not service_sdk.config
+        service_sdk.config.retry_policy.retries = 1
+        assert other_sdk.config.retry_policy.retries != 1
+        assert service_sdk.config.keep_alive
+        assert service_sdk.config.user_agent.count(USER_AGENT) == 1
+
+    def test_sdk_client_connections_shared(self, pools, fixture_cmd, mocked_response):
+        from azext_iot._factory import SdkResolver
+        from azext_iot.common.shared import SdkType
+
+        mocked_response.add(
+            method=responses.GET,
+            url="https://{}/devices/d0".format(mock_target["entity"]),
+            body=json.dumps({"deviceId": "d0"}),
+            status=200,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        target = dict(mock_target, cmd=fixture_cmd)
+        endpoint = "https://{}".format(mock_target["entity"])
+        host_pool = pools.get().connection_from_url(endpoint)
+        adapters = []
+        for retries in range(3):
+            service_sdk = SdkResolver(target=target).get_sdk(SdkType.service_sdk)
+            service_sdk.config.retry_policy.retries = retries
+            service_sdk.devices.get_identity(id="d0")
+            service_sdk.close()
+            session = service_sdk.config.pipeline._sender.driver.session
+            adapters.append(session.get_adapter(endpoint))
+
+        assert len(set(id(adapter) for adapter in adapters)) == 3
+        assert all(adapter.poolmanager is pools.get() for adapter in adapters)
+        assert [adapter.max_retries.total for adapter in adapters] == [0, 1, 2]
+        assert adapters[0]._pool_maxsize == 32
+        # closing a client keeps the shared pools
+        assert pools.get().connection_from_url(endpoint) is host_pool
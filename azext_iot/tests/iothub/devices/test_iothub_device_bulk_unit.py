@@ -0,0 +1,303 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+import pytest
+import responses
+from knack.util import CLIError
+from azext_iot.iothub import commands_device_identity as subject
+from azext_iot.tests.conftest import mock_target
+
+bulk_url = "https://{}/devices".format(mock_target["entity"])
+authentication = {"type": "sas", "symmetricKey": {"primaryKey": "p", "secondaryKey": "s"}}
+path_sleep = "azext_iot.iothub.providers.device_identity.sleep"
+
+
+def write_input(tmp_path, lines):
+    input_path = tmp_path / "devices.jsonl"
+    input_path.write_text("\n".join(lines) + "\n")
+    return str(input_path)
+
+
+def read_results(result_path):
+    with open(result_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TestDeviceBulk:
+    @pytest.fixture()
+    def bulk_service(self, mocked_response, fixture_ghcs):
+        requests = []
+        lock = threading.Lock()
+
+        def callback(request):
+            body = json.loads(request.body)
+            with lock:
+                requests.append(body)
+            errors = [
+                {
+                    "deviceId": device["id"],
+                    "errorCode": "DeviceAlreadyExists",
+                    "errorStatus": "A device with ID '{}' is already registered.".format(device["id"]),
+                }
+                for device in body
+                if device["id"].startswith("existing")
+            ]
+            return (
+                400 if errors else 200,
+                {"Content-Type": "application/json"},
+                json.dumps({"isSuccessful": not errors, "errors": errors, "warnings": []}),
+            )
+
+        mocked_response.add_callback(
+            method=responses.POST,
+            url=bulk_url,
+            callback=callback,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        mocked_response.requests = requests
+        yield mocked_response
+
+    @pytest.mark.parametrize("count, batch_size, expected_requests", [(250, 100, 3), (10, 3, 4), (1, 100, 1)])
+    def test_bulk_create(self, fixture_cmd, bulk_service, tmp_path, count, batch_size, expected_requests):
+        lines = [json.dumps({"deviceId": "device{}".format(i), "capabilities": {"iotEdge": i % 2 == 0}}) for i in range(count)]
+        input_path = write_input(tmp_path, lines)
+
+        result = subject.iot_device_bulk_create(
+            cmd=fixture_cmd,
+            input_path=input_path,
+            batch_size=batch_size,
+            concurrency=3,
+            hub_name=mock_target["entity"],
+        )
+
+        assert result["total"] == count
+        assert result["succeeded"] == count
+        assert result["failed"] == 0
+        assert result["resultFile"] == input_path + ".result.jsonl"
+        assert len(bulk_service.requests) == expected_requests
+
+        sent = [device for body in bulk_service.requests for device in body]
+        assert sorted(device["id"] for device in sent) == sorted("device{}".format(i) for i in range(count))
+        for device in sent:
+            assert device["importMode"] == "create"
+            assert device["capabilities"]["iotEdge"] == (int(device["id"][6:]) % 2 == 0)
+
+        results = read_results(result["resultFile"])
+        assert len(results) == count
+        assert all(r["succeeded"] and r["operation"] == "create" for r in results)
+
+    def test_bulk_create_partial_failure(self, fixture_cmd, bulk_service, tmp_path):
+        lines = ["device0", "existing1", "", "{not json", '{"status": "enabled"}', "device2"]
+        input_path = write_input(tmp_path, lines)
+        result_path = str(tmp_path / "results.jsonl")
+
+        result = subject.iot_device_bulk_create(
+            cmd=fixture_cmd,
+            input_path=input_path,
+            result_path=result_path,
+            hub_name=mock_target["entity"],
+        )
+
+        assert result["total"] == 5
+        assert result["succeeded"] == 2
+        assert result["failed"] == 3
+
+        results = read_results(result_path)
+        by_device = {r["deviceId"]: r for r in results if r["deviceId"]}
+        assert by_device["device0"]["succeeded"]
+        assert by_device["device2"]["succeeded"]
+        assert not by_device["existing1"]["succeeded"]
+        assert by_device["existing1"]["errorCode"] == "DeviceAlreadyExists"
+
+        invalid = [r for r in results if not r["deviceId"]]
+        assert len(invalid) == 2
+        assert invalid[0]["errorStatus"].startswith("Line 4")
+        assert invalid[1]["errorStatus"].startswith("Line 5")
+
+    def test_bulk_create_request_rejected(self, fixture_cmd, mocked_response, fixture_ghcs, tmp_path):
+        message = "ErrorCode:ArgumentInvalid;Invalid request."
+        mocked_response.add(
+            method=responses.POST,
+            url=bulk_url,
+            body=json.dumps({"Message": message}),
+            status=400,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        input_path = write_input(tmp_path, ["device0", "device1"])
+
+        result = subject.iot_device_bulk_create(
+            cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+        )
+
+        assert result["succeeded"] == 0
+        assert result["failed"] == 2
+        results = read_results(result["resultFile"])
+        assert [r["deviceId"] for r in results] == ["device0", "device1"]
+        assert all(r["errorStatus"] == {"Message": message} for r in results)
+
+    def test_bulk_update_delete_etag(self, fixture_cmd, bulk_service, tmp_path):
+        lines = [
+            json.dumps({"deviceId": "device0", "etag": "AAAA", "status": "disabled", "authentication": authentication}),
+            json.dumps({"deviceId": "device1", "status": "disabled", "authentication": authentication}),
+        ]
+        input_path = write_input(tmp_path, lines)
+
+        subject.iot_device_bulk_update(
+            cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+        )
+        subject.iot_device_bulk_delete(
+            cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+        )
+
+        update, delete = bulk_service.requests
+        assert update[0]["importMode"] == "updateIfMatchETag"
+        assert update[0]["eTag"] == "AAAA"
+        assert update[0]["status"] == "disabled"
+        assert update[1]["importMode"] == "update"
+        assert "eTag" not in update[1]
+        assert update[1]["authentication"]["symmetricKey"]["primaryKey"] == "p"
+        assert delete[0]["importMode"] == "deleteIfMatchETag"
+        assert delete[1]["importMode"] == "delete"
+
+    def test_bulk_update_requires_authentication(self, fixture_cmd, bulk_service, tmp_path):
+        input_path = write_input(
+            tmp_path,
+            ["device0", json.dumps({"deviceId": "device1", "status": "disabled"})],
+        )
+
+        result = subject.iot_device_bulk_update(
+            cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+        )
+
+        assert result["failed"] == 2
+        assert not bulk_service.requests
+        bulk_service.assert_all_requests_are_fired = False
+        assert all("authentication" in r["errorStatus"] for r in read_results(result["resultFile"]))
+
+    @pytest.mark.parametrize(
+        "operation, statuses, expected_calls, succeeded",
+        [
+            ("create", [429, 200], 2, 2),
+            ("create", [503, 200], 1, 0),
+            ("update", [503, 500, 200], 3, 2),
+            ("delete", [502, 200], 2, 2),
+        ],
+    )
+    def test_bulk_server_error_retry(
+        self, fixture_cmd, mocked_response, fixture_ghcs, mocker, tmp_path, operation, statuses, expected_calls, succeeded
+    ):
+        mocker.patch(path_sleep)
+        responses_iter = iter(
+            [(status, {}, json.dumps({"isSuccessful": True, "errors": [], "warnings": []})) for status in statuses]
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url=bulk_url,
+            callback=lambda _: next(responses_iter),
+            content_type="application/json",
+            match_querystring=False,
+        )
+        input_path = write_input(
+            tmp_path,
+            [json.dumps({"deviceId": "device{}".format(i), "authentication": authentication}) for i in range(2)],
+        )
+
+        result = getattr(subject, "iot_device_bulk_{}".format(operation))(
+            cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+        )
+
+        assert len(mocked_response.calls) == expected_calls
+        assert result["succeeded"] == succeeded
+
+    def test_bulk_throttled_retry(self, fixture_cmd, mocked_response, fixture_ghcs, mocker, tmp_path):
+        sleep = mocker.patch(path_sleep)
+        responses_iter = iter(
+            [
+                (429, {"Retry-After": "2"}, json.dumps({"Message": "throttled"})),
+                (429, {}, json.dumps({"Message": "throttled"})),
+                (200, {}, json.dumps({"isSuccessful": True, "errors": [], "warnings": []})),
+            ]
+        )
+        mocked_response.add_callback(
+            method=responses.POST,
+            url=bulk_url,
+            callback=lambda _: next(responses_iter),
+            content_type="application/json",
+            match_querystring=False,
+        )
+        input_path = write_input(tmp_path, ["device0", "device1"])
+
+        result = subject.iot_device_bulk_create(
+            cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+        )
+
+        assert result["succeeded"] == 2
+        assert len(mocked_response.calls) == 3
+        assert sleep.call_count == 2
+        assert sleep.call_args_list[0][0][0] == 2
+
+    def test_bulk_retries_exhausted(self, fixture_cmd, mocked_response, fixture_ghcs, mocker, tmp_path):
+        mocker.patch(path_sleep)
+        mocked_response.add(
+            method=responses.POST,
+            url=bulk_url,
+            body=json.dumps({"Message": "throttled"}),
+            status=429,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        input_path = write_input(tmp_path, ["device0", "device1"])
+
+        result = subject.iot_device_bulk_create(
+            cmd=fixture_cmd, input_path=input_path, max_retries=2, hub_name=mock_target["entity"]
+        )
+
+        assert result["failed"] == 2
+        assert len(mocked_response.calls) == 3
+        assert all(not r["succeeded"] for r in read_results(result["resultFile"]))
+
+    def test_bulk_unauthorized(self, fixture_cmd, mocked_response, fixture_ghcs, tmp_path):
+        mocked_response.add(
+            method=responses.POST,
+            url=bulk_url,
+            body=json.dumps({"Message": "unauthorized"}),
+            status=401,
+            content_type="application/json",
+            match_querystring=False,
+        )
+        input_path = write_input(tmp_path, ["device0"])
+
+        with pytest.raises(CLIError):
+            subject.iot_device_bulk_delete(
+                cmd=fixture_cmd, input_path=input_path, hub_name=mock_target["entity"]
+            )
+
+    @pytest.mark.parametrize(
+        "batch_size, concurrency, max_retries", [(0, 4, 5), (101, 4, 5), (100, 0, 5), (100, 4, -1)]
+    )
+    def test_bulk_invalid_args(self, fixture_cmd, fixture_ghcs, tmp_path, batch_size, concurrency, max_retries):
+        input_path = write_input(tmp_path, ["device0"])
+        with pytest.raises(CLIError):
+            subject.iot_device_bulk_create(
+                cmd=fixture_cmd,
+                input_path=input_path,
+                batch_size=batch_size,
+                concurrency=concurrency,
+                max_retries=max_retries,
+                hub_name=mock_target["entity"],
+            )
+
+    def test_bulk_missing_input(self, fixture_cmd, fixture_ghcs, tmp_path):
+        with pytest.raises(CLIError):
+            subject.iot_device_bulk_create(
+                cmd=fixture_cmd,
+                input_path=str(tmp_path / "missing.jsonl"),
+                hub_name=mock_target["entity"],
+            )
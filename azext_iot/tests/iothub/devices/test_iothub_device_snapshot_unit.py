@@ -0,0 +1,301 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import gzip
+import json
+import re
+import pytest
+import responses
+from urllib.parse import unquote
+from knack.util import CLIError
+from azext_iot.iothub import commands_device_identity as subject
+from azext_iot.iothub.providers.registry_snapshot import build_snapshot_record
+from azext_iot.tests.conftest import mock_target
+
+hub = mock_target["entity"]
+query_url = "https://{}/devices/query".format(hub)
+identity_url = re.compile(r"https://{}/devices/([^/?]+)(/modules)?\?".format(hub))
+module_twin_url = re.compile(r"https://{}/twins/([^/?]+)/modules/([^/?]+)\?".format(hub))
+path_sleep = "azext_iot.iothub.providers.base.sleep"
+
+
+def generate_device(device_id, modules=None, desired=None):
+    return {
+        "identity": {
+            "deviceId": device_id,
+            "etag": "etag-{}".format(device_id),
+            "status": "enabled",
+            "connectionState": "Disconnected",
+            "authentication": {
+                "type": "sas",
+                "symmetricKey": {"primaryKey": "p-{}".format(device_id), "secondaryKey": "s"},
+            },
+            "capabilities": {"iotEdge": bool(modules)},
+        },
+        "twin": {
+            "deviceId": device_id,
+            "etag": "twin-etag",
+            "tags": {"site": "plant1"},
+            "properties": {
+                "desired": dict(desired or {}, **{"$version": 4, "$metadata": {}}),
+                "reported": {"$version": 1},
+            },
+        },
+        "modules": [
+            {
+                "identity": {"deviceId": device_id, "moduleId": module_id, "etag": "e"},
+                "twin": {"deviceId": device_id, "moduleId": module_id, "properties": {"desired": {}}},
+            }
+            for module_id in modules or []
+        ],
+    }
+
+
+def write_snapshot(path, devices):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"snapshot": {"version": 1, "hub": hub}}) + "\n")
+        for device in devices:
+            record = build_snapshot_record(
+                device["identity"],
+                device["twin"],
+                [
+                    {"moduleId": module["identity"]["moduleId"], **module}
+                    for module in device["modules"]
+                ],
+            )
+            f.write(json.dumps(record) + "\n")
+    return str(path)
+
+
+def read_lines(capsys):
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+
+class TestDeviceSnapshot:
+    @pytest.fixture()
+    def service(self, mocked_response, fixture_ghcs):
+        devices = {}
+        for i in range(15):
+            device_id = "device{}".format(i)
+            devices[device_id] = generate_device(
+                device_id, modules=["$edgeAgent", "sensor"] if i % 5 == 0 else None
+            )
+        mocked_response.hub_devices = devices
+        mocked_response.status = {}
+        mocked_response.query_status = []
+
+        def query_callback(request):
+            query = json.loads(request.body)["query"]
+            if query.startswith("select * from devices.modules"):
+                ids = re.findall(r"'([^']+)'", query)
+                twins = [
+                    module["twin"]
+                    for device_id in ids
+                    if device_id in devices
+                    for module in devices[device_id]["modules"]
+                ]
+                return (200, {}, json.dumps(twins))
+            if mocked_response.query_status:
+                return (mocked_response.query_status.pop(0), {}, json.dumps({"Message": "error"}))
+            continuation = request.headers.get("x-ms-continuation")
+            start = int(continuation) if continuation else 0
+            ids = list(devices)
+            headers = {}
+            if start + 4 < len(ids):
+                headers["x-ms-continuation"] = str(start + 4)
+            return (200, headers, json.dumps([devices[d]["twin"] for d in ids[start:start + 4]]))
+
+        def identity_callback(request):
+            match = identity_url.match(request.url)
+            device_id = unquote(match.group(1))
+            statuses = mocked_response.status.get(device_id)
+            if statuses:
+                return (statuses.pop(0), {}, json.dumps({"Message": "error"}))
+            device = devices.get(device_id)
+            if not device:
+                return (404, {}, json.dumps({"Message": "not found"}))
+            if match.group(2):
+                return (200, {}, json.dumps([module["identity"] for module in device["modules"]]))
+            return (200, {}, json.dumps(device["identity"]))
+
+        def module_twin_callback(request):
+            device_id, module_id = [unquote(v) for v in module_twin_url.match(request.url).groups()]
+            for module in devices[device_id]["modules"]:
+                if module["identity"]["moduleId"] == module_id:
+                    return (200, {}, json.dumps(module["twin"]))
+            return (404, {}, json.dumps({"Message": "not found"}))
+
+        for method, url, callback in [
+            (responses.POST, query_url, query_callback),
+            (responses.GET, identity_url, identity_callback),
+            (responses.GET, module_twin_url, module_twin_callback),
+        ]:
+            mocked_response.add_callback(
+                method=method,
+                url=url,
+                callback=callback,
+                content_type="application/json",
+                match_querystring=False,
+            )
+        mocked_response.assert_all_requests_are_fired = False
+        yield mocked_response
+
+    def test_snapshot_create(self, fixture_cmd, service, tmp_path, mocker):
+        sleep = mocker.patch(path_sleep)
+        service.status["device3"] = [429]
+        snapshot_file = str(tmp_path / "registry.jsonl.gz")
+
+        result = subject.iot_device_snapshot_create(
+            cmd=fixture_cmd, snapshot_file=snapshot_file, concurrency=3, hub_name=hub
+        )
+
+        assert result["devices"] == 15
+        assert result["modules"] == 6
+        assert result["snapshotFile"] == snapshot_file
+        assert sleep.call_count == 1
+
+        with gzip.open(snapshot_file, "rt") as f:
+            header = json.loads(f.readline())
+            records = {record["deviceId"]: record for record in map(json.loads, f)}
+        assert header["snapshot"]["version"] == 1
+        assert header["snapshot"]["hub"] == hub
+        assert sorted(records) == sorted(service.hub_devices)
+
+        record = records["device5"]
+        assert record["identity"]["authentication"]["symmetricKey"]["primaryKey"] == "p-device5"
+        assert record["twin"]["tags"] == {"site": "plant1"}
+        assert [m["moduleId"] for m in record["modules"]] == ["$edgeAgent", "sensor"]
+        assert set(record["hashes"]) == {"identity", "twin", "modules"}
+        assert records["device1"]["modules"] == []
+
+    def test_snapshot_create_query_retry(self, fixture_cmd, service, tmp_path, mocker):
+        sleep = mocker.patch(path_sleep)
+        service.query_status.extend([429, 503])
+        snapshot_file = str(tmp_path / "registry.jsonl.gz")
+
+        result = subject.iot_device_snapshot_create(
+            cmd=fixture_cmd, snapshot_file=snapshot_file, concurrency=1, hub_name=hub
+        )
+
+        assert result["devices"] == 15
+        assert sleep.call_count == 2
+
+    def test_snapshot_create_quoted_id(self, fixture_cmd, service, tmp_path):
+        service.hub_devices["o'brien"] = generate_device("o'brien", modules=["sensor"])
+        snapshot_file = str(tmp_path / "registry.jsonl.gz")
+
+        subject.iot_device_snapshot_create(cmd=fixture_cmd, snapshot_file=snapshot_file, hub_name=hub)
+
+        with gzip.open(snapshot_file, "rt") as f:
+            f.readline()
+            records = {record["deviceId"]: record for record in map(json.loads, f)}
+        assert [m["moduleId"] for m in records["o'brien"]["modules"]] == ["sensor"]
+        assert records["o'brien"]["modules"][0]["twin"]["moduleId"] == "sensor"
+
+    def test_snapshot_create_unauthorized(self, fixture_cmd, service, tmp_path):
+        service.status["device2"] = [401]
+        snapshot_file = tmp_path / "registry.jsonl.gz"
+        snapshot_file.write_bytes(b"previous")
+        with pytest.raises(CLIError):
+            subject.iot_device_snapshot_create(
+                cmd=fixture_cmd, snapshot_file=str(snapshot_file), hub_name=hub
+            )
+
+        # an interrupted snapshot does not replace the file
+        assert snapshot_file.read_bytes() == b"previous"
+        assert [path.name for path in tmp_path.iterdir()] == ["registry.jsonl.gz"]
+
+    def test_snapshot_diff_files(self, fixture_cmd, tmp_path, capsys):
+        before = [generate_device("device{}".format(i), modules=["m"] if i == 2 else None) for i in range(6)]
+        after = [generate_device("device{}".format(i), modules=["m"] if i == 2 else None) for i in range(1, 7)]
+        # only volatile properties changed
+        after[0]["identity"]["connectionState"] = "Connected"
+        after[0]["identity"]["etag"] = "new-etag"
+        after[0]["twin"]["properties"]["reported"]["temperature"] = 21
+        after[1]["modules"] = []
+        after[2]["twin"]["properties"]["desired"]["interval"] = 30
+        after[3]["identity"]["status"] = "disabled"
+
+        subject.iot_device_snapshot_diff(
+            cmd=fixture_cmd,
+            snapshot_file=write_snapshot(tmp_path / "before.jsonl.gz", before),
+            compare_file=write_snapshot(tmp_path / "after.jsonl.gz", after),
+        )
+
+        differences, summary = read_lines(capsys)
+        by_device = {d["deviceId"]: d for d in differences}
+        assert by_device == {
+            "device0": {"deviceId": "device0", "change": "removed"},
+            "device6": {"deviceId": "device6", "change": "added"},
+            "device2": {"deviceId": "device2", "change": "changed", "sections": ["modules"]},
+            "device3": {"deviceId": "device3", "change": "changed", "sections": ["twin"]},
+            "device4": {"deviceId": "device4", "change": "changed", "sections": ["identity"]},
+        }
+        assert summary == {"added": 1, "removed": 1, "changed": 3, "unchanged": 2}
+
+    def test_snapshot_diff_scopes(self, fixture_cmd, tmp_path, capsys):
+        before = [generate_device("edge-1", modules=["m"]), generate_device("leaf"), generate_device("moved")]
+        before[0]["identity"]["deviceScope"] = "ms-azure-iot-edge://edge-1-637000000000000001"
+        for device in before[1:]:
+            device["identity"]["parentScopes"] = ["ms-azure-iot-edge://edge-1-637000000000000001"]
+        after = json.loads(json.dumps(before))
+        # the edge device was recreated with a new generation id
+        after[0]["identity"]["deviceScope"] = "ms-azure-iot-edge://edge-1-637000000000000002"
+        after[1]["identity"]["parentScopes"] = ["ms-azure-iot-edge://edge-1-637000000000000002"]
+        after[2]["identity"]["parentScopes"] = ["ms-azure-iot-edge://edge-2-637000000000000003"]
+
+        subject.iot_device_snapshot_diff(
+            cmd=fixture_cmd,
+            snapshot_file=write_snapshot(tmp_path / "before.jsonl.gz", before),
+            compare_file=write_snapshot(tmp_path / "after.jsonl.gz", after),
+        )
+
+        differences, summary = read_lines(capsys)
+        assert differences == [
+            {"deviceId": "moved", "change": "changed", "sections": ["identity"]}
+        ]
+        assert summary == {"added": 0, "removed": 0, "changed": 1, "unchanged": 2}
+
+    def test_snapshot_diff_live(self, fixture_cmd, service, tmp_path, capsys):
+        snapshot = [service.hub_devices["device{}".format(i)] for i in range(14)]
+        snapshot.append(generate_device("retired"))
+        snapshot_file = write_snapshot(tmp_path / "registry.jsonl.gz", snapshot)
+        service.hub_devices["device7"]["twin"]["tags"]["site"] = "plant2"
+
+        subject.iot_device_snapshot_diff(cmd=fixture_cmd, snapshot_file=snapshot_file, hub_name=hub)
+
+        differences, summary = read_lines(capsys)
+        assert sorted(differences, key=lambda d: d["deviceId"]) == [
+            {"deviceId": "device14", "change": "added"},
+            {"deviceId": "device7", "change": "changed", "sections": ["twin"]},
+            {"deviceId": "retired", "change": "removed"},
+        ]
+        assert summary == {"added": 1, "removed": 1, "changed": 1, "unchanged": 13}
+
+    def test_snapshot_diff_invalid_file(self, fixture_cmd, tmp_path):
+        not_snapshot = tmp_path / "other.jsonl.gz"
+        with gzip.open(str(not_snapshot), "wt") as f:
+            f.write('{"deviceId": "device0"}\n')
+        not_gzip = tmp_path / "plain.jsonl"
+        not_gzip.write_text('{"snapshot": {"version": 1}}\n')
+
+        for snapshot_file in [str(not_snapshot), str(not_gzip), str(tmp_path / "missing.gz")]:
+            with pytest.raises(CLIError):
+                subject.iot_device_snapshot_diff(
+                    cmd=fixture_cmd,
+                    snapshot_file=snapshot_file,
+                    compare_file=str(not_snapshot),
+                )
+
+    def test_snapshot_invalid_concurrency(self, fixture_cmd, fixture_ghcs, tmp_path):
+        with pytest.raises(CLIError):
+            subject.iot_device_snapshot_create(
+                cmd=fixture_cmd,
+                snapshot_file=str(tmp_path / "registry.jsonl.gz"),
+                concurrency=0,
+                hub_name=hub,
+            )
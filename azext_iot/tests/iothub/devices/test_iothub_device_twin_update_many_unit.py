@@ -0,0 +1,195 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import re
+import threading
+import pytest
+import responses
+from knack.util import CLIError
+from azext_iot.iothub import commands_device_twin as subject
+from azext_iot.tests.conftest import mock_target
+
+query_url = "https://{}/devices/query".format(mock_target["entity"])
+twin_url = re.compile(r"https://{}/twins/([^?/]+)".format(mock_target["entity"]))
+path_sleep = "azext_iot.iothub.providers.device_twin.sleep"
+desired = '{"firmware": {"version": "2.1.0"}}'
+
+
+class TestDeviceTwinUpdateMany:
+    @pytest.fixture()
+    def service(self, mocked_response, fixture_ghcs):
+        mocked_response.devices = ["device{}".format(i) for i in range(25)]
+        mocked_response.queries = []
+        mocked_response.patches = {}
+        mocked_response.status = {}
+        lock = threading.Lock()
+
+        def query_callback(request):
+            mocked_response.queries.append(json.loads(request.body)["query"])
+            continuation = request.headers.get("x-ms-continuation")
+            start = int(continuation) if continuation else 0
+            page = mocked_response.devices[start:start + 10]
+            headers = {"Content-Type": "application/json"}
+            if start + 10 < len(mocked_response.devices):
+                headers["x-ms-continuation"] = str(start + 10)
+            twins = [{"deviceId": d, "etag": "etag-{}".format(d)} for d in page]
+            return (200, headers, json.dumps(twins))
+
+        def twin_callback(request):
+            device_id = twin_url.match(request.url).group(1)
+            with lock:
+                statuses = mocked_response.status.get(device_id)
+                status = statuses.pop(0) if statuses else 200
+                if status == 200:
+                    mocked_response.patches[device_id] = (
+                        json.loads(request.body),
+                        request.headers["If-Match"],
+                    )
+            return (status, {"Content-Type": "application/json"}, json.dumps({"deviceId": device_id}))
+
+        mocked_response.add_callback(
+            method=responses.POST, url=query_url, callback=query_callback, match_querystring=False
+        )
+        mocked_response.add_callback(
+            method=responses.PATCH, url=twin_url, callback=twin_callback, match_querystring=False
+        )
+        yield mocked_response
+
+    @pytest.mark.parametrize(
+        "condition, expected_query",
+        [
+            ("tags.cohort = 'canary'", "select deviceId, etag from devices where tags.cohort = 'canary'"),
+            ("WHERE tags.cohort = 'canary'", "select deviceId, etag from devices where tags.cohort = 'canary'"),
+            ("*", "select deviceId, etag from devices"),
+        ],
+    )
+    def test_update_many(self, fixture_cmd, service, condition, expected_query):
+        result = subject.iot_device_twin_update_many(
+            cmd=fixture_cmd,
+            query_condition=condition,
+            desired=desired,
+            tags='{"ring": "2"}',
+            concurrency=4,
+            hub_name=mock_target["entity"],
+        )
+
+        assert service.queries == [expected_query] * 3
+        assert result["matched"] == 25
+        assert result["updated"] == 25
+        assert result["failed"] == 0
+        assert result["skipped"] == 0
+        assert result["twinsPerSecond"] > 0
+        assert sorted(service.patches) == sorted(service.devices)
+        for patch, if_match in service.patches.values():
+            assert patch == {"properties": {"desired": json.loads(desired)}, "tags": {"ring": "2"}}
+            assert if_match == '"*"'
+
+    def test_update_many_match_etag(self, fixture_cmd, service):
+        service.status["device3"] = [412]
+        result = subject.iot_device_twin_update_many(
+            cmd=fixture_cmd,
+            query_condition="*",
+            desired=desired,
+            match_etag=True,
+            hub_name=mock_target["entity"],
+        )
+
+        assert result["updated"] == 24
+        assert result["failures"] == [
+            {"deviceId": "device3", "error": "Twin etag changed since it was queried."}
+        ]
+        for device_id, (_, if_match) in service.patches.items():
+            assert if_match == '"etag-{}"'.format(device_id)
+
+    def test_update_many_throttled(self, fixture_cmd, service, mocker):
+        sleep = mocker.patch(path_sleep)
+        service.status["device1"] = [429, 503]
+        service.status["device2"] = [429] * 3
+        result = subject.iot_device_twin_update_many(
+            cmd=fixture_cmd,
+            query_condition="*",
+            tags='{"ring": "2"}',
+            max_retries=2,
+            hub_name=mock_target["entity"],
+        )
+
+        assert result["updated"] == 24
+        assert "device1" in service.patches
+        assert [f["deviceId"] for f in result["failures"]] == ["device2"]
+        assert sleep.call_count == 4
+
+    def test_update_many_checkpoint_resume(self, fixture_cmd, service, tmp_path):
+        checkpoint_file = str(tmp_path / "update.checkpoint")
+        service.status["device5"] = [500]
+        first = subject.iot_device_twin_update_many(
+            cmd=fixture_cmd,
+            query_condition="*",
+            desired=desired,
+            max_retries=0,
+            checkpoint_file=checkpoint_file,
+            hub_name=mock_target["entity"],
+        )
+        assert first["updated"] == 24
+        assert first["failed"] == 1
+        assert first["checkpointFile"] == checkpoint_file
+
+        service.patches.clear()
+        second = subject.iot_device_twin_update_many(
+            cmd=fixture_cmd,
+            query_condition="*",
+            desired=desired,
+            checkpoint_file=checkpoint_file,
+            hub_name=mock_target["entity"],
+        )
+        assert second["skipped"] == 24
+        assert second["updated"] == 1
+        assert list(service.patches) == ["device5"]
+
+        # a checkpoint cannot be resumed with a different patch
+        with pytest.raises(CLIError):
+            subject.iot_device_twin_update_many(
+                cmd=fixture_cmd,
+                query_condition="*",
+                tags='{"ring": "3"}',
+                checkpoint_file=checkpoint_file,
+                hub_name=mock_target["entity"],
+            )
+
+    def test_update_many_unauthorized(self, fixture_cmd, service):
+        service.status["device0"] = [401]
+        with pytest.raises(CLIError):
+            subject.iot_device_twin_update_many(
+                cmd=fixture_cmd,
+                query_condition="*",
+                desired=desired,
+                concurrency=1,
+                hub_name=mock_target["entity"],
+            )
+        service.assert_all_requests_are_fired = False
+
+    @pytest.mark.parametrize(
+        "query_condition, desired, tags, concurrency, max_retries",
+        [
+            (None, desired, None, 8, 5),
+            ("*", None, None, 8, 5),
+            ("*", desired, None, 0, 5),
+            ("*", desired, None, 8, -1),
+        ],
+    )
+    def test_update_many_invalid_args(
+        self, fixture_cmd, fixture_ghcs, query_condition, desired, tags, concurrency, max_retries
+    ):
+        with pytest.raises(CLIError):
+            subject.iot_device_twin_update_many(
+                cmd=fixture_cmd,
+                query_condition=query_condition,
+                desired=desired,
+                tags=tags,
+                concurrency=concurrency,
+                max_retries=max_retries,
+                hub_name=mock_target["entity"],
+            )
@@ -20,6 +20,7 @@ from azext_iot.common.utility import (
     logger,
     ensure_iothub_sdk_min_version,
     ensure_iotdps_sdk_min_version,
+    init_receive_settings,
 )
 from azext_iot.common.deps import ensure_uamqp
 from azext_iot.constants import EVENT_LIB, EXTENSION_NAME
@@ -475,3 +476,27 @@ class TestHandleServiceException(object):
 
         with pytest.raises(expected_error):
             handle_service_exception(error)
+
+
+class TestInitReceiveSettings(object):
+    @pytest.mark.parametrize(
+        "prefetch, batch_size, expected",
+        [
+            (None, None, (0, None)),
+            (300, None, (300, None)),
+            (None, 100, (100, 100)),
+            (500, 100, (500, 100)),
+            (100, 100, (100, 100)),
+        ],
+    )
+    def test_init_receive_settings(self, prefetch, batch_size, expected):
+        assert init_receive_settings(prefetch, batch_size) == expected
+
+    @pytest.mark.parametrize(
+        "prefetch, batch_size", [(-1, None), (None, 0), (None, -5), (50, 100), (0, 1)]
+    )
+    def test_init_receive_settings_invalid(self, prefetch, batch_size):
+        from azure.cli.core.azclierror import InvalidArgumentValueError
+
+        with pytest.raises(InvalidArgumentValueError):
+            init_receive_settings(prefetch, batch_size)
@@ -0,0 +1,176 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import io
+import json
+import os
+import pytest
+
+from uamqp.message import Message
+from azext_iot.monitor import telemetry
+from azext_iot.monitor.checkpoint import (
+    CheckpointStore,
+    OFFSET_IDENTIFIER,
+    SEQUENCE_NUMBER_IDENTIFIER,
+)
+from azext_iot.monitor.handlers import CommonHandler
+from azext_iot.monitor.models.arguments import (
+    CommonHandlerArguments,
+    CommonParserArguments,
+)
+from azext_iot.monitor.models.target import Target
+from azext_iot.monitor.pipeline import EventPipeline
+from azext_iot.monitor.sinks import StreamSink
+
+
+def _create_target(consumer_group="$Default"):
+    target = Target(
+        hostname="myhub.servicebus.windows.net", path="myhub", partitions=["0", "1"], auth=None
+    )
+    target.add_consumer_group(consumer_group)
+    return target
+
+
+def _create_message(offset, sequence_number):
+    return Message(
+        body=b"{}",
+        annotations={
+            OFFSET_IDENTIFIER: str(offset).encode(),
+            SEQUENCE_NUMBER_IDENTIFIER: sequence_number,
+        },
+    )
+
+
+class TestCheckpointStore:
+    def test_checkpoint_roundtrip(self, tmp_path):
+        target = _create_target()
+        store = CheckpointStore(str(tmp_path))
+        assert store.get_offset(target, "0") is None
+
+        store.update(target, "0", _create_message(100, 1))
+        store.update(target, "0", _create_message(200, 2))
+        store.update(target, "1", _create_message(300, 3))
+        store.flush()
+
+        resumed = CheckpointStore(str(tmp_path))
+        assert resumed.get_offset(target, "0") == "200"
+        assert resumed.get_offset(target, "1") == "300"
+        assert resumed.get_offset(_create_target("other"), "0") is None
+
+        partition_dir = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+        with open(os.path.join(partition_dir, "0.json")) as f:
+            checkpoint = json.load(f)
+        assert checkpoint["sequence_number"] == 2
+        assert checkpoint["consumer_group"] == "$Default"
+
+    def test_checkpoint_ignores_unreadable_file(self, tmp_path):
+        target = _create_target()
+        store = CheckpointStore(str(tmp_path))
+        store.update(target, "0", _create_message(100, 1))
+        store.flush()
+
+        partition_dir = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+        with open(os.path.join(partition_dir, "0.json"), "w") as f:
+            f.write("not json")
+
+        assert CheckpointStore(str(tmp_path)).get_offset(target, "0") is None
+
+    def test_checkpoint_message_without_offset(self, tmp_path):
+        target = _create_target()
+        store = CheckpointStore(str(tmp_path))
+        store.update(target, "0", Message(body=b"{}"))
+        store.flush()
+
+        assert not os.listdir(str(tmp_path))
+
+
+class TestMonitorEventsCheckpoint:
+    @pytest.fixture
+    def source(self, mocker):
+        client = mocker.MagicMock(name="receive_client")
+        client.open_async = mocker.AsyncMock()
+        client.close_async = mocker.AsyncMock()
+        client.receive_message_batch_async = mocker.AsyncMock(
+            side_effect=[[_create_message(10, 1), _create_message(20, 2)], []]
+        )
+        mocker.patch.object(telemetry.uamqp, "ReceiveClientAsync", return_value=client)
+        return mocker.patch.object(telemetry.uamqp.address, "Source")
+
+    def _monitor(self, target, checkpoint_store):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(
+                telemetry._monitor_events(
+                    target=target,
+                    connection=None,
+                    partition="0",
+                    enqueued_time_utc=12345,
+                    on_message_received=lambda msg: None,
+                    batch_size=5,
+                    prefetch=5,
+                    checkpoint_store=checkpoint_store,
+                )
+            )
+        finally:
+            loop.close()
+
+    def test_monitor_events_resumes_from_checkpoint(self, tmp_path, source):
+        target = _create_target()
+        store = CheckpointStore(str(tmp_path))
+
+        self._monitor(target, store)
+        source.return_value.set_filter.assert_called_once_with(
+            b"amqp.annotation.x-opt-enqueuedtimeutc > 12345"
+        )
+        assert store.get_offset(target, "0") == "20"
+        store.flush()
+
+        source.reset_mock()
+        source.return_value.set_filter.reset_mock()
+        telemetry.uamqp.ReceiveClientAsync.return_value.receive_message_batch_async.side_effect = [[]]
+
+        self._monitor(target, CheckpointStore(str(tmp_path)))
+        source.return_value.set_filter.assert_called_once_with(
+            b"amqp.annotation.x-opt-offset > '20'"
+        )
+
+    def test_monitor_events_pipeline_checkpoints_written_events(self, tmp_path, source, mocker):
+        target = _create_target()
+        store = CheckpointStore(str(tmp_path))
+        handler = CommonHandler(
+            CommonHandlerArguments(
+                output="json", common_parser_args=CommonParserArguments(), max_messages=1
+            )
+        )
+        pipeline = EventPipeline(handler=handler, sink=StreamSink(io.StringIO()))
+        pipeline.checkpoint_store = store
+        monitor_loop = mocker.MagicMock()
+        monitor_loop.is_closed.return_value = False
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(
+                telemetry._monitor_events(
+                    target=target,
+                    connection=None,
+                    partition="0",
+                    enqueued_time_utc=12345,
+                    on_message_received=lambda msg: None,
+                    batch_size=5,
+                    checkpoint_store=store,
+                    pipeline=pipeline,
+                )
+            )
+            # queued events are not checkpointed before they are written
+            assert store.get_offset(target, "0") is None
+            pipeline.start(monitor_loop)
+        finally:
+            pipeline.stop()
+            loop.close()
+
+        # the second event was dropped once the message count was reached
+        assert store.get_offset(target, "0") == "10"
@@ -0,0 +1,120 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import pytest
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from uamqp.message import Message
+from azext_iot.monitor.filters import MessageFilter, parse_property_filters
+from azext_iot.monitor.parsers.common_parser import (
+    DEVICE_ID_IDENTIFIER,
+    MODULE_ID_IDENTIFIER,
+    INTERFACE_NAME_IDENTIFIER_V1,
+    INTERFACE_NAME_IDENTIFIER_V2,
+)
+
+
+def _create_message(device_id=None, module_id=None, interface=None, app_props=None):
+    annotations = {}
+    if device_id is not None:
+        annotations[DEVICE_ID_IDENTIFIER] = device_id.encode()
+    if module_id is not None:
+        annotations[MODULE_ID_IDENTIFIER] = module_id.encode()
+    if interface is not None:
+        annotations[INTERFACE_NAME_IDENTIFIER_V2] = interface.encode()
+    app_props = {k.encode(): v.encode() for k, v in (app_props or {}).items()}
+    return Message(body=b"{}", annotations=annotations, application_properties=app_props)
+
+
+class TestMessageFilter:
+    @pytest.mark.parametrize(
+        "device_id, actual, expected",
+        [
+            ("", "device1", True),
+            ("device1", "device1", True),
+            ("device1", "device10", False),
+            ("device*", "device10", True),
+            ("dev?ce1", "device1", True),
+            ("dev?ce1", "deviice1", False),
+            ("*1", "device1", True),
+            ("*1", "device12", False),
+            ("device.1", "device11", False),
+            ("device1", None, False),
+        ],
+    )
+    def test_device_filter(self, device_id, actual, expected):
+        message_filter = MessageFilter(device_id=device_id)
+        assert message_filter.matches(_create_message(device_id=actual)) is expected
+
+    def test_device_set_filter(self):
+        message_filter = MessageFilter(devices={"device1": True, "device2": True})
+        assert message_filter.matches(_create_message(device_id="device1"))
+        assert not message_filter.matches(_create_message(device_id="device3"))
+
+        message_filter = MessageFilter(device_id="device*", devices=["device1"])
+        assert message_filter.matches(_create_message(device_id="device1"))
+        assert not message_filter.matches(_create_message(device_id="device2"))
+
+    @pytest.mark.parametrize(
+        "module_id, actual, expected",
+        [
+            ("", None, True),
+            ("module1", "module1", True),
+            ("module*", "module1", True),
+            ("module*", None, False),
+            ("module1", "module2", False),
+        ],
+    )
+    def test_module_filter(self, module_id, actual, expected):
+        message_filter = MessageFilter(module_id=module_id)
+        message = _create_message(device_id="device1", module_id=actual)
+        assert message_filter.matches(message) is expected
+
+    def test_interface_filter(self):
+        interface = "dtmi:com:example:TemperatureController;1"
+        message_filter = MessageFilter(interface_name=interface)
+        assert message_filter.matches(_create_message(interface=interface))
+        assert not message_filter.matches(_create_message(interface="dtmi:other;1"))
+        assert not message_filter.matches(_create_message())
+
+        message = _create_message()
+        message.annotations[INTERFACE_NAME_IDENTIFIER_V1] = interface.encode()
+        assert message_filter.matches(message)
+
+    @pytest.mark.parametrize(
+        "property_filters, app_props, expected",
+        [
+            ({"alert": "true"}, {"alert": "true"}, True),
+            ({"alert": "true"}, {"alert": "false"}, False),
+            ({"alert": "true"}, {}, False),
+            ({"severity": "h*"}, {"severity": "high"}, True),
+            ({"alert": "true", "severity": "h*"}, {"alert": "true", "severity": "low"}, False),
+            ({"empty": ""}, {"empty": ""}, True),
+        ],
+    )
+    def test_property_filter(self, property_filters, app_props, expected):
+        message_filter = MessageFilter(property_filters=property_filters)
+        assert message_filter.matches(_create_message(app_props=app_props)) is expected
+
+    def test_empty_filter(self):
+        message_filter = MessageFilter()
+        assert message_filter.is_empty
+        assert message_filter.matches(_create_message())
+
+
+class TestParsePropertyFilters:
+    def test_parse_property_filters(self):
+        assert parse_property_filters(None) == {}
+        assert parse_property_filters(["a=b", "c=d=e", "f="]) == {
+            "a": "b",
+            "c": "d=e",
+            "f": "",
+        }
+
+    @pytest.mark.parametrize("property_filters", [["a"], ["=b"]])
+    def test_parse_property_filters_invalid(self, property_filters):
+        with pytest.raises(InvalidArgumentValueError):
+            parse_property_filters(property_filters)
@@ -0,0 +1,123 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import queue
+import pytest
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from azext_iot.monitor import launcher
+from azext_iot.monitor.sinks import StreamSink
+from azext_iot.monitor.utility import parse_shard, select_partitions, split_partitions
+
+partitions = [str(i) for i in range(8)]
+
+
+class TestMonitorPartitions:
+    @pytest.mark.parametrize(
+        "shard, expected", [(None, None), ("0/1", (0, 1)), ("3/4", (3, 4))]
+    )
+    def test_parse_shard(self, shard, expected):
+        assert parse_shard(shard) == expected
+
+    @pytest.mark.parametrize("shard", ["1", "4/4", "-1/4", "a/b", "0/0", "1/"])
+    def test_parse_shard_invalid(self, shard):
+        with pytest.raises(InvalidArgumentValueError):
+            parse_shard(shard)
+
+    @pytest.mark.parametrize(
+        "partition_ids, shard, expected",
+        [
+            (None, None, partitions),
+            (["0,3,7"], None, ["0", "3", "7"]),
+            (["7", "0", "3"], None, ["0", "3", "7"]),
+            (["0, 3", "7"], None, ["0", "3", "7"]),
+            (None, (1, 4), ["1", "5"]),
+            (["0,1,2,3"], (0, 2), ["0", "2"]),
+        ],
+    )
+    def test_select_partitions(self, partition_ids, shard, expected):
+        assert select_partitions(partitions, partition_ids, shard) == expected
+
+    def test_select_partitions_unknown(self):
+        with pytest.raises(InvalidArgumentValueError):
+            select_partitions(partitions, ["0,9"])
+
+    def test_shards_cover_all_partitions(self):
+        covered = []
+        for index in range(3):
+            covered.extend(select_partitions(partitions, shard=(index, 3)))
+        assert sorted(covered) == sorted(partitions)
+
+    @pytest.mark.parametrize(
+        "count, expected",
+        [
+            (1, [partitions]),
+            (3, [["0", "3", "6"], ["1", "4", "7"], ["2", "5"]]),
+            (10, [[p] for p in partitions]),
+        ],
+    )
+    def test_split_partitions(self, count, expected):
+        assert split_partitions(partitions, count) == expected
+
+
+class _FakeProcess(object):
+    def __init__(self, records, kwargs, exitcode):
+        self.records = records
+        self.kwargs = kwargs
+        self.exitcode = None
+        self._exitcode = exitcode
+
+    def start(self):
+        # a shard exiting with an error code dies without reporting it is done
+        if not self._exitcode:
+            self.records.put((launcher._OUTPUT, '{"event": 1}\n'))
+            self.records.put((launcher._DONE, self.kwargs["shard"]))
+        self.exitcode = self._exitcode
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        pass
+
+
+class TestShardedMonitors:
+    def _start(self, mocker, exitcodes):
+        records = queue.Queue()
+        exitcodes = iter(exitcodes)
+        context = mocker.MagicMock()
+        context.Queue.return_value = records
+        context.Process.side_effect = lambda target, kwargs, daemon: _FakeProcess(
+            records, kwargs, next(exitcodes)
+        )
+        mocker.patch.object(launcher.multiprocessing, "get_context", return_value=context)
+        mocker.patch.object(launcher, "PROCESS_POLL_INTERVAL", 0.01)
+        stream = io.StringIO()
+
+        launcher.start_sharded_monitors(
+            target={},
+            partition_groups=[["0", "1"], ["2", "3"]],
+            consumer_group="$Default",
+            enqueued_time_utc=0,
+            on_start_string="Starting event monitor",
+            common_handler_args=None,
+            sink=StreamSink(stream),
+        )
+        return stream.getvalue()
+
+    def test_sharded_monitors(self, mocker):
+        assert self._start(mocker, [0, 0]).count('{"event": 1}') == 2
+
+    def test_sharded_monitors_process_exit(self, mocker):
+        with pytest.raises(RuntimeError) as e:
+            self._start(mocker, [0, 1])
+        assert str(e.value) == (
+            "Monitor process for partitions 2, 3 exited unexpectedly with exit code 1."
+        )
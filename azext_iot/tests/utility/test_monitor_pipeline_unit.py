@@ -0,0 +1,256 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import io
+import json
+import re
+import time
+import pytest
+
+from uamqp.message import Message, MessageProperties
+from azext_iot.monitor import telemetry
+from azext_iot.monitor.handlers import CommonHandler
+from azext_iot.monitor.models.arguments import (
+    CommonHandlerArguments,
+    CommonParserArguments,
+)
+from azext_iot.monitor.models.target import Target
+from azext_iot.monitor.parsers.common_parser import DEVICE_ID_IDENTIFIER
+from azext_iot.monitor.pipeline import EventPipeline
+from azext_iot.monitor.sinks import StreamSink
+from azext_iot.monitor.stats import MonitorStats
+from azext_iot.monitor.utility import stop_monitor
+
+
+def _create_message(device_id: str, payload: dict):
+    properties = MessageProperties(
+        content_encoding="utf-8", content_type="application/json"
+    )
+    message = Message(
+        body=json.dumps(payload).encode(),
+        properties=properties,
+        annotations={DEVICE_ID_IDENTIFIER: device_id.encode()},
+    )
+    return message
+
+
+def _create_handler(device_id="", max_messages=None):
+    return CommonHandler(
+        CommonHandlerArguments(
+            output="json",
+            common_parser_args=CommonParserArguments(),
+            device_id=device_id,
+            max_messages=max_messages,
+        )
+    )
+
+
+def _run(pipeline: EventPipeline, messages: list, monitor_loop=None, batch_size=None):
+    loop = asyncio.new_event_loop()
+    try:
+        pipeline.start(monitor_loop or loop)
+
+        async def _feed():
+            if batch_size:
+                for i in range(0, len(messages), batch_size):
+                    await pipeline.put_batch(messages[i:i + batch_size])
+                return
+            for message in messages:
+                await pipeline.put(message)
+
+        loop.run_until_complete(_feed())
+    finally:
+        pipeline.stop()
+        loop.close()
+
+
+class TestEventPipeline:
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_pipeline_writes_all_events(self, workers):
+        stream = io.StringIO()
+        handler = _create_handler()
+        messages = [_create_message("device-{}".format(i), {"i": i}) for i in range(50)]
+
+        _run(EventPipeline(handler=handler, workers=workers, sink=StreamSink(stream)), messages)
+
+        output = stream.getvalue()
+        assert output.count('"origin"') == 50
+        assert handler.message_count == 50
+
+    def test_pipeline_writes_batches(self):
+        stream = io.StringIO()
+        handler = _create_handler()
+        messages = [_create_message("device-{}".format(i), {"i": i}) for i in range(50)]
+
+        _run(EventPipeline(handler=handler, sink=StreamSink(stream)), messages, batch_size=8)
+
+        assert stream.getvalue().count('"origin"') == 50
+        assert handler.message_count == 50
+
+    def test_pipeline_filters_events(self):
+        stream = io.StringIO()
+        handler = _create_handler(device_id="device-1*")
+        messages = [
+            _create_message("device-1", {}),
+            _create_message("device-2", {}),
+            _create_message("device-10", {}),
+        ]
+
+        _run(EventPipeline(handler=handler, sink=StreamSink(stream)), messages)
+
+        output = stream.getvalue()
+        assert output.count('"origin"') == 2
+        assert '"device-2"' not in output
+
+    def test_pipeline_max_messages(self, mocker):
+        stream = io.StringIO()
+        handler = _create_handler(max_messages=5)
+        messages = [_create_message("device", {"i": i}) for i in range(20)]
+        monitor_loop = mocker.MagicMock()
+        monitor_loop.is_closed.return_value = False
+
+        _run(EventPipeline(handler=handler, sink=StreamSink(stream)), messages, monitor_loop)
+
+        monitor_loop.call_soon_threadsafe.assert_called_once_with(stop_monitor)
+        output = stream.getvalue()
+        assert output.count('"origin"') == 5
+        assert output.endswith("Successfully parsed 5 message(s).\n")
+
+    @pytest.mark.parametrize("batch_size", [None, 3])
+    def test_pipeline_keeps_order(self, mocker, batch_size):
+        stream = io.StringIO()
+        handler = _create_handler()
+        format_message = handler.format_message
+
+        def _uneven_format(message):
+            # earlier events take longer, so later batches are rendered first
+            time.sleep(0.002 * (json.loads(next(message.get_data()))["i"] % 4))
+            return format_message(message)
+
+        mocker.patch.object(handler, "format_message", side_effect=_uneven_format)
+        messages = [_create_message("device", {"i": i}) for i in range(40)]
+
+        _run(
+            EventPipeline(handler=handler, workers=4, sink=StreamSink(stream)),
+            messages,
+            batch_size=batch_size,
+        )
+
+        indexes = re.findall(r'"i": (\d+)', stream.getvalue())
+        assert [int(i) for i in indexes] == list(range(40))
+
+    def test_pipeline_backpressure(self, mocker):
+        stream = io.StringIO()
+        handler = _create_handler()
+        format_message = handler.format_message
+
+        def _slow_format(message):
+            time.sleep(0.005)
+            return format_message(message)
+
+        mocker.patch.object(handler, "format_message", side_effect=_slow_format)
+        messages = [_create_message("device", {"i": i}) for i in range(20)]
+        pipeline = EventPipeline(
+            handler=handler, workers=1, queue_size=1, sink=StreamSink(stream)
+        )
+
+        _run(pipeline, messages)
+
+        assert stream.getvalue().count('"origin"') == 20
+        assert pipeline.backpressure_count > 0
+
+
+class TestMonitorEventsBatching:
+    @pytest.fixture
+    def receive_client(self, mocker):
+        client = mocker.MagicMock(name="receive_client")
+        client.open_async = mocker.AsyncMock()
+        client.close_async = mocker.AsyncMock()
+        client.receive_message_batch_async = mocker.AsyncMock(
+            side_effect=[["m1", "m2"], ["m3"], []]
+        )
+        mocker.patch.object(telemetry.uamqp, "ReceiveClientAsync", return_value=client)
+        return client
+
+    def _monitor(self, **kwargs):
+        target = Target(hostname="hostname", path="path", partitions=["0"], auth=None)
+        target.add_consumer_group("$Default")
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(
+                telemetry._monitor_events(
+                    target=target,
+                    connection=None,
+                    partition="0",
+                    enqueued_time_utc=0,
+                    **kwargs
+                )
+            )
+        finally:
+            loop.close()
+
+    def test_monitor_events_batch_callback(self, mocker, receive_client):
+        on_message_received = mocker.MagicMock()
+        on_batch_received = mocker.MagicMock()
+
+        self._monitor(
+            on_message_received=on_message_received,
+            prefetch=10,
+            batch_size=5,
+            on_batch_received=on_batch_received,
+        )
+
+        assert telemetry.uamqp.ReceiveClientAsync.call_args[1]["prefetch"] == 10
+        assert receive_client.receive_message_batch_async.call_args[1]["max_batch_size"] == 5
+        assert on_batch_received.call_args_list == [
+            mocker.call(["m1", "m2"]),
+            mocker.call(["m3"]),
+        ]
+        on_message_received.assert_not_called()
+
+    def test_monitor_events_batch_fallback(self, mocker, receive_client):
+        on_message_received = mocker.MagicMock()
+
+        self._monitor(on_message_received=on_message_received, prefetch=10, batch_size=5)
+
+        assert on_message_received.call_args_list == [
+            mocker.call("m1"),
+            mocker.call("m2"),
+            mocker.call("m3"),
+        ]
+
+    def test_monitor_events_stats(self, mocker, receive_client):
+        receive_client.receive_message_batch_async.side_effect = [
+            [_create_message("device", {"i": i}) for i in range(3)],
+            [],
+        ]
+        stats = MonitorStats()
+
+        self._monitor(
+            on_message_received=mocker.MagicMock(),
+            prefetch=10,
+            batch_size=5,
+            stats=stats,
+        )
+
+        snapshot = stats.snapshot()
+        assert list(snapshot["partitions"]) == ["path/0"]
+        assert "dispatch" in snapshot["timingsMs"]
+
+
+class TestEventPipelineStats:
+    def test_pipeline_records_timings(self):
+        stats = MonitorStats()
+        handler = _create_handler()
+        messages = [_create_message("device", {"i": i}) for i in range(10)]
+        pipeline = EventPipeline(handler=handler, sink=StreamSink(io.StringIO()), stats=stats)
+
+        _run(pipeline, messages)
+
+        snapshot = stats.snapshot()
+        assert snapshot["queueDepth"] == 0
+        assert set(snapshot["timingsMs"]) == {"parse", "output"}
@@ -0,0 +1,116 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import io
+import json
+import os
+
+from uamqp.message import Message, MessageProperties
+from azext_iot.monitor.handlers import CommonHandler
+from azext_iot.monitor.models.arguments import (
+    CommonHandlerArguments,
+    CommonParserArguments,
+)
+from azext_iot.monitor.parsers.common_parser import DEVICE_ID_IDENTIFIER
+from azext_iot.monitor.pipeline import EventPipeline
+from azext_iot.monitor.sinks import RotatingFileSink, StreamSink
+
+
+def _create_message(device_id: str, payload: dict):
+    return Message(
+        body=json.dumps(payload).encode(),
+        properties=MessageProperties(
+            content_encoding="utf-8", content_type="application/json"
+        ),
+        annotations={DEVICE_ID_IDENTIFIER: device_id.encode()},
+    )
+
+
+class TestStreamSink:
+    def test_stream_sink_notices(self):
+        stream = io.StringIO()
+        notice_stream = io.StringIO()
+        sink = StreamSink(stream, notice_stream=notice_stream)
+
+        sink.write("event\n")
+        sink.notice("done")
+        sink.close()
+
+        assert stream.getvalue() == "event\n"
+        assert notice_stream.getvalue() == "done\n"
+
+    def test_stream_sink_bytes(self):
+        stream = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        sink = StreamSink(stream)
+
+        sink.write(b"\x81\xa1a\x01")
+        sink.flush()
+
+        assert stream.buffer.getvalue() == b"\x81\xa1a\x01"
+
+
+class TestRotatingFileSink:
+    def test_rotation(self, tmp_path):
+        path = str(tmp_path / "events.ndjson")
+        sink = RotatingFileSink(path, max_bytes=10, backup_count=2)
+
+        for i in range(4):
+            sink.write("record{}\n".format(i) * 2)
+        sink.close()
+
+        assert not os.path.exists(path + ".3")
+        with open(path + ".1") as f:
+            assert f.read() == "record3\n" * 2
+        with open(path + ".2") as f:
+            assert f.read() == "record2\n" * 2
+
+    def test_append(self, tmp_path):
+        path = str(tmp_path / "out" / "events.ndjson")
+        for record in ["a\n", "b\n"]:
+            sink = RotatingFileSink(path)
+            sink.write(record)
+            sink.close()
+
+        with open(path) as f:
+            assert f.read() == "a\nb\n"
+
+
+class TestNdjsonOutput:
+    def test_pipeline_ndjson(self):
+        stream = io.StringIO()
+        notice_stream = io.StringIO()
+        handler = CommonHandler(
+            CommonHandlerArguments(
+                output="json",
+                common_parser_args=CommonParserArguments(),
+                max_messages=3,
+                output_format="ndjson",
+            )
+        )
+        pipeline = EventPipeline(
+            handler=handler,
+            sink=StreamSink(stream, notice_stream=notice_stream),
+            flush_interval=0.01,
+        )
+
+        loop = asyncio.new_event_loop()
+        try:
+            pipeline.start(loop)
+
+            async def _feed():
+                for i in range(3):
+                    await pipeline.put(_create_message("device", {"i": i}))
+
+            loop.run_until_complete(_feed())
+        finally:
+            pipeline.stop()
+            loop.close()
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 3
+        assert sorted(json.loads(line)["event"]["payload"]["i"] for line in lines) == [0, 1, 2]
+        assert notice_stream.getvalue() == "Successfully parsed 3 message(s).\n"
@@ -0,0 +1,83 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import time
+
+from uamqp.message import Message
+from azext_iot.monitor.checkpoint import ENQUEUED_TIME_IDENTIFIER
+from azext_iot.monitor.models.enum import StatsFormatType
+from azext_iot.monitor.stats import MonitorStats, TIMING_SAMPLE_SIZE
+
+
+def _create_message(body: bytes, enqueued_seconds_ago: float):
+    enqueued_time = int((time.time() - enqueued_seconds_ago) * 1000)
+    return Message(body=body, annotations={ENQUEUED_TIME_IDENTIFIER: enqueued_time})
+
+
+class TestMonitorStats:
+    def test_snapshot(self):
+        stats = MonitorStats()
+        stats.set_queue_depth(lambda: 3)
+        stats.record_messages("hub/0", [_create_message(b"abcd", 10), _create_message(b"ab", 2)])
+        stats.record_messages("hub/1", [_create_message(b"abcdef", 5)])
+        for i in range(100):
+            stats.record_timing("parse", (i + 1) / 1000)
+        # pretend the interval started two seconds ago
+        stats._interval_start -= 2
+
+        snapshot = stats.snapshot()
+
+        assert 1.4 < snapshot["messagesPerSecond"] <= 1.5
+        assert snapshot["queueDepth"] == 3
+        assert set(snapshot["partitions"]) == {"hub/0", "hub/1"}
+        # lag is that of the latest message received on the partition
+        assert 1.5 < snapshot["partitions"]["hub/0"]["lagSeconds"] < 3
+        assert snapshot["timingsMs"]["parse"] == {"p50": 51.0, "p90": 91.0, "p99": 100.0}
+
+    def test_snapshot_starts_new_interval(self):
+        stats = MonitorStats()
+        stats.record_messages("hub/0", [_create_message(b"abcd", 1)])
+        stats.snapshot()
+
+        snapshot = stats.snapshot()
+
+        partition = snapshot["partitions"]["hub/0"]
+        assert partition["messagesPerSecond"] == 0
+        assert partition["lagSeconds"] is not None
+        assert snapshot["timingsMs"] == {}
+
+    def test_timing_samples_are_bounded(self):
+        stats = MonitorStats()
+        for _ in range(TIMING_SAMPLE_SIZE * 3):
+            stats.record_timing("output", 0.001)
+        assert len(stats._timings["output"].samples) == TIMING_SAMPLE_SIZE
+
+    def test_json_report(self):
+        stream = io.StringIO()
+        stats = MonitorStats(stats_format=StatsFormatType.json.value, stream=stream)
+        stats.record_messages("hub/0", [_create_message(b"abcd", 1)])
+
+        stats.report()
+        stats.report()
+
+        reports = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert len(reports) == 2
+        assert reports[0]["partitions"]["hub/0"]["bytesPerSecond"] > 0
+
+    def test_text_report(self):
+        stream = io.StringIO()
+        stats = MonitorStats(stream=stream)
+        stats.record_messages("hub/0", [_create_message(b"abcd", 1)])
+        stats.record_timing("parse", 0.002)
+
+        stats.report()
+
+        output = stream.getvalue()
+        assert output.startswith("[stats] ")
+        assert "partition hub/0:" in output
+        assert "parse ms: p50 2.0" in output